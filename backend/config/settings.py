@@ -115,6 +115,30 @@ MEDIA_ROOT = BASE_DIR / "media"
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB in bytes
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB in bytes
 
+# Disk budget for cached PDF exports (core.export_cache), LRU-evicted
+EXPORT_CACHE_MAX_BYTES = config("EXPORT_CACHE_MAX_BYTES", default=1024 ** 3, cast=int)
+
+# Rendered PDFs larger than this spill from memory to a temp file
+EXPORT_SPOOL_MAX_MEMORY = config("EXPORT_SPOOL_MAX_MEMORY", default=8 * 1024 * 1024, cast=int)
+
+# Warm the WeasyPrint renderer (fonts, export stylesheet) when a web worker boots
+EXPORT_WARM_RENDERER = config("EXPORT_WARM_RENDERER", default=False, cast=bool)
+
+# Batch (multi-property ZIP) exports: render processes and request size cap
+EXPORT_BATCH_WORKERS = config("EXPORT_BATCH_WORKERS", default=2, cast=int)
+EXPORT_BATCH_MAX_PROPERTIES = config("EXPORT_BATCH_MAX_PROPERTIES", default=100, cast=int)
+
+# Render the cover and each section in parallel processes and merge them
+# (core.export_sections); 0 keeps single-document rendering
+EXPORT_SECTION_WORKERS = config("EXPORT_SECTION_WORKERS", default=0, cast=int)
+
+# Seconds a user's export entitlements (core.entitlement_utils) stay cached
+EXPORT_ENTITLEMENT_CACHE_SECONDS = config("EXPORT_ENTITLEMENT_CACHE_SECONDS", default=60, cast=int)
+
+# Seconds an authenticated user and profile stay cached per process
+# (core.profile_utils); 0 looks them up on every request
+USER_PROFILE_CACHE_SECONDS = config("USER_PROFILE_CACHE_SECONDS", default=0, cast=int)
+
 # WhiteNoise configuration for serving media files
 WHITENOISE_AUTOREFRESH = True  # Allows new uploads to be served immediately
 WHITENOISE_USE_FINDERS = True
@@ -137,7 +161,7 @@ if DEBUG:
 # REST Framework & JWT
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.ProfileJWTAuthentication",
     )
 }
 
@@ -157,7 +181,12 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 # Email configuration - SendGrid
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Emails are queued in core.EmailOutbox and sent by the send_queued_emails
+# worker; locmem/filebased backends work for local testing
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=str(BASE_DIR / 'sent_emails'))
+# Emails per second for waitlist campaigns (core.waitlist_campaign)
+WAITLIST_CAMPAIGN_RATE = config('WAITLIST_CAMPAIGN_RATE', default=10.0, cast=float)
 EMAIL_HOST = 'smtp.sendgrid.net'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
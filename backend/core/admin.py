@@ -1,5 +1,11 @@
-from django.contrib import admin
-from .models import Property, Section, Document, PropertyImage, Note, WaitlistSignup, UserProfile, Payment
+from django.contrib import admin, messages
+from .models import Property, Section, Document, PropertyImage, Note, WaitlistSignup, UserProfile, Payment, ExportJob, ExportCacheEntry, ExportFragment, ExportEntitlement, EmailOutbox, CampaignDelivery, WebhookEvent
+from .entitlement_utils import sync_account_entitlements
+from .waitlist_campaign import pending_signups, send_waitlist_campaign
+from .webhook_events import replay_webhook_events
+
+# Larger sends belong to the send_waitlist_campaign command
+ADMIN_CAMPAIGN_MAX_RECIPIENTS = 100
 
 @admin.register(WaitlistSignup)
 class WaitlistSignupAdmin(admin.ModelAdmin):
@@ -8,6 +14,21 @@ class WaitlistSignupAdmin(admin.ModelAdmin):
     search_fields = ('email',)
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
+    actions = ['send_launch_campaign']
+
+    @admin.action(description='Send the launch campaign to selected signups')
+    def send_launch_campaign(self, request, queryset):
+        owed = pending_signups('launch', queryset).count()
+        if owed > ADMIN_CAMPAIGN_MAX_RECIPIENTS:
+            self.message_user(
+                request,
+                f'{owed} recipients selected; use the send_waitlist_campaign command '
+                f'for more than {ADMIN_CAMPAIGN_MAX_RECIPIENTS}.',
+                level=messages.WARNING,
+            )
+            return
+        sent, failed = send_waitlist_campaign('launch', signups=queryset)
+        self.message_user(request, f'Launch campaign: {sent} sent, {failed} failed.')
 
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
@@ -21,6 +42,57 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('user_type', 'subscription_status')
     search_fields = ('user__username', 'user__email')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        sync_account_entitlements(obj)
+
+@admin.register(ExportEntitlement)
+class ExportEntitlementAdmin(admin.ModelAdmin):
+    list_display = ('user', 'property', 'source', 'expires_at', 'updated_at')
+    list_filter = ('source',)
+    search_fields = ('user__username', 'property__address')
+
+@admin.register(CampaignDelivery)
+class CampaignDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('campaign', 'signup', 'status', 'attempts', 'sent_at')
+    list_filter = ('campaign', 'status')
+    search_fields = ('signup__email',)
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to_email', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject')
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'type', 'customer_id', 'status', 'attempts', 'stripe_created', 'processed_at')
+    list_filter = ('status', 'type')
+    search_fields = ('event_id', 'customer_id')
+    readonly_fields = ('payload', 'received_at')
+    actions = ['replay_events']
+
+    @admin.action(description='Replay selected events')
+    def replay_events(self, request, queryset):
+        queued = replay_webhook_events(queryset)
+        self.message_user(request, f'{queued} event(s) queued for the webhook worker.')
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'property', 'user', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('property__address', 'user__username')
+
+@admin.register(ExportCacheEntry)
+class ExportCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('fingerprint', 'property', 'revision', 'size', 'last_accessed_at')
+    search_fields = ('fingerprint', 'property__address')
+
+@admin.register(ExportFragment)
+class ExportFragmentAdmin(admin.ModelAdmin):
+    list_display = ('fingerprint', 'property', 'pages', 'size', 'created_at')
+    search_fields = ('fingerprint', 'property__address')
+
 # Register other models with basic admin
 admin.site.register(Section)
 admin.site.register(Document)
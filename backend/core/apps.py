@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.conf import settings
+        from . import signals  # noqa: F401
+
+        if getattr(settings, "EXPORT_WARM_RENDERER", False):
+            from .export_renderer import warm_up_in_background
+            warm_up_in_background()
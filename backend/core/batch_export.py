@@ -0,0 +1,207 @@
+# core/batch_export.py
+
+import json
+import logging
+import multiprocessing
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .models import Property, ExportCacheEntry
+from .entitlement_utils import bulk_export_access
+from .export_cache import get_cached_export
+from .export_utils import record_export
+from .export_workers import init_render_worker, render_export_artifact
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def resolve_batch_entitlements(user, property_ids):
+    """
+    Work out which of ``property_ids`` the user may export, with one query
+    for ownership and one (usually cached) for the user's entitlements.
+    Returns (exportable properties, {property_id: error}) in request order.
+    """
+    found = {
+        prop.id: prop
+        for prop in Property.objects.filter(owner=user, id__in=property_ids)
+    }
+    access = bulk_export_access(user, found)
+
+    allowed = []
+    errors = {}
+    for property_id in property_ids:
+        prop = found.get(property_id)
+        if prop is None:
+            errors[property_id] = 'Property not found'
+        elif not any(access[property_id]):
+            errors[property_id] = 'Payment required to export this property'
+        else:
+            allowed.append(prop)
+    return allowed, errors
+
+
+class _ZipSink:
+    """Write-only stream for zipfile; hands buffered bytes to the response."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _export_filename(prop):
+    return f"property_{prop.id}.pdf"
+
+
+def batch_workers():
+    """Render processes shared by batch exports; 0 renders inline."""
+    return getattr(settings, 'EXPORT_BATCH_WORKERS', 2)
+
+
+def _batch_pool():
+    # One long-lived pool per process, shared by every batch request: the
+    # workers are spawned and warmed once, and concurrent batches queue for
+    # the same EXPORT_BATCH_WORKERS processes instead of each adding more.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned (not forked) workers: safe under threaded servers and
+            # never share the parent's database connections.
+            _pool = ProcessPoolExecutor(
+                max_workers=batch_workers(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_render_worker,
+            )
+        return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _iter_rendered(props, user, base_url):
+    """
+    Yield (property, cache entry id or None, error or None) as renders
+    finish. Cached exports are yielded first; misses go to the shared
+    process pool (or render inline when EXPORT_BATCH_WORKERS is 0).
+    """
+    misses = []
+    for prop in props:
+        entry = get_cached_export(prop, base_url)
+        if entry is not None:
+            yield prop, entry.pk, None
+        else:
+            misses.append(prop)
+
+    if not misses:
+        return
+
+    if batch_workers() <= 0:
+        for prop in misses:
+            try:
+                yield prop, render_export_artifact(prop.id, user.id, base_url), None
+            except Exception as e:
+                logger.exception(f"Batch export of property {prop.id} failed")
+                yield prop, None, str(e)
+        return
+
+    pool = _batch_pool()
+    futures = {
+        pool.submit(render_export_artifact, prop.id, user.id, base_url): prop
+        for prop in misses
+    }
+    try:
+        for future in as_completed(futures):
+            prop = futures[future]
+            try:
+                yield prop, future.result(), None
+            except BrokenProcessPool as e:
+                # A worker died (e.g. OOM); start fresh next time
+                _discard_pool()
+                yield prop, None, str(e)
+            except Exception as e:
+                logger.error(f"Batch export of property {prop.id} failed: {str(e)}")
+                yield prop, None, str(e)
+    finally:
+        # The client may have gone away; don't render for nobody
+        for future in futures:
+            future.cancel()
+
+
+def stream_batch_export(user, property_ids, base_url):
+    """
+    Generator producing a ZIP archive of property PDFs plus manifest.json,
+    one chunk at a time. PDFs are copied from the export cache in small
+    blocks, so neither the archive nor any PDF is held in memory.
+    """
+    props, errors = resolve_batch_entitlements(user, property_ids)
+    manifest = {
+        property_id: {'property_id': property_id, 'status': 'error', 'error': error}
+        for property_id, error in errors.items()
+    }
+
+    sink = _ZipSink()
+    # PDFs are already compressed; storing avoids burning CPU for nothing
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for prop, entry_id, error in _iter_rendered(props, user, base_url):
+            if error is None:
+                entry = ExportCacheEntry.objects.filter(pk=entry_id).first()
+                try:
+                    source = entry.file.storage.open(entry.file.name, 'rb')
+                except Exception as e:
+                    error = f"Rendered export is no longer available: {str(e)}"
+
+            if error is not None:
+                manifest[prop.id] = {'property_id': prop.id, 'status': 'error', 'error': error}
+                continue
+
+            filename = _export_filename(prop)
+            with source, archive.open(filename, 'w', force_zip64=True) as dest:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    dest.write(chunk)
+                    yield sink.drain()
+
+            manifest[prop.id] = {
+                'property_id': prop.id,
+                'address': prop.address,
+                'status': 'ok',
+                'filename': filename,
+            }
+            yield sink.drain()
+
+        succeeded = [item for item in manifest.values() if item['status'] == 'ok']
+        archive.writestr('manifest.json', json.dumps({
+            'requested': len(property_ids),
+            'succeeded': len(succeeded),
+            'failed': len(manifest) - len(succeeded),
+            'items': [manifest[property_id] for property_id in property_ids],
+        }, indent=2))
+
+    yield sink.drain()
+
+    if succeeded:
+        # Count the export once per batch; no per-property emails
+        record_export(user, props[0], notify=False)
@@ -1,7 +1,9 @@
 import os
+import hashlib
 import mimetypes
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urljoin
 
 
 def get_file_metadata(file_path):
@@ -31,6 +33,107 @@ def get_file_metadata(file_path):
         }
 
 
+OFFICE_MIME_TYPES = {
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    '.doc': 'application/msword',
+    '.xls': 'application/vnd.ms-excel',
+    '.ppt': 'application/vnd.ms-powerpoint',
+}
+
+MAGIC_NUMBERS = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'BM', 'image/bmp'),
+]
+
+
+def sniff_mime_type(head, filename=''):
+    """
+    Work out a MIME type from the first bytes of a file. Containers that
+    several formats share (ZIP, OLE) are narrowed down by extension.
+    """
+    extension = Path(filename).suffix.lower()
+
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mime_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'heic', b'heix', b'mif1', b'msf1'):
+        return 'image/heic'
+    if head.startswith(b'PK\x03\x04'):
+        if extension in ('.docx', '.xlsx', '.pptx'):
+            return OFFICE_MIME_TYPES[extension]
+        return 'application/zip'
+    if head.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        return OFFICE_MIME_TYPES.get(extension, 'application/x-ole-storage')
+    if head and b'\x00' not in head:
+        try:
+            head.decode('utf-8')
+            return mimetypes.guess_type(filename)[0] or 'text/plain'
+        except UnicodeDecodeError:
+            pass
+
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def extract_file_metadata(field_file):
+    """
+    Read a stored or freshly uploaded file once and return the metadata we
+    persist on Document / PropertyImage rows: size, sniffed MIME type,
+    SHA-256 and, for images, pixel dimensions.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+
+    field_file.open('rb')
+    try:
+        field_file.seek(0)
+        for chunk in field_file.chunks():
+            if not head:
+                head = chunk[:512]
+            digest.update(chunk)
+            size += len(chunk)
+
+        mime_type = sniff_mime_type(head, field_file.name)
+
+        width = height = None
+        if mime_type.startswith('image/'):
+            try:
+                from PIL import Image
+                field_file.seek(0)
+                with Image.open(field_file) as im:
+                    width, height = im.size
+            except Exception:
+                pass
+        field_file.seek(0)
+    finally:
+        # Uploads are still needed for the actual save; only close stored files
+        if getattr(field_file, '_committed', True):
+            field_file.close()
+
+    return {
+        'file_size': size,
+        'mime_type': mime_type,
+        'content_hash': digest.hexdigest(),
+        'width': width,
+        'height': height,
+    }
+
+
+def apply_file_metadata(instance, field_file):
+    for key, value in extract_file_metadata(field_file).items():
+        setattr(instance, key, value)
+
+
 def format_file_size(size_bytes):
     """Convert bytes to human readable format."""
     if size_bytes == 0:
@@ -47,22 +150,27 @@ def format_file_size(size_bytes):
 
 
 
-def get_document_preview_summary(document, request=None):
+def get_document_preview_summary(document, request=None, base_url=None):
     """
     Get document summary with preview link for PDF inclusion.
     Creates a clickable link that takes users directly to the document preview.
+    Outside a request (e.g. the export worker) pass ``base_url`` instead.
     """
     try:
-        file_path = document.file.path
-        file_extension = Path(file_path).suffix.lower()
+        file_extension = Path(document.file.name).suffix.lower()
         file_name = os.path.basename(document.file.name)
 
-        # Get file metadata
-        metadata = get_file_metadata(file_path)
+        # Use the metadata recorded at upload; only stat rows not backfilled yet
+        if document.file_size is not None:
+            file_size = format_file_size(document.file_size)
+        else:
+            file_size = get_file_metadata(document.file.path)['size_formatted']
 
         # Create preview link
         if request:
             preview_url = request.build_absolute_uri(f'/api/documents/{document.id}/view/')
+        elif base_url:
+            preview_url = urljoin(base_url, f'/api/documents/{document.id}/view/')
         else:
             preview_url = f"https://sellerprep.app/api/documents/{document.id}/view/"
 
@@ -70,7 +178,7 @@ def get_document_preview_summary(document, request=None):
             'filename': file_name,
             'uploaded': document.uploaded_at.strftime("%Y-%m-%d"),
             'type': file_extension,
-            'file_size': metadata['size_formatted'],
+            'file_size': file_size,
             'preview_url': preview_url,
             'has_error': False
         }
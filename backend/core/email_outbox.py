@@ -0,0 +1,136 @@
+# core/email_outbox.py
+#
+# Transactional email goes through the EmailOutbox table: requests insert a
+# row (no SMTP round-trip), and the send_queued_emails worker sends claimed
+# batches over one persistent connection, retrying failures with backoff.
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_EMAIL_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+# A batch claimed longer ago than this belongs to a worker that died.
+STALE_SENDING_SECONDS = 10 * 60
+
+
+def queue_email(to_email, subject, html_body='', text_body=''):
+    """Add an email to the outbox, in the caller's transaction."""
+    return EmailOutbox.objects.create(
+        to_email=to_email,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        subject=subject,
+        html_body=html_body,
+        text_body=text_body,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_email_batch(batch_size):
+    """
+    Atomically mark up to ``batch_size`` due emails as sending and return
+    them, oldest first. Returns an empty list when nothing is due.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=STALE_SENDING_SECONDS)
+
+    with transaction.atomic():
+        emails = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status='pending', next_attempt_at__lte=now) |
+                Q(status='sending', claimed_at__lt=stale_before)
+            )
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not emails:
+            return []
+
+        EmailOutbox.objects.filter(pk__in=[email.pk for email in emails]).update(
+            status='sending', claimed_at=now, attempts=F('attempts') + 1
+        )
+    for email in emails:
+        email.status = 'sending'
+        email.claimed_at = now
+        email.attempts += 1
+    return emails
+
+
+def _message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject,
+        email.text_body,
+        email.from_email,
+        [email.to_email],
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _record_failure(email, error):
+    email.last_error = str(error)
+    if email.attempts >= MAX_EMAIL_ATTEMPTS:
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['status', 'last_error', 'next_attempt_at'])
+
+
+def fail_emails(emails, error):
+    """Record ``error`` against claimed emails that could not be attempted."""
+    for email in emails:
+        _record_failure(email, error)
+
+
+def deliver_emails(emails, connection):
+    """
+    Send claimed emails over ``connection``, which the caller keeps open
+    across batches. Each email is marked sent as soon as the server
+    accepts it, so nothing delivered is sent again if a later step fails.
+    Returns (sent, failed) counts.
+    """
+    sent = 0
+    failed = 0
+    for position, email in enumerate(emails):
+        try:
+            connection.send_messages([_message(email, connection)])
+        except Exception as e:
+            logger.warning(f"Email {email.id} to {email.to_email} failed: {e}")
+            _record_failure(email, e)
+            failed += 1
+        else:
+            EmailOutbox.objects.filter(pk=email.pk).update(
+                status='sent', sent_at=timezone.now(), last_error=''
+            )
+            sent += 1
+            continue
+
+        # An SMTP session is rarely usable after an error; start afresh
+        try:
+            connection.close()
+            connection.open()
+        except Exception as e:
+            remaining = emails[position + 1:]
+            fail_emails(remaining, e)
+            failed += len(remaining)
+            break
+
+    return sent, failed
@@ -0,0 +1,94 @@
+# core/email_render.py
+#
+# Email rendering with templates compiled once per process. Each email
+# gets an HTML part and a plaintext part derived from it. Bulk sends
+# render the shared template once and only substitute per-recipient
+# fields, so a waitlist blast costs one render, not one per address.
+
+import functools
+import re
+import secrets
+from html import unescape
+
+from django.template.loader import get_template
+from django.utils.html import escape, strip_tags
+
+_HIDDEN = re.compile(r'<(head|style|script)\b.*?</\1\s*>', re.S | re.I)
+_LINK = re.compile(r'<a\b[^>]*\bhref="(?:mailto:)?([^"]*)"[^>]*>(.*?)</a\s*>', re.S | re.I)
+_LINE_BREAK = re.compile(r'<br\s*/?>', re.I)
+_BLOCK_END = re.compile(r'</(p|div|h[1-6]|li|tr|table)\s*>', re.I)
+_EXTRA_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+@functools.lru_cache(maxsize=None)
+def email_template(name):
+    """The compiled template, loaded from disk once per process."""
+    return get_template(name)
+
+
+def _link_text(match):
+    url, label = match.group(1), strip_tags(match.group(2)).strip()
+    return label if label == url else f'{label} ({url})'
+
+
+def html_to_text(html):
+    """Plaintext alternative for an HTML email: paragraphs, line breaks and link targets kept."""
+    text = _HIDDEN.sub('', html)
+    text = _LINK.sub(_link_text, text)
+    text = _LINE_BREAK.sub('\n', text)
+    text = _BLOCK_END.sub('\n\n', text)
+    text = unescape(strip_tags(text))
+    lines = (' '.join(line.split()) for line in text.splitlines())
+    return _EXTRA_BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip() + '\n'
+
+
+def render_email(template_name, context):
+    """Return (html, text) bodies for one email."""
+    html = email_template(template_name).render(context)
+    return html, html_to_text(html)
+
+
+class BulkEmail:
+    """
+    One template rendered once for many recipients. Per-recipient fields
+    are rendered as unique markers, which render() swaps for the real
+    (HTML-escaped) values; such fields must be output as plain
+    ``{{ field }}``, without filters.
+    """
+
+    def __init__(self, template_name, context, fields):
+        token = secrets.token_hex(8)
+        markers = {field: f'SPFIELD{token}{field}END' for field in fields}
+        html, text = render_email(template_name, dict(context, **markers))
+
+        self.fields = list(fields)
+        pattern = re.compile('|'.join(re.escape(marker) for marker in markers.values()))
+        lookup = {marker: field for field, marker in markers.items()}
+        self._html = self._split(pattern, lookup, html)
+        self._text = self._split(pattern, lookup, text)
+
+    @staticmethod
+    def _split(pattern, lookup, body):
+        # Alternating literal text and field names: [text, field, text, ...]
+        parts = []
+        position = 0
+        for match in pattern.finditer(body):
+            parts.append(body[position:match.start()])
+            parts.append(lookup[match.group()])
+            position = match.end()
+        parts.append(body[position:])
+        return parts
+
+    @staticmethod
+    def _join(parts, values):
+        return ''.join(
+            part if index % 2 == 0 else values[part]
+            for index, part in enumerate(parts)
+        )
+
+    def render(self, **values):
+        """Return (html, text) bodies for one recipient."""
+        return (
+            self._join(self._html, {field: escape(values[field]) for field in self.fields}),
+            self._join(self._text, {field: str(values[field]) for field in self.fields}),
+        )
@@ -0,0 +1,191 @@
+# core/entitlement_utils.py
+#
+# Export permission as a table lookup. ExportEntitlement rows are written
+# when a payment is confirmed or a subscription changes, so checking an
+# export never has to scan payments or walk the agent/client chain.
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ExportEntitlement, Payment, UserProfile
+
+
+def _cache_key(user_id):
+    return f"export-entitlements:{user_id}"
+
+
+def invalidate_entitlements(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def _load_entitlements(user):
+    entitlements = dict(
+        ExportEntitlement.objects.filter(user=user).values_list('property_id', 'expires_at')
+    )
+    cache.set(
+        _cache_key(user.pk), entitlements,
+        getattr(settings, 'EXPORT_ENTITLEMENT_CACHE_SECONDS', 60)
+    )
+    return entitlements
+
+
+def user_entitlements(user):
+    """
+    {property id or None: expiry or None} for everything ``user`` may
+    export; the None key is an account-wide entitlement. One query, cached
+    for EXPORT_ENTITLEMENT_CACHE_SECONDS.
+    """
+    entitlements = cache.get(_cache_key(user.pk))
+    if entitlements is None:
+        entitlements = _load_entitlements(user)
+    return entitlements
+
+
+def entitlement_active(entitlements, property_id, now):
+    if property_id not in entitlements:
+        return False
+    expires_at = entitlements[property_id]
+    return expires_at is None or expires_at > now
+
+
+def _access_flags(entitlements, property_ids, now):
+    account = entitlement_active(entitlements, None, now)
+    return {
+        property_id: (account, entitlement_active(entitlements, property_id, now))
+        for property_id in property_ids
+    }
+
+
+def bulk_export_access(user, property_ids):
+    """
+    {property id: (account-wide, paid for)} entitlement flags for ``user``,
+    from one (usually cached) lookup however many properties are asked about.
+    """
+    now = timezone.now()
+    cached = cache.get(_cache_key(user.pk))
+    entitlements = cached if cached is not None else _load_entitlements(user)
+    access = _access_flags(entitlements, property_ids, now)
+
+    # The cache may predate a grant made in another process; it can only
+    # ever grant, so a cached denial is confirmed against the table.
+    if cached is not None and not all(any(flags) for flags in access.values()):
+        access = _access_flags(_load_entitlements(user), property_ids, now)
+    return access
+
+
+def export_access(user, property_id):
+    """Return (account-wide, this property) entitlement flags for ``user``."""
+    return bulk_export_access(user, [property_id])[property_id]
+
+
+def can_export(user, prop):
+    return any(export_access(user, prop.pk))
+
+
+def has_account_entitlement(user):
+    return export_access(user, None)[0]
+
+
+def grant_property_entitlement(user, prop):
+    """Record that ``user`` has paid to export ``prop``."""
+    ExportEntitlement.objects.update_or_create(
+        user=user, property=prop,
+        defaults={'source': 'payment', 'expires_at': None}
+    )
+    invalidate_entitlements(user.pk)
+
+
+def _account_source(profile):
+    if profile.user_type == 'admin':
+        return 'admin'
+    if profile.subscription_status == 'active':
+        return 'subscription'
+    if profile.parent_agent_id and UserProfile.objects.filter(
+        user_id=profile.parent_agent_id, subscription_status='active'
+    ).exists():
+        return 'agent'
+    return None
+
+
+def _set_account_entitlement(user_id, source, expires_at):
+    if source is None:
+        ExportEntitlement.objects.filter(user_id=user_id, property__isnull=True).delete()
+    else:
+        ExportEntitlement.objects.update_or_create(
+            user_id=user_id, property=None,
+            defaults={'source': source, 'expires_at': expires_at}
+        )
+    invalidate_entitlements(user_id)
+
+
+def sync_account_entitlements(profile, expires_at=None):
+    """
+    Bring the account-wide entitlement of ``profile`` (and of its clients,
+    if it is an agent) in line with its user type and subscription status.
+    ``expires_at`` is the end of the paid subscription period, if known.
+    """
+    source = _account_source(profile)
+    with transaction.atomic():
+        _set_account_entitlement(
+            profile.user_id, source, expires_at if source == 'subscription' else None
+        )
+
+        client_source = 'agent' if profile.subscription_status == 'active' else None
+        for client in UserProfile.objects.filter(parent_agent_id=profile.user_id):
+            if client.user_type == 'admin' or client.subscription_status == 'active':
+                continue  # entitled on their own account
+            _set_account_entitlement(
+                client.user_id, client_source, expires_at if client_source else None
+            )
+
+
+def rebuild_entitlements(chunk_size=500):
+    """
+    Recompute the whole table from succeeded payments and profile state.
+    Subscription expiries already recorded are kept, since only Stripe
+    webhooks know them. Returns (property entitlements, account entitlements).
+    """
+    expiries = dict(
+        ExportEntitlement.objects.filter(property__isnull=True).values_list('user_id', 'expires_at')
+    )
+    active_agents = set(
+        UserProfile.objects.filter(subscription_status='active').values_list('user_id', flat=True)
+    )
+
+    paid = (
+        Payment.objects.filter(status='succeeded')
+        .values_list('user_id', 'property_id')
+        .distinct()
+    )
+    rows = [
+        ExportEntitlement(user_id=user_id, property_id=property_id, source='payment')
+        for user_id, property_id in paid.iterator(chunk_size=chunk_size)
+    ]
+
+    profiles = UserProfile.objects.only(
+        'user_id', 'user_type', 'subscription_status', 'parent_agent_id'
+    )
+    account_rows = []
+    for profile in profiles.iterator(chunk_size=chunk_size):
+        if profile.user_type == 'admin':
+            source, expires_at = 'admin', None
+        elif profile.subscription_status == 'active':
+            source, expires_at = 'subscription', expiries.get(profile.user_id)
+        elif profile.parent_agent_id in active_agents:
+            source, expires_at = 'agent', expiries.get(profile.parent_agent_id)
+        else:
+            continue
+        account_rows.append(ExportEntitlement(
+            user_id=profile.user_id, source=source, expires_at=expires_at
+        ))
+
+    stale_users = set(ExportEntitlement.objects.values_list('user_id', flat=True).distinct())
+    with transaction.atomic():
+        ExportEntitlement.objects.all().delete()
+        ExportEntitlement.objects.bulk_create(rows, batch_size=chunk_size)
+        ExportEntitlement.objects.bulk_create(account_rows, batch_size=chunk_size)
+    affected = stale_users | {row.user_id for row in rows + account_rows}
+    cache.delete_many([_cache_key(user_id) for user_id in affected])
+    return len(rows), len(account_rows)
@@ -0,0 +1,202 @@
+# core/export_benchmark.py
+
+import os
+import random
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+
+from .models import Property, Section, Document, PropertyImage, Note
+from .export_cache import EXPORT_TEMPLATE
+from .export_context import build_export_context, load_export_items
+from .export_fetcher import LocalURLFetcher
+from .export_renderer import renderer
+
+STAGES = ("queries", "context", "template", "layout", "write_pdf")
+
+NOTE_WORDS = (
+    "roof replaced furnace serviced water heater inspected gutters cleaned "
+    "foundation sealed permit closed warranty transferable appliances included "
+    "hardwood refinished windows double pane sewer scoped panel upgraded"
+).split()
+
+
+def _synthetic_image(width, height, rng):
+    """A noisy JPEG so the encoded size resembles a real photo, not a flat fill."""
+    from PIL import Image
+
+    tile = Image.frombytes("RGB", (64, 64), rng.randbytes(64 * 64 * 3))
+    image = tile.resize((width, height), Image.BILINEAR)
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _synthetic_document(size, rng):
+    header = b"%PDF-1.4\n% SellerPrep synthetic benchmark document\n"
+    return header + rng.randbytes(max(size - len(header), 0))
+
+
+def _synthetic_note(rng, words=80):
+    return " ".join(rng.choice(NOTE_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def generate_synthetic_property(owner, sections=10, documents=3, images=4, notes=3,
+                                image_size=(2400, 1800), document_bytes=250 * 1024,
+                                seed=0):
+    """
+    Create a property with ``sections`` sections, each holding the given
+    number of documents, images and notes. Files are written through the
+    default storage and go through the normal save signals, so metadata and
+    print derivatives exist just as for real uploads.
+    """
+    rng = random.Random(seed)
+    prop = Property.objects.create(
+        owner=owner,
+        address=f"{sections} Benchmark Lane",
+        description="Synthetic property generated for export benchmarks.",
+    )
+
+    # Encoding is the slow part; reuse a few variants across the property
+    image_variants = [_synthetic_image(*image_size, rng) for _ in range(min(images, 3) or 1)]
+    document_blob = _synthetic_document(document_bytes, rng)
+
+    for s in range(sections):
+        section = Section.objects.create(property=prop, title=f"Room {s + 1}")
+        for d in range(documents):
+            Document.objects.create(
+                property=prop,
+                section=section,
+                file=ContentFile(document_blob, name=f"report_{s}_{d}.pdf"),
+            )
+        for i in range(images):
+            PropertyImage.objects.create(
+                property=prop,
+                section=section,
+                image=ContentFile(image_variants[i % len(image_variants)], name=f"photo_{s}_{i}.jpg"),
+            )
+        for n in range(notes):
+            Note.objects.create(property=prop, section=section, content=_synthetic_note(rng))
+
+    prop.refresh_from_db()
+    return prop
+
+
+def peak_rss_kb():
+    """High-water mark of this process's resident set size, in KiB."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return usage // 1024 if os.uname().sysname == "Darwin" else usage
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_export_once(prop, user, base_url, include_pdf=True):
+    """Time each export stage once; returns {stage: {...}} and the PDF size."""
+    stages = {}
+
+    with CaptureQueriesContext(connection) as queries:
+        items, elapsed = _timed(lambda: load_export_items(prop))
+    stages["queries"] = {"seconds": elapsed, "queries": len(queries), "peak_rss_kb": peak_rss_kb()}
+
+    context, elapsed = _timed(lambda: build_export_context(prop, user, base_url, items=items))
+    stages["context"] = {"seconds": elapsed, "peak_rss_kb": peak_rss_kb()}
+
+    html_string, elapsed = _timed(lambda: render_to_string(EXPORT_TEMPLATE, context))
+    stages["template"] = {
+        "seconds": elapsed,
+        "html_bytes": len(html_string.encode("utf-8")),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+    output_bytes = None
+    if include_pdf:
+        fetcher = LocalURLFetcher(base_url)
+        document, elapsed = _timed(lambda: renderer.layout(html_string, base_url, fetcher))
+        stages["layout"] = {
+            "seconds": elapsed,
+            "pages": len(document.pages),
+            "local_fetches": fetcher.local_count,
+            "remote_fetches": fetcher.remote_count,
+            "peak_rss_kb": peak_rss_kb(),
+        }
+
+        with tempfile.TemporaryFile() as target:
+            _, elapsed = _timed(lambda: document.write_pdf(target))
+            output_bytes = target.tell()
+        stages["write_pdf"] = {"seconds": elapsed, "peak_rss_kb": peak_rss_kb()}
+
+    return stages, output_bytes
+
+
+def benchmark_export(prop, user, base_url="http://localhost/", repeat=3, include_pdf=True):
+    """
+    Run the export pipeline ``repeat`` times and summarise each stage
+    (min/median wall time) along with peak RSS and output size, as a
+    JSON-serialisable dict.
+    """
+    if include_pdf:
+        warmup_start = time.perf_counter()
+        renderer.warm_up()
+        warmup_seconds = time.perf_counter() - warmup_start
+    else:
+        warmup_seconds = None
+
+    runs = []
+    output_bytes = None
+    for _ in range(repeat):
+        stages, output_bytes = run_export_once(prop, user, base_url, include_pdf=include_pdf)
+        runs.append(stages)
+
+    summary = {}
+    for name in STAGES:
+        timings = [run[name]["seconds"] for run in runs if name in run]
+        if not timings:
+            continue
+        extra = {k: v for k, v in runs[-1][name].items() if k not in ("seconds", "peak_rss_kb")}
+        summary[name] = {
+            "min_seconds": min(timings),
+            "median_seconds": statistics.median(timings),
+            "peak_rss_kb": max(run[name]["peak_rss_kb"] for run in runs),
+            **extra,
+        }
+
+    totals = [sum(stage["seconds"] for stage in run.values()) for run in runs]
+    return {
+        "commit": _git_commit(),
+        "property": {
+            "sections": prop.sections.count(),
+            "documents": prop.documents.count(),
+            "images": prop.images.count(),
+            "notes": prop.notes.count(),
+        },
+        "repeat": repeat,
+        "renderer_warmup_seconds": warmup_seconds,
+        "stages": summary,
+        "wall_seconds": {"min": min(totals), "median": statistics.median(totals)},
+        "peak_rss_kb": peak_rss_kb(),
+        "output_bytes": output_bytes,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except Exception:
+        return None
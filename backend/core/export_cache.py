@@ -0,0 +1,183 @@
+# core/export_cache.py
+
+import hashlib
+import functools
+
+from django.conf import settings
+from django.core.files.base import File
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import ExportCacheEntry, ExportFragment
+from .export_context import export_date
+
+EXPORT_TEMPLATE = "export/property_export.html"
+EXPORT_TEMPLATE_PARTS = (
+    EXPORT_TEMPLATE,
+    "export/property_fragment.html",
+    "export/_cover.html",
+    "export/_section.html",
+    "export/_no_sections.html",
+    "export/_footer.html",
+    "export/property_export.css",
+)
+
+# Bump when the export context or renderer changes in a way that alters
+# the PDF without touching the template source.
+RENDERER_VERSION = 2
+
+
+@functools.lru_cache(maxsize=None)
+def template_version():
+    """Hash of the export template sources, computed once per process."""
+    digest = hashlib.sha256()
+    for name in EXPORT_TEMPLATE_PARTS:
+        digest.update(get_template(name).template.source.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def export_fingerprint(prop, base_url):
+    """
+    Content address of a property export. The revision covers the property
+    and all of its sections, documents, images and notes; base_url is part
+    of the key because the PDF embeds absolute links. Section-parallel
+    exports paginate differently, so the layout mode is part of it too,
+    and the date is because the PDF prints the day it was generated.
+    """
+    layout = "sections" if getattr(settings, "EXPORT_SECTION_WORKERS", 0) > 0 else "single"
+    key = (
+        f"{prop.pk}:{prop.revision}:{base_url}:{template_version()}:{RENDERER_VERSION}:"
+        f"{layout}:{export_date().isoformat()}"
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def get_cached_export(prop, base_url):
+    """Return the cache entry for the current revision, or None."""
+    fingerprint = export_fingerprint(prop, base_url)
+    entry = ExportCacheEntry.objects.filter(fingerprint=fingerprint).first()
+    if entry is None:
+        return None
+
+    if not entry.file.storage.exists(entry.file.name):
+        # Artifact vanished from disk; forget about it
+        entry.delete()
+        return None
+
+    now = timezone.now()
+    ExportCacheEntry.objects.filter(pk=entry.pk).update(last_accessed_at=now)
+    entry.last_accessed_at = now
+    return entry
+
+
+def store_export(prop, base_url, pdf_file):
+    """
+    Save a rendered PDF (a file object, copied in chunks) for the current
+    revision and enforce the disk budget.
+    """
+    fingerprint = export_fingerprint(prop, base_url)
+
+    content = File(pdf_file)
+    entry = ExportCacheEntry(
+        property=prop,
+        fingerprint=fingerprint,
+        revision=prop.revision,
+        size=content.size,
+    )
+    entry.file.save(f"{fingerprint}.pdf", content, save=False)
+    try:
+        with transaction.atomic():
+            entry.save()
+    except IntegrityError:
+        # Another worker rendered the same revision first
+        entry.file.delete(save=False)
+        return ExportCacheEntry.objects.get(fingerprint=fingerprint)
+
+    # Older revisions of this property can never be requested again
+    for stale in ExportCacheEntry.objects.filter(
+        property=prop, revision__lt=prop.revision
+    ):
+        stale.delete()
+
+    # Never evict the artifact the caller is about to serve
+    evict_export_cache(keep=entry)
+    return entry
+
+
+def evict_export_cache(max_bytes=None, keep=None):
+    """
+    Delete least recently used artifacts until the cache fits in
+    EXPORT_CACHE_MAX_BYTES. Returns the number of entries removed.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, "EXPORT_CACHE_MAX_BYTES", 1024 ** 3)
+
+    total = ExportCacheEntry.objects.aggregate(total=Sum("size"))["total"] or 0
+    removed = 0
+
+    candidates = ExportCacheEntry.objects.order_by("last_accessed_at")
+    if keep is not None:
+        candidates = candidates.exclude(pk=keep.pk)
+
+    for entry in candidates.iterator():
+        if total <= max_bytes:
+            break
+        total -= entry.size
+        entry.delete()
+        removed += 1
+
+    return removed
+
+
+def fragment_fingerprint(prop, html_string):
+    """
+    Content address of one export fragment. The fragment's HTML already
+    holds everything it shows (titles, files, notes, links); the template
+    version covers stylesheet changes that do not alter the HTML. Keys are
+    per property, so pruning one property's fragments never touches another's.
+    """
+    digest = hashlib.sha256(
+        f"{prop.pk}:{template_version()}:{RENDERER_VERSION}:".encode("utf-8")
+    )
+    digest.update(html_string.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_cached_fragments(fingerprints):
+    """Return {fingerprint: ExportFragment} for those fragments still on disk."""
+    found = {}
+    for fragment in ExportFragment.objects.filter(fingerprint__in=set(fingerprints)):
+        if fragment.file.storage.exists(fragment.file.name):
+            found[fragment.fingerprint] = fragment
+        else:
+            fragment.delete()
+    return found
+
+
+def store_fragment(prop, fingerprint, pdf_file, pages, bookmarks):
+    """Save a rendered fragment (a file object) under its fingerprint."""
+    content = File(pdf_file)
+    fragment = ExportFragment(
+        property=prop,
+        fingerprint=fingerprint,
+        pages=pages,
+        bookmarks=bookmarks,
+        size=content.size,
+    )
+    fragment.file.save(f"{fingerprint}.pdf", content, save=False)
+    try:
+        with transaction.atomic():
+            fragment.save()
+    except IntegrityError:
+        # A concurrent export rendered the same fragment
+        fragment.file.delete(save=False)
+        return ExportFragment.objects.get(fingerprint=fingerprint)
+    return fragment
+
+
+def prune_fragments(prop, keep):
+    """Delete the property's fragments that are not in the ``keep`` fingerprints."""
+    for stale in ExportFragment.objects.filter(property=prop).exclude(fingerprint__in=set(keep)):
+        stale.delete()
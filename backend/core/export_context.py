@@ -0,0 +1,123 @@
+# core/export_context.py
+
+import os
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urljoin
+
+from .document_utils import get_document_preview_summary
+
+
+def export_date():
+    """
+    The "Generated On" date printed in exports. Exports show the day only,
+    so a cached PDF (keyed on this date) stays accurate until midnight.
+    """
+    return datetime.now().date()
+
+
+def bucket_by_section(items):
+    """Group already-ordered items by section_id in a single pass."""
+    buckets = defaultdict(list)
+    for item in items:
+        buckets[item.section_id].append(item)
+    return buckets
+
+
+def document_data(doc, base_url):
+    return {
+        "filename": os.path.basename(doc.file.name),
+        "uploaded": doc.uploaded_at.strftime("%Y-%m-%d"),
+        "url":      urljoin(base_url, doc.file.url),
+        "preview":  get_document_preview_summary(doc, base_url=base_url),
+    }
+
+
+def image_data(img, base_url):
+    # Prefer the print-sized derivative when it exists
+    embedded = img.print_image or img.image
+    return {
+        "filename": os.path.basename(img.image.name),
+        "uploaded": img.uploaded_at.strftime("%Y-%m-%d"),
+        "url":      urljoin(base_url, embedded.url),
+    }
+
+
+def note_data(note):
+    return {
+        "content": note.content,
+        "created": note.created_at.strftime("%Y-%m-%d"),
+    }
+
+
+def section_data(title, docs, images, notes, base_url):
+    return {
+        "title":     title,
+        "documents": [document_data(d, base_url) for d in docs],
+        "images":    [image_data(i, base_url) for i in images],
+        "notes":     [note_data(n) for n in notes],
+    }
+
+
+def load_export_items(prop):
+    """
+    Fetch a property's sections, documents, images and notes with one
+    query each, ordered the way the report lists them.
+    """
+    return (
+        list(prop.sections.order_by("created_at", "id")),
+        list(prop.documents.order_by("uploaded_at", "id")),
+        list(prop.images.order_by("uploaded_at", "id")),
+        list(prop.notes.order_by("created_at", "id")),
+    )
+
+
+def build_export_context(prop, user, base_url, items=None):
+    """
+    Gather everything the export template needs for one property.
+    ``base_url`` is the absolute site root used to build links; ``items``
+    may carry the result of load_export_items() if already fetched.
+
+    Items are bucketed by section in one pass, so the cost is linear in
+    the number of sections plus items. Items that belong to no section
+    (or to one that no longer exists) are returned as ``unsectioned_data``.
+    """
+    sections, docs, images, notes = items or load_export_items(prop)
+
+    doc_buckets   = bucket_by_section(docs)
+    image_buckets = bucket_by_section(images)
+    note_buckets  = bucket_by_section(notes)
+
+    sections_data = [
+        section_data(
+            sec.title,
+            doc_buckets.get(sec.id, ()),
+            image_buckets.get(sec.id, ()),
+            note_buckets.get(sec.id, ()),
+            base_url,
+        )
+        for sec in sections
+    ]
+
+    section_ids = {sec.id for sec in sections}
+    loose_docs   = [d for d in docs if d.section_id not in section_ids]
+    loose_images = [i for i in images if i.section_id not in section_ids]
+    loose_notes  = [n for n in notes if n.section_id not in section_ids]
+
+    unsectioned_data = None
+    if loose_docs or loose_images or loose_notes:
+        unsectioned_data = section_data(
+            "General", loose_docs, loose_images, loose_notes, base_url
+        )
+
+    return {
+        "property":         prop,
+        "sections_data":    sections_data,
+        "unsectioned_data": unsectioned_data,
+        "total_documents":  len(docs),
+        "total_images":     len(images),
+        "total_notes":      len(notes),
+        "total_sections":   len(sections),
+        "export_user":      user,
+        "export_date":      export_date(),
+    }
@@ -0,0 +1,110 @@
+# core/export_fetcher.py
+
+import os
+import mmap
+import posixpath
+import logging
+import mimetypes
+from urllib.parse import urlsplit, unquote
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+logger = logging.getLogger(__name__)
+
+
+def _url_prefix(url):
+    """Normalise MEDIA_URL / STATIC_URL to an absolute path prefix."""
+    path = urlsplit(url).path
+    if not path.startswith("/"):
+        path = "/" + path
+    if not path.endswith("/"):
+        path += "/"
+    return path
+
+
+def _safe_join(root, relative):
+    """Join ``relative`` under ``root``; None if it escapes the root."""
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, relative))
+    if path != root and path.startswith(root + os.sep):
+        return path
+    return None
+
+
+class LocalURLFetcher:
+    """
+    WeasyPrint url_fetcher that serves our own media and static files
+    straight from disk instead of downloading them back over HTTP.
+
+    Anything that is not ours (other hosts, data: URIs, missing files)
+    goes through WeasyPrint's default fetcher.
+    """
+
+    def __init__(self, base_url=None):
+        self.host = urlsplit(base_url).netloc if base_url else ""
+        # (url prefix, directory, fall back to staticfiles finders)
+        self.roots = [(_url_prefix(settings.MEDIA_URL), settings.MEDIA_ROOT, False)]
+        if settings.STATIC_URL:
+            self.roots.append(
+                (_url_prefix(settings.STATIC_URL), settings.STATIC_ROOT, True)
+            )
+        self.local_count = 0
+        self.remote_count = 0
+
+    def resolve(self, url):
+        """Return the filesystem path for ``url`` or None if it is not local."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("", "http", "https"):
+            return None
+        if parts.netloc and parts.netloc != self.host:
+            return None
+
+        path = unquote(parts.path)
+        for prefix, root, use_finders in self.roots:
+            if not path.startswith(prefix):
+                continue
+            relative = path[len(prefix):]
+            normalized = posixpath.normpath(relative)
+            if normalized == ".." or normalized.startswith(("../", "/")):
+                # Escapes the root; the staticfiles finders would raise on it
+                return None
+            candidate = _safe_join(root, relative) if root else None
+            if candidate and os.path.isfile(candidate):
+                return candidate
+            if use_finders:
+                # Not collected yet (e.g. in development)
+                found = finders.find(relative)
+                if found:
+                    return found
+        return None
+
+    def __call__(self, url, timeout=10, ssl_context=None, **kwargs):
+        path = self.resolve(url)
+        if path is None:
+            if not url.startswith("data:"):
+                self.remote_count += 1
+            from weasyprint import default_url_fetcher
+            return default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+
+        self.local_count += 1
+        mime_type, _ = mimetypes.guess_type(path)
+        result = {
+            "mime_type": mime_type,
+            "redirected_url": url,
+            "filename": os.path.basename(path),
+        }
+
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                result["string"] = b""
+            else:
+                # WeasyPrint closes file_obj when done, which unmaps it
+                result["file_obj"] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return result
+
+    def log_summary(self, label):
+        logger.info(
+            f"{label}: {self.local_count} resource(s) served from disk, "
+            f"{self.remote_count} fetched remotely"
+        )
@@ -0,0 +1,140 @@
+# core/export_renderer.py
+
+import logging
+import threading
+import time
+
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+EXPORT_STYLESHEET = "export/property_export.css"
+
+# Fragments of a section-parallel export carry no page numbers of their
+# own; core/pdf_merge.py stamps them once the page total is known.
+FRAGMENT_STYLESHEET = "@page { @bottom-center { content: none; } }"
+
+# CSS pixels to PDF points
+PDF_SCALE = 0.75
+
+
+class PDFRenderer:
+    """
+    Process-wide WeasyPrint renderer. The import, fontconfig scan and
+    stylesheet parse happen once (in warm_up) instead of on every export;
+    later renders reuse the parsed CSS and font configuration.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.font_config = None
+        self.stylesheets = None
+        self.fragment_stylesheets = None
+        self.warmup_seconds = None
+        self.warm_renders = 0
+        self.cold_renders = 0
+        self.last_render_seconds = None
+
+    @property
+    def is_warm(self):
+        return self.stylesheets is not None
+
+    def warm_up(self):
+        """Import WeasyPrint and parse the export stylesheet. Safe to call repeatedly."""
+        if self.is_warm:
+            return
+
+        with self._lock:
+            if self.is_warm:
+                return
+
+            start = time.perf_counter()
+
+            # Import weasyprint here to avoid startup issues
+            from weasyprint import CSS, HTML
+            from weasyprint.text.fonts import FontConfiguration
+
+            font_config = FontConfiguration()
+            source = get_template(EXPORT_STYLESHEET).template.source
+            stylesheets = [CSS(string=source, font_config=font_config)]
+
+            # Lay out a tiny document so pango/fontconfig load their caches now
+            HTML(string="<p>SellerPrep</p>").render(
+                stylesheets=stylesheets, font_config=font_config
+            )
+
+            self.font_config = font_config
+            self.fragment_stylesheets = stylesheets + [
+                CSS(string=FRAGMENT_STYLESHEET, font_config=font_config)
+            ]
+            self.stylesheets = stylesheets
+            self.warmup_seconds = time.perf_counter() - start
+            logger.info(f"PDF renderer warmed up in {self.warmup_seconds:.2f}s")
+
+    def layout(self, html_string, base_url, url_fetcher, fragment=False):
+        """Lay out ``html_string`` and return the paginated WeasyPrint Document."""
+        self.warm_up()
+
+        from weasyprint import HTML
+        return HTML(
+            string=html_string,
+            base_url=base_url,
+            url_fetcher=url_fetcher,
+        ).render(
+            stylesheets=self.fragment_stylesheets if fragment else self.stylesheets,
+            font_config=self.font_config,
+        )
+
+    def write_pdf(self, html_string, base_url, target, url_fetcher):
+        """Render ``html_string`` into the file object ``target``."""
+        cold = not self.is_warm
+        start = time.perf_counter()
+
+        self.layout(html_string, base_url, url_fetcher).write_pdf(target)
+
+        self.last_render_seconds = time.perf_counter() - start
+        if cold:
+            self.cold_renders += 1
+        else:
+            self.warm_renders += 1
+
+    def write_fragment(self, html_string, base_url, target, url_fetcher):
+        """
+        Render one fragment of a section-parallel export into ``target``.
+        Returns its page count and bookmarks as (level, label, page index,
+        x, y, state), with coordinates already in PDF points.
+        """
+        document = self.layout(html_string, base_url, url_fetcher, fragment=True)
+        document.write_pdf(target)
+
+        bookmarks = []
+        for index, page in enumerate(document.pages):
+            for level, label, (x, y), state in page.bookmarks:
+                bookmarks.append((
+                    level, label, index,
+                    x * PDF_SCALE, (page.height - y) * PDF_SCALE, state,
+                ))
+        return {"pages": len(document.pages), "bookmarks": bookmarks}
+
+    def stats(self):
+        return {
+            "warm": self.is_warm,
+            "warmup_seconds": self.warmup_seconds,
+            "warm_renders": self.warm_renders,
+            "cold_renders": self.cold_renders,
+            "last_render_seconds": self.last_render_seconds,
+        }
+
+
+renderer = PDFRenderer()
+
+
+def warm_up_in_background():
+    """Warm the renderer without delaying process startup."""
+    def run():
+        try:
+            renderer.warm_up()
+        except Exception as e:
+            logger.error(f"PDF renderer warm-up failed: {str(e)}")
+
+    threading.Thread(target=run, name="pdf-renderer-warmup", daemon=True).start()
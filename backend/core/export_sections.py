@@ -0,0 +1,159 @@
+# core/export_sections.py
+#
+# Section-parallel export: the cover and every section are laid out as
+# separate PDF fragments in a pool of render processes, then merged into
+# one report. Layout is WeasyPrint's single-threaded hot spot, so a large
+# property's export time divides by the number of workers. Fragments are
+# cached by content, so a re-export only lays out the sections that
+# changed. Each section starts on a fresh page in this mode.
+
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .export_cache import (
+    fragment_fingerprint,
+    get_cached_fragments,
+    prune_fragments,
+    store_fragment,
+)
+from .export_context import build_export_context
+from .export_workers import init_render_worker, render_export_fragment
+from .pdf_merge import PDFMerger
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_TEMPLATE = "export/property_fragment.html"
+PAGE_NUMBER_FORMAT = "Page {page} of {pages}"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def section_workers():
+    """Render processes for section-parallel exports; 0 disables the mode."""
+    return getattr(settings, "EXPORT_SECTION_WORKERS", 0)
+
+
+def _fragment_pool():
+    # One long-lived pool per process: spawning and warming workers costs
+    # more than a small export, so it is paid once rather than per request.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=section_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_render_worker,
+            )
+        return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def plan_fragments(context):
+    """
+    Split a build_export_context() result into per-fragment contexts, in
+    document order: the cover, each section, unsectioned items, then the
+    footer. Cover and footer show the export time, so keeping them apart
+    leaves section fragments unchanged from one export to the next.
+    """
+    fragments = [dict(context, fragment_cover=True)]
+    for sec in context["sections_data"]:
+        fragments.append(dict(context, fragment_section=sec))
+    if context["unsectioned_data"]:
+        fragments.append(dict(context, fragment_section=context["unsectioned_data"]))
+
+    if len(fragments) == 1:
+        fragments[0]["fragment_footer"] = True
+    else:
+        fragments.append(dict(context, fragment_footer=True))
+    return fragments
+
+
+def _render_fragments(prop, base_url, html_by_fingerprint):
+    """Render the given fragments in the pool and store them; returns {fingerprint: ExportFragment}."""
+    rendered = {}
+    with tempfile.TemporaryDirectory(prefix="sellerprep-export-") as workdir:
+        paths = {
+            fingerprint: os.path.join(workdir, f"{fingerprint}.pdf")
+            for fingerprint in html_by_fingerprint
+        }
+        pool = _fragment_pool()
+        try:
+            futures = {
+                fingerprint: pool.submit(
+                    render_export_fragment, html_string, base_url, paths[fingerprint]
+                )
+                for fingerprint, html_string in html_by_fingerprint.items()
+            }
+            results = {fingerprint: future.result() for fingerprint, future in futures.items()}
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start fresh next time
+            _discard_pool()
+            raise
+
+        for fingerprint, result in results.items():
+            with open(paths[fingerprint], "rb") as f:
+                rendered[fingerprint] = store_fragment(
+                    prop, fingerprint, f, result["pages"], result["bookmarks"]
+                )
+    return rendered
+
+
+def render_property_pdf_by_section(prop, user, base_url, target):
+    """
+    Render the property report fragment by fragment, writing the merged
+    PDF into ``target``. Fragments whose HTML is unchanged since an earlier
+    export are reused from the fragment cache; only the rest are laid out.
+    """
+    context = build_export_context(prop, user, base_url)
+    html_strings = [
+        render_to_string(FRAGMENT_TEMPLATE, fragment)
+        for fragment in plan_fragments(context)
+    ]
+    fingerprints = [fragment_fingerprint(prop, html_string) for html_string in html_strings]
+
+    fragments = get_cached_fragments(fingerprints)
+    dirty = {
+        fingerprint: html_string
+        for fingerprint, html_string in zip(fingerprints, html_strings)
+        if fingerprint not in fragments
+    }
+    if dirty:
+        fragments.update(_render_fragments(prop, base_url, dirty))
+
+    merger = PDFMerger(page_numbers=PAGE_NUMBER_FORMAT)
+    bookmarks = []
+    for fingerprint in fingerprints:
+        fragment = fragments[fingerprint]
+        with fragment.file.storage.open(fragment.file.name, "rb") as f:
+            first_page = merger.append(f.read())
+        bookmarks.extend(
+            (level, label, first_page + page, x, y, state)
+            for level, label, page, x, y, state in fragment.bookmarks
+        )
+    merger.add_outline(bookmarks)
+    merger.write(target)
+
+    # Only the current set can be reused; older section versions are dead
+    prune_fragments(prop, keep=fingerprints)
+
+    logger.info(
+        f"Export of property {prop.id}: {len(fingerprints)} fragments "
+        f"({len(dirty)} rendered, {len(fingerprints) - len(dirty)} reused), "
+        f"{merger.page_count} pages"
+    )
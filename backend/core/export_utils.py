@@ -0,0 +1,193 @@
+# core/export_utils.py
+
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import ExportCacheEntry, ExportJob
+from .export_cache import EXPORT_TEMPLATE, get_cached_export, store_export
+from .export_fetcher import LocalURLFetcher
+from .export_renderer import renderer
+from .export_context import build_export_context
+from .export_sections import render_property_pdf_by_section, section_workers
+from .entitlement_utils import has_account_entitlement
+from .email_utils import send_export_confirmation
+from .profile_utils import get_user_profile
+
+logger = logging.getLogger(__name__)
+
+# A running job older than this is assumed to belong to a worker that died.
+STALE_JOB_SECONDS = 15 * 60
+MAX_JOB_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 60
+
+
+def render_property_pdf(prop, user, base_url, target):
+    """Render the property report, writing the PDF into the file object ``target``."""
+    if section_workers() > 0:
+        return render_property_pdf_by_section(prop, user, base_url, target)
+
+    html_string = render_to_string(
+        EXPORT_TEMPLATE,
+        build_export_context(prop, user, base_url),
+    )
+
+    fetcher = LocalURLFetcher(base_url)
+    renderer.write_pdf(html_string, base_url, target, url_fetcher=fetcher)
+    fetcher.log_summary(f"Export of property {prop.id}")
+
+
+def get_export_artifact(prop, user, base_url):
+    """
+    Return the ExportCacheEntry holding the PDF for the property's current
+    revision, rendering it only on a cache miss. The PDF is spooled to a
+    temporary file while rendering, so it never sits in memory whole.
+    """
+    entry = get_cached_export(prop, base_url)
+    if entry is not None:
+        return entry
+
+    max_memory = getattr(settings, "EXPORT_SPOOL_MAX_MEMORY", 8 * 1024 * 1024)
+    with tempfile.SpooledTemporaryFile(max_size=max_memory) as spool:
+        render_property_pdf(prop, user, base_url, spool)
+        spool.seek(0)
+        return store_export(prop, base_url, spool)
+
+
+def record_export(user, prop, notify=True):
+    """Bookkeeping shared by the synchronous export and the export worker."""
+    user_profile = get_user_profile(user)
+
+    # Increment export count if this is a first free export
+    if user_profile.properties_exported == 0 and has_account_entitlement(user):
+        user_profile.properties_exported += 1
+        user_profile.save()
+
+    if not notify:
+        return
+
+    try:
+        send_export_confirmation(user, prop.address)
+    except Exception as e:
+        pass
+
+
+def queue_export_job(prop, user, base_url):
+    """
+    Create an ExportJob for the worker. When the current revision is already
+    in the export cache the job is completed on the spot.
+    """
+    entry = get_cached_export(prop, base_url)
+    if entry is None:
+        return ExportJob.objects.create(user=user, property=prop, base_url=base_url)
+
+    # Created as running so a worker never claims it
+    job = ExportJob.objects.create(
+        user=user,
+        property=prop,
+        base_url=base_url,
+        status='running',
+        started_at=timezone.now(),
+        attempts=1,
+    )
+    _finish_export_job(job, entry)
+
+    return job
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts."""
+    return timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def claim_next_export_job():
+    """
+    Atomically mark the oldest runnable job as running and return it.
+    Jobs left running by a dead worker are picked up again once stale, or
+    failed if that was their last attempt. Returns None when the queue is empty.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=STALE_JOB_SECONDS)
+
+    with transaction.atomic():
+        ExportJob.objects.filter(
+            status='running', started_at__lt=stale_before, attempts__gte=MAX_JOB_ATTEMPTS
+        ).update(
+            status='failed',
+            error='The export worker stopped while rendering',
+            finished_at=now,
+        )
+
+        job = (
+            ExportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status='pending', run_after__lte=now) |
+                Q(status='running', started_at__lt=stale_before)
+            )
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = 'running'
+        job.started_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+
+    return job
+
+
+def run_export_job(job):
+    """Render a claimed job and store the finished PDF on it."""
+    try:
+        entry = get_export_artifact(job.property, job.user, job.base_url)
+    except Exception as e:
+        logger.exception(f"Export job {job.id} failed")
+        job.error = str(e)
+        if job.attempts >= MAX_JOB_ATTEMPTS:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        else:
+            job.status = 'pending'
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+        job.save(update_fields=['status', 'error', 'finished_at', 'run_after'])
+        return job
+
+    _finish_export_job(job, entry)
+    return job
+
+
+def _finish_export_job(job, entry):
+    job.cache_entry = entry
+    job.status = 'succeeded'
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['cache_entry', 'status', 'error', 'finished_at'])
+
+    record_export(job.user, job.property)
+
+
+def export_job_artifact(job):
+    """
+    The cache entry holding a finished job's PDF. Entries may be evicted
+    (or replaced by a newer revision) at any time; the property is then
+    rendered again.
+    """
+    entry = job.cache_entry
+    if entry is not None and entry.file.storage.exists(entry.file.name):
+        now = timezone.now()
+        ExportCacheEntry.objects.filter(pk=entry.pk).update(last_accessed_at=now)
+        return entry
+
+    entry = get_export_artifact(job.property, job.user, job.base_url)
+    ExportJob.objects.filter(pk=job.pk).update(cache_entry=entry)
+    job.cache_entry = entry
+    return entry
@@ -0,0 +1,46 @@
+# core/export_workers.py
+#
+# Entry points for export render processes. This module is imported by
+# freshly spawned interpreters before Django is set up, so it must not
+# import models (or anything that does) at module level.
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+def init_render_worker():
+    """ProcessPoolExecutor initializer: boot Django and warm the renderer."""
+    import django
+    django.setup()
+
+    # A failing initializer would break the whole pool; let each render
+    # report its own error instead.
+    from .export_renderer import renderer
+    try:
+        renderer.warm_up()
+    except Exception as e:
+        logger.error(f"PDF renderer warm-up failed: {str(e)}")
+
+
+def render_export_artifact(property_id, user_id, base_url):
+    """Render (or find cached) the export for one property; returns the cache entry id."""
+    from django.contrib.auth.models import User
+    from django.db import close_old_connections
+
+    from .models import Property
+    from .export_utils import get_export_artifact
+
+    close_old_connections()
+    prop = Property.objects.get(pk=property_id)
+    user = User.objects.get(pk=user_id)
+    return get_export_artifact(prop, user, base_url).pk
+
+
+def render_export_fragment(html_string, base_url, path):
+    """Render one fragment of a section-parallel export to ``path``."""
+    from .export_fetcher import LocalURLFetcher
+    from .export_renderer import renderer
+
+    fetcher = LocalURLFetcher(base_url)
+    with open(path, "wb") as target:
+        return renderer.write_fragment(html_string, base_url, target, url_fetcher=fetcher)
@@ -0,0 +1,134 @@
+# core/http_utils.py
+
+import hashlib
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _parse_range(header, size):
+    """
+    Return (start, end) for a single ``bytes=`` range, None when the header
+    is absent or not something we handle (whole file is sent), or
+    ``False`` when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or not size:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _read_range(f, start, length):
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def ranged_file_response(request, field_file, filename, content_type,
+                         as_attachment=True):
+    """
+    Stream a stored file to the client with Content-Length, honouring a
+    single-range ``Range`` request header with a 206 response.
+    """
+    size = field_file.size
+    byte_range = _parse_range(request.META.get("HTTP_RANGE"), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    f = field_file.storage.open(field_file.name, "rb")
+
+    if byte_range is None:
+        response = FileResponse(
+            f,
+            as_attachment=as_attachment,
+            filename=filename,
+            content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(f, start, length),
+            status=206,
+            content_type=content_type
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Disposition"] = content_disposition_header(
+            as_attachment, filename
+        )
+
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def revision_validators(request, rows):
+    """
+    ETag and Last-Modified for a response built from the properties in
+    ``rows`` ((id, revision, updated_at) tuples). Every write under a
+    property bumps its revision, so these change exactly when the
+    response would, without rendering it. Host and query string are part
+    of the tag because they change the body (absolute URLs, filters).
+    """
+    digest = hashlib.sha256(f"{request.get_host()}{request.get_full_path()}".encode("utf-8"))
+    for pk, revision, updated_at in rows:
+        digest.update(f"|{pk}:{revision}".encode("ascii"))
+    last_modified = max((row[2] for row in rows if row[2]), default=None)
+    return quote_etag(digest.hexdigest()[:32]), last_modified
+
+
+def conditional_read(request, rows, render, collection=False):
+    """
+    Answer 304 when the client's If-None-Match / If-Modified-Since still
+    hold for ``rows``; otherwise call ``render()`` and tag its response.
+
+    Collections get no Last-Modified: deleting a property drops its row
+    without moving the newest ``updated_at`` forward, so only the ETag
+    (which covers the set of ids) notices.
+    """
+    etag, last_modified = revision_validators(request, rows)
+    timestamp = int(last_modified.timestamp()) if last_modified and not collection else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+
+    response["ETag"] = etag
+    if timestamp is not None:
+        response["Last-Modified"] = http_date(timestamp)
+    # Bodies differ per signed-in user
+    patch_vary_headers(response, ["Authorization"])
+    return response
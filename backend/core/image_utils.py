@@ -0,0 +1,95 @@
+# core/image_utils.py
+
+import os
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+# The export lays photos out in `.image-item img` boxes roughly 3.2in wide
+# and 160px (~1.7in) tall; anything beyond this bound at print DPI is wasted.
+PRINT_DPI = 200
+PRINT_BOX_INCHES = (3.5, 1.75)
+PRINT_JPEG_QUALITY = 85
+
+
+def print_box_pixels():
+    return tuple(int(inches * PRINT_DPI) for inches in PRINT_BOX_INCHES)
+
+
+def make_print_derivative(image_file):
+    """
+    Return a downscaled JPEG of ``image_file`` sized for the export layout,
+    with EXIF orientation applied and all metadata dropped.
+    """
+    from PIL import Image, ImageOps
+
+    max_w, max_h = print_box_pixels()
+    image_file.open("rb")
+    try:
+        with Image.open(image_file) as im:
+            # Let the JPEG decoder skip detail we will throw away. Use the
+            # larger side for both bounds since EXIF may rotate the image.
+            side = max(max_w, max_h)
+            im.draft("RGB", (side, side))
+            im = ImageOps.exif_transpose(im)
+
+            if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+                im = im.convert("RGBA")
+                background = Image.new("RGB", im.size, (255, 255, 255))
+                background.paste(im, mask=im.getchannel("A"))
+                im = background
+            elif im.mode != "RGB":
+                im = im.convert("RGB")
+
+            im.thumbnail((max_w, max_h), Image.LANCZOS)
+
+            buffer = BytesIO()
+            # No exif/icc_profile arguments, so no metadata is carried over
+            im.save(
+                buffer,
+                "JPEG",
+                quality=PRINT_JPEG_QUALITY,
+                optimize=True,
+                progressive=True,
+                dpi=(PRINT_DPI, PRINT_DPI),
+            )
+    finally:
+        image_file.close()
+
+    return ContentFile(buffer.getvalue())
+
+
+def generate_print_image(property_image):
+    """
+    (Re)build the print derivative for a PropertyImage and store it.
+    Returns True on success; failures are logged and the export falls back
+    to the original image.
+    """
+    from .models import PropertyImage
+
+    if not property_image.image:
+        return False
+
+    try:
+        content = make_print_derivative(property_image.image)
+    except Exception as e:
+        logger.error(f"Print derivative failed for image {property_image.id}: {str(e)}")
+        return False
+
+    old_name = property_image.print_image.name if property_image.print_image else None
+
+    stem = os.path.splitext(os.path.basename(property_image.image.name))[0]
+    property_image.print_image.save(f"{stem}_print.jpg", content, save=False)
+
+    # Queryset update so the save signals (and revision bump) don't fire again
+    PropertyImage.objects.filter(pk=property_image.pk).update(
+        print_image=property_image.print_image.name
+    )
+
+    if old_name and old_name != property_image.print_image.name:
+        property_image.print_image.storage.delete(old_name)
+
+    return True
@@ -0,0 +1,62 @@
+# core/management/commands/backfill_file_metadata.py
+
+from django.core.management.base import BaseCommand
+
+from core.models import Document, PropertyImage
+from core.document_utils import extract_file_metadata
+
+METADATA_FIELDS = ['file_size', 'mime_type', 'content_hash', 'width', 'height']
+
+
+class Command(BaseCommand):
+    help = 'Record size, MIME type, hash and dimensions for uploads that predate them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Recompute metadata for every row, not only missing ones'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Rows read and written per database round-trip'
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name in ((Document, 'file'), (PropertyImage, 'image')):
+            rows = model.objects.order_by('id')
+            if not options['force']:
+                rows = rows.filter(file_size__isnull=True)
+
+            updated, missing = self.backfill(model, field_name, rows, options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model.__name__}: updated {updated} row(s), {missing} file(s) missing'
+            ))
+
+    def backfill(self, model, field_name, rows, chunk_size):
+        batch = []
+        updated = 0
+        missing = 0
+
+        for row in rows.iterator(chunk_size=chunk_size):
+            field_file = getattr(row, field_name)
+            try:
+                metadata = extract_file_metadata(field_file)
+            except (OSError, ValueError):
+                missing += 1
+                self.stdout.write(self.style.WARNING(f'Missing file: {field_file.name}'))
+                continue
+
+            for key, value in metadata.items():
+                setattr(row, key, value)
+            batch.append(row)
+
+            if len(batch) >= chunk_size:
+                model.objects.bulk_update(batch, METADATA_FIELDS)
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            model.objects.bulk_update(batch, METADATA_FIELDS)
+            updated += len(batch)
+
+        return updated, missing
@@ -0,0 +1,73 @@
+# core/management/commands/benchmark_export.py
+
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from core.export_benchmark import benchmark_export, generate_synthetic_property
+
+
+class Command(BaseCommand):
+    help = 'Time each stage of the PDF export on a synthetic property and print JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=10)
+        parser.add_argument('--documents', type=int, default=3, help='Documents per section')
+        parser.add_argument('--images', type=int, default=4, help='Images per section')
+        parser.add_argument('--notes', type=int, default=3, help='Notes per section')
+        parser.add_argument('--image-width', type=int, default=2400)
+        parser.add_argument('--image-height', type=int, default=1800)
+        parser.add_argument('--document-kb', type=int, default=250, help='Size of each document')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skip-pdf', action='store_true',
+            help='Only time queries, context and template (no WeasyPrint)'
+        )
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        # Synthetic uploads go to a throwaway media root and every row is
+        # rolled back, so the benchmark leaves no trace behind.
+        media_root = tempfile.mkdtemp(prefix='sellerprep-bench-')
+        try:
+            with override_settings(MEDIA_ROOT=media_root), transaction.atomic():
+                owner = User.objects.create_user(
+                    username='export-benchmark', email='benchmark@sellerprep.invalid'
+                )
+                prop = generate_synthetic_property(
+                    owner,
+                    sections=options['sections'],
+                    documents=options['documents'],
+                    images=options['images'],
+                    notes=options['notes'],
+                    image_size=(options['image_width'], options['image_height']),
+                    document_bytes=options['document_kb'] * 1024,
+                    seed=options['seed'],
+                )
+                try:
+                    report = benchmark_export(
+                        prop,
+                        owner,
+                        repeat=options['repeat'],
+                        include_pdf=not options['skip_pdf'],
+                    )
+                except OSError as e:
+                    raise CommandError(
+                        f'WeasyPrint could not render ({str(e)}); use --skip-pdf to '
+                        'benchmark the stages before layout'
+                    )
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,51 @@
+# core/management/commands/generate_print_images.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Property, PropertyImage
+from core.image_utils import generate_print_image
+
+
+class Command(BaseCommand):
+    help = 'Create print-resolution derivatives for property images that lack one'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate derivatives for every image, not only missing ones'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Rows fetched per database round-trip'
+        )
+
+    def handle(self, *args, **options):
+        images = PropertyImage.objects.order_by('id')
+        if not options['force']:
+            images = images.filter(Q(print_image__isnull=True) | Q(print_image=''))
+
+        created = 0
+        failed = 0
+        property_ids = set()
+        for image in images.iterator(chunk_size=options['chunk_size']):
+            if generate_print_image(image):
+                created += 1
+                property_ids.add(image.property_id)
+            else:
+                failed += 1
+                self.stdout.write(
+                    self.style.WARNING(f'Could not create derivative for image {image.id} ({image.image.name})')
+                )
+
+        # generate_print_image writes through queryset.update(), so bump the
+        # revisions here to retire cached exports built from the old files
+        Property.objects.filter(pk__in=property_ids).update(
+            revision=F('revision') + 1,
+            updated_at=timezone.now(),
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {created} print derivative(s), {failed} failure(s)')
+        )
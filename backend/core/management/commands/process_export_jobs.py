@@ -0,0 +1,59 @@
+# core/management/commands/process_export_jobs.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.export_renderer import renderer
+from core.export_utils import claim_next_export_job, run_export_job
+
+
+class Command(BaseCommand):
+    help = 'Render queued property PDF exports (run as a separate worker process)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the queue once and exit instead of polling forever'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=2.0,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--max-jobs', type=int, default=0,
+            help='Exit after processing this many jobs (0 = no limit)'
+        )
+
+    def handle(self, *args, **options):
+        # Pay the WeasyPrint import and font/CSS setup before the first job
+        renderer.warm_up()
+        self.stdout.write(f'PDF renderer warm ({renderer.warmup_seconds:.2f}s)')
+
+        processed = 0
+
+        while True:
+            job = claim_next_export_job()
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            job = run_export_job(job)
+            processed += 1
+
+            if job.status == 'succeeded':
+                self.stdout.write(
+                    self.style.SUCCESS(f'Export job {job.id} finished: {job.cache_entry.file.name}')
+                )
+            else:
+                self.stdout.write(
+                    self.style.ERROR(f'Export job {job.id} {job.status}: {job.error}')
+                )
+
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(f'Processed {processed} export job(s)')
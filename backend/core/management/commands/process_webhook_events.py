@@ -0,0 +1,47 @@
+# core/management/commands/process_webhook_events.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.webhook_events import claim_webhook_events, process_webhook_events
+
+
+class Command(BaseCommand):
+    help = 'Apply recorded Stripe webhook events in order per customer (run as a separate worker process)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Apply every due event once and exit instead of polling forever'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait between polls when nothing is due'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Events claimed per database round-trip'
+        )
+
+    def handle(self, *args, **options):
+        total_processed = 0
+        total_failed = 0
+
+        while True:
+            events = claim_webhook_events(options['batch_size'])
+
+            if not events:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            processed, failed = process_webhook_events(events)
+            total_processed += processed
+            total_failed += failed
+            self.stdout.write(f'Processed {processed} event(s), {failed} failed')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {total_processed} event(s), {total_failed} failed'
+        ))
@@ -0,0 +1,22 @@
+# core/management/commands/rebuild_export_entitlements.py
+
+from django.core.management.base import BaseCommand
+
+from core.entitlement_utils import rebuild_entitlements
+
+
+class Command(BaseCommand):
+    help = 'Recompute export entitlements from succeeded payments and subscription state'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Rows read and written per database round-trip'
+        )
+
+    def handle(self, *args, **options):
+        property_count, account_count = rebuild_entitlements(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {property_count} paid property entitlement(s) and '
+            f'{account_count} account-wide entitlement(s)'
+        ))
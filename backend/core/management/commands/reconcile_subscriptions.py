@@ -0,0 +1,52 @@
+# core/management/commands/reconcile_subscriptions.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.subscription_sync import (
+    FixtureSubscriptionClient,
+    StripeSubscriptionClient,
+    iter_subscriptions,
+    reconcile_subscriptions,
+)
+
+
+class Command(BaseCommand):
+    help = 'Update subscription status and tier of every profile from Stripe'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixtures', action='append', default=[],
+            help='Read subscriptions from this JSON file instead of the Stripe API; may be repeated'
+        )
+        parser.add_argument(
+            '--page-size', type=int, default=100,
+            help='Subscriptions fetched per Stripe API call (at most 100)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Profiles matched and updated per database round-trip'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report how many profiles would change without saving'
+        )
+
+    def handle(self, *args, **options):
+        if options['fixtures']:
+            client = FixtureSubscriptionClient(options['fixtures'])
+        elif settings.STRIPE_SECRET_KEY:
+            client = StripeSubscriptionClient()
+        else:
+            raise CommandError('STRIPE_SECRET_KEY is not set; pass --fixtures to use local data')
+
+        seen, updated, unknown = reconcile_subscriptions(
+            iter_subscriptions(client, min(options['page_size'], 100)),
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {updated} profile(s) from {seen} subscription(s); '
+            f'{unknown} customer(s) not found'
+        ))
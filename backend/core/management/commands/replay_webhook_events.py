@@ -0,0 +1,84 @@
+# core/management/commands/replay_webhook_events.py
+
+from datetime import datetime
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.models import WebhookEvent
+from core.webhook_events import load_event_file, record_webhook_event, replay_webhook_events
+
+
+class Command(BaseCommand):
+    help = 'Queue recorded Stripe webhook events to be applied again, or record events from a file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'event_ids', nargs='*',
+            help='Stripe event ids (evt_...) to replay'
+        )
+        parser.add_argument(
+            '--failed', action='store_true',
+            help='Replay every event that ran out of attempts'
+        )
+        parser.add_argument('--type', help='Only events of this type')
+        parser.add_argument('--customer', help='Only events for this Stripe customer id')
+        parser.add_argument(
+            '--since',
+            help='Only events Stripe created at or after this ISO 8601 date/time'
+        )
+        parser.add_argument(
+            '--file', action='append', default=[],
+            help='Record the events in this JSON file (a Stripe event, a list of '
+                 'events or a Stripe list response); may be repeated'
+        )
+        parser.add_argument(
+            '--process', action='store_true',
+            help='Apply queued events now instead of leaving them to the worker'
+        )
+
+    def handle(self, *args, **options):
+        recorded = 0
+        for path in options['file']:
+            for event in load_event_file(path):
+                row, created = record_webhook_event(event)
+                if created:
+                    recorded += 1
+                else:
+                    replay_webhook_events(WebhookEvent.objects.filter(pk=row.pk))
+        if options['file']:
+            self.stdout.write(f'Recorded {recorded} new event(s) from file')
+
+        filters = {}
+        if options['event_ids']:
+            filters['event_id__in'] = options['event_ids']
+        if options['failed']:
+            filters['status'] = 'failed'
+        if options['type']:
+            filters['type'] = options['type']
+        if options['customer']:
+            filters['customer_id'] = options['customer']
+        if options['since']:
+            filters['stripe_created__gte'] = self.parse_since(options['since'])
+
+        if filters:
+            queued = replay_webhook_events(WebhookEvent.objects.filter(**filters))
+            self.stdout.write(f'Queued {queued} event(s) for replay')
+        elif not options['file']:
+            raise CommandError('Give event ids, a filter (--failed, --type, --customer, --since) or --file')
+
+        if options['process']:
+            call_command('process_webhook_events', once=True, stdout=self.stdout)
+
+    def parse_since(self, value):
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f"Invalid --since value: {value}")
+            since = datetime.combine(day, datetime.min.time())
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
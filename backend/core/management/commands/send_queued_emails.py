@@ -0,0 +1,69 @@
+# core/management/commands/send_queued_emails.py
+
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from core.email_outbox import claim_email_batch, deliver_emails, fail_emails
+
+
+class Command(BaseCommand):
+    help = 'Send emails from the outbox over one reused connection (run as a separate worker process)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the outbox once and exit instead of polling forever'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=5.0,
+            help='Seconds to wait between polls when nothing is due'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Emails claimed per database round-trip'
+        )
+
+    def handle(self, *args, **options):
+        connection = None
+        total_sent = 0
+        total_failed = 0
+
+        try:
+            while True:
+                emails = claim_email_batch(options['batch_size'])
+
+                if not emails:
+                    # Don't hold an idle SMTP session open between polls
+                    if connection is not None:
+                        connection.close()
+                        connection = None
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+
+                if connection is None:
+                    connection = get_connection(fail_silently=False)
+                    try:
+                        connection.open()
+                    except Exception as e:
+                        # Mail server unreachable: retry the batch later
+                        self.stderr.write(f'Could not connect to the mail server: {e}')
+                        fail_emails(emails, e)
+                        total_failed += len(emails)
+                        connection = None
+                        continue
+
+                sent, failed = deliver_emails(emails, connection)
+                total_sent += sent
+                total_failed += failed
+                self.stdout.write(f'Sent {sent} email(s), {failed} failed')
+        finally:
+            if connection is not None:
+                connection.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {total_sent} email(s), {total_failed} failed'
+        ))
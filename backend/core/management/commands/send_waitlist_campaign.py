@@ -0,0 +1,50 @@
+# core/management/commands/send_waitlist_campaign.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.waitlist_campaign import CAMPAIGNS, pending_signups, send_waitlist_campaign
+
+
+class Command(BaseCommand):
+    help = 'Send a campaign email to the waitlist at a capped rate; safe to rerun after an interruption'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--campaign', choices=sorted(CAMPAIGNS), default='launch',
+            help='Campaign to send'
+        )
+        parser.add_argument(
+            '--rate', type=float, default=None,
+            help='Emails per second (default: WAITLIST_CAMPAIGN_RATE; 0 = unthrottled)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Waitlist rows fetched per database round-trip'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Recipients per saved batch of delivery statuses'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=0,
+            help='Stop after this many recipients (0 = no limit)'
+        )
+
+    def handle(self, *args, **options):
+        campaign = options['campaign']
+        rate = options['rate']
+        if rate is None:
+            rate = getattr(settings, 'WAITLIST_CAMPAIGN_RATE', 10.0)
+
+        owed = pending_signups(campaign).count()
+        self.stdout.write(f'{owed} waitlist signup(s) pending for "{campaign}" at {rate:g}/s')
+
+        sent, failed = send_waitlist_campaign(
+            campaign,
+            rate=rate,
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            limit=options['limit'] or None,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} email(s), {failed} failed'))
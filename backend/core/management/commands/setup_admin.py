@@ -3,6 +3,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from core.models import UserProfile
+from core.entitlement_utils import sync_account_entitlements
 
 
 class Command(BaseCommand):
@@ -15,6 +16,7 @@ class Command(BaseCommand):
             james_profile, created = UserProfile.objects.get_or_create(user=james_user)
             james_profile.user_type = 'admin'
             james_profile.save()
+            sync_account_entitlements(james_profile)
             
             if created:
                 self.stdout.write(
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_export_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="propertyimage",
+            name="print_image",
+            field=models.ImageField(
+                blank=True, null=True, upload_to="property_images/print/"
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_propertyimage_print_image"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["property", "uploaded_at"],
+                name="core_docume_propert_662955_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                fields=["property", "created_at"], name="core_note_propert_d308e9_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="propertyimage",
+            index=models.Index(
+                fields=["property", "uploaded_at"],
+                name="core_proper_propert_1cfea8_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(
+                fields=["property", "created_at"], name="core_sectio_propert_7bc8c3_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_file_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportFragment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=64, unique=True)),
+                ("file", models.FileField(upload_to="export_fragments/")),
+                ("pages", models.PositiveIntegerField()),
+                ("bookmarks", models.JSONField(default=list)),
+                ("size", models.BigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_fragments",
+                        to="core.property",
+                    ),
+                ),
+            ],
+        ),
+    ]
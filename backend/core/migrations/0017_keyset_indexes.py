@@ -0,0 +1,78 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_export_fragment"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="document",
+            name="core_docume_propert_662955_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="note",
+            name="core_note_propert_d308e9_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="propertyimage",
+            name="core_proper_propert_1cfea8_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="section",
+            name="core_sectio_propert_7bc8c3_idx",
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["property", "uploaded_at", "id"],
+                name="core_docume_propert_542007_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="document",
+            index=models.Index(
+                fields=["section", "uploaded_at", "id"],
+                name="core_docume_section_109ada_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                fields=["property", "created_at", "id"],
+                name="core_note_propert_0a313e_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                fields=["section", "created_at", "id"],
+                name="core_note_section_bd1b2d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="propertyimage",
+            index=models.Index(
+                fields=["property", "uploaded_at", "id"],
+                name="core_proper_propert_9a17f9_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="propertyimage",
+            index=models.Index(
+                fields=["section", "uploaded_at", "id"],
+                name="core_proper_section_26ca9a_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(
+                fields=["property", "created_at", "id"],
+                name="core_sectio_propert_223756_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="property",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
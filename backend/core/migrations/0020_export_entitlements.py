@@ -0,0 +1,126 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_entitlements(apps, schema_editor):
+    # Same rules as core.entitlement_utils.rebuild_entitlements, so exports
+    # keep working without a manual rebuild after deploying this.
+    ExportEntitlement = apps.get_model("core", "ExportEntitlement")
+    Payment = apps.get_model("core", "Payment")
+    UserProfile = apps.get_model("core", "UserProfile")
+
+    paid = (
+        Payment.objects.filter(status="succeeded")
+        .values_list("user_id", "property_id")
+        .distinct()
+    )
+    ExportEntitlement.objects.bulk_create(
+        [
+            ExportEntitlement(
+                user_id=user_id, property_id=property_id, source="payment"
+            )
+            for user_id, property_id in paid
+        ],
+        batch_size=500,
+    )
+
+    active_agents = set(
+        UserProfile.objects.filter(subscription_status="active").values_list(
+            "user_id", flat=True
+        )
+    )
+    rows = []
+    for (
+        user_id,
+        user_type,
+        subscription_status,
+        parent_agent_id,
+    ) in UserProfile.objects.values_list(
+        "user_id", "user_type", "subscription_status", "parent_agent_id"
+    ):
+        if user_type == "admin":
+            source = "admin"
+        elif subscription_status == "active":
+            source = "subscription"
+        elif parent_agent_id in active_agents:
+            source = "agent"
+        else:
+            continue
+        rows.append(ExportEntitlement(user_id=user_id, source=source))
+    ExportEntitlement.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_property_changes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportEntitlement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("payment", "Per-property payment"),
+                            ("subscription", "Own subscription"),
+                            ("agent", "Agent's subscription"),
+                            ("admin", "Admin"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("expires_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "property",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_entitlements",
+                        to="core.property",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_entitlements",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("property__isnull", False)),
+                        fields=("user", "property"),
+                        name="unique_export_entitlement_per_property",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("property__isnull", True)),
+                        fields=("user",),
+                        name="unique_account_export_entitlement",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(seed_entitlements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+# auth_user belongs to django.contrib.auth, so its indexes for the admin
+# user listing (newest first, email/username prefix search) are raw SQL.
+# istartswith compiles to UPPER(col::text) LIKE UPPER('q%') on PostgreSQL.
+USER_INDEXES = {
+    "core_user_joined_idx": '("date_joined", "id")',
+}
+POSTGRES_USER_INDEXES = {
+    "core_user_email_prefix_idx": '(UPPER("email"::text) text_pattern_ops)',
+    "core_user_username_prefix_idx": '(UPPER("username"::text) text_pattern_ops)',
+}
+
+
+def _user_indexes(schema_editor):
+    indexes = dict(USER_INDEXES)
+    if schema_editor.connection.vendor == "postgresql":
+        indexes.update(POSTGRES_USER_INDEXES)
+    return indexes
+
+
+def create_user_indexes(apps, schema_editor):
+    table = apps.get_model(*settings.AUTH_USER_MODEL.split("."))._meta.db_table
+    for name, columns in _user_indexes(schema_editor).items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" {columns}'
+        )
+
+
+def drop_user_indexes(apps, schema_editor):
+    for name in _user_indexes(schema_editor):
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_backfill_user_profiles"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                fields=["user_type"], name="core_userpr_user_ty_baccfd_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                fields=["subscription_status"], name="core_userpr_subscri_8394b8_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                fields=["subscription_tier"], name="core_userpr_subscri_e213f7_idx"
+            ),
+        ),
+        migrations.RunPython(create_user_indexes, drop_user_indexes),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:08
+
+from django.db import migrations
+
+
+def blank_stripe_ids_to_null(apps, schema_editor):
+    # '' would violate the unique constraints added in 0027; NULLs don't
+    UserProfile = apps.get_model("core", "UserProfile")
+    UserProfile.objects.filter(stripe_customer_id="").update(stripe_customer_id=None)
+    UserProfile.objects.filter(stripe_subscription_id="").update(stripe_subscription_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0025_webhook_events"),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_stripe_ids_to_null, migrations.RunPython.noop),
+    ]
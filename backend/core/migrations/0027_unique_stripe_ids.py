@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0026_null_blank_stripe_ids"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userprofile",
+            name="stripe_customer_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="stripe_subscription_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
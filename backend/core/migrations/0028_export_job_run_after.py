@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0027_unique_stripe_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportjob",
+            name="run_after",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def delete_job_copies(apps, schema_editor):
+    # Jobs used to keep their own copy of the PDF under exports/, outside
+    # the export cache budget; downloads now come from the cache.
+    ExportJob = apps.get_model("core", "ExportJob")
+    jobs = ExportJob.objects.exclude(file="").exclude(file__isnull=True)
+    for job in jobs.only("file").iterator():
+        job.file.storage.delete(job.file.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0028_export_job_run_after"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_job_copies, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="exportjob",
+            name="file",
+        ),
+        migrations.AddField(
+            model_name="exportjob",
+            name="cache_entry",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="export_jobs",
+                to="core.exportcacheentry",
+            ),
+        ),
+    ]
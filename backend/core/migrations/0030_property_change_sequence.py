@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+def sequence_from_id(apps, schema_editor):
+    # Tokens clients already hold were ids; seeding each sequence with its
+    # id keeps them comparable, and new sequences continue above them
+    PropertyChange = apps.get_model("core", "PropertyChange")
+    PropertyChange.objects.update(sequence=models.F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0029_export_job_cache_entry"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="propertychange",
+            name="core_proper_propert_eb9ad1_idx",
+        ),
+        migrations.AddField(
+            model_name="propertychange",
+            name="sequence",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(sequence_from_id, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="propertychange",
+            index=models.Index(
+                fields=["property", "sequence"], name="core_proper_propert_2e6fd4_idx"
+            ),
+        ),
+    ]
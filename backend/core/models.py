@@ -1,8 +1,9 @@
 # src/api/models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class UserProfile(models.Model):
@@ -37,29 +38,25 @@ class UserProfile(models.Model):
     )
     subscription_status = models.CharField(max_length=20, choices=SUBSCRIPTION_STATUS, default='none')
     subscription_tier = models.CharField(max_length=20, choices=SUBSCRIPTION_TIERS, null=True, blank=True)
-    stripe_customer_id = models.CharField(max_length=255, null=True, blank=True)
-    stripe_subscription_id = models.CharField(max_length=255, null=True, blank=True)
+    # Unique, hence indexed: webhooks look profiles up by these. Unset is
+    # NULL, never '', since '' would collide between profiles.
+    stripe_customer_id = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    stripe_subscription_id = models.CharField(max_length=255, null=True, blank=True, unique=True)
     properties_exported = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Filters of the admin user listing (core.payment_views.list_users)
+        indexes = [
+            models.Index(fields=['user_type']),
+            models.Index(fields=['subscription_status']),
+            models.Index(fields=['subscription_tier']),
+        ]
+
     def __str__(self):
         return f"{self.user.username} ({self.user_type})"
 
-    @property
-    def can_export_free(self):
-        # Admins can always export free
-        if self.user_type == 'admin':
-            return True
-        # Agent subscribers export free
-        if self.subscription_status == 'active':
-            return True
-        # Clients of agent subscribers export free
-        if self.parent_agent and hasattr(self.parent_agent, 'userprofile'):
-            return self.parent_agent.userprofile.subscription_status == 'active'
-        # Individual users must pay for each property export
-        return False
-
 
 class Payment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -74,6 +71,55 @@ class Payment(models.Model):
         return f"Payment {self.id} - ${self.amount} by {self.user.username}"
 
 
+class ExportEntitlement(models.Model):
+    """
+    Materialized answer to "may this user export this property?", kept in
+    step with payments and subscriptions (see core/entitlement_utils.py).
+    Rows without a property cover every property the user owns.
+    """
+    SOURCE_CHOICES = [
+        ('payment', 'Per-property payment'),
+        ('subscription', 'Own subscription'),
+        ('agent', "Agent's subscription"),
+        ('admin', 'Admin'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        related_name='export_entitlements',
+        on_delete=models.CASCADE
+    )
+    property = models.ForeignKey(
+        'Property',
+        related_name='export_entitlements',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'property'],
+                condition=models.Q(property__isnull=False),
+                name='unique_export_entitlement_per_property',
+            ),
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(property__isnull=True),
+                name='unique_account_export_entitlement',
+            ),
+        ]
+
+    def __str__(self):
+        scope = self.property_id or 'all properties'
+        return f"{self.user.username}: {scope} ({self.source})"
+
+
 class Property(models.Model):
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -82,11 +128,31 @@ class Property(models.Model):
     )
     address = models.CharField(max_length=255)
     description = models.TextField(blank=True)
+    # Bumped on every edit to the property or its sections, documents,
+    # images and notes (see core/signals.py).
+    revision = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.address
 
+    def save(self, *args, **kwargs):
+        bump = not self._state.adding and kwargs.get('update_fields') is None
+        if bump:
+            self.revision = models.F('revision') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['revision'])
+
+    @classmethod
+    def bump_revision(cls, property_id):
+        if property_id:
+            cls.objects.filter(pk=property_id).update(
+                revision=models.F('revision') + 1,
+                updated_at=timezone.now(),
+            )
+
 
 class Section(models.Model):
     property = models.ForeignKey(
@@ -96,10 +162,14 @@ class Section(models.Model):
     )
     title = models.CharField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'section'
         verbose_name_plural = 'sections'
+        indexes = [
+            models.Index(fields=['property', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return self.title
@@ -121,7 +191,20 @@ class Document(models.Model):
         blank=True
     )
     file = models.FileField(upload_to='documents/')
+    # Recorded once at upload (see core/document_utils.extract_file_metadata)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['property', 'uploaded_at', 'id']),
+            models.Index(fields=['section', 'uploaded_at', 'id']),
+        ]
 
     def __str__(self):
         return self.file.name
@@ -141,7 +224,22 @@ class PropertyImage(models.Model):
         blank=True    # ← allow blank in forms
     )
     image = models.ImageField(upload_to='property_images/')
+    # Downscaled copy embedded in PDF exports (see core/image_utils.py)
+    print_image = models.ImageField(upload_to='property_images/print/', null=True, blank=True)
+    # Recorded once at upload (see core/document_utils.extract_file_metadata)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['property', 'uploaded_at', 'id']),
+            models.Index(fields=['section', 'uploaded_at', 'id']),
+        ]
 
     def __str__(self):
         return self.image.name
@@ -162,11 +260,130 @@ class Note(models.Model):
     )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['property', 'created_at', 'id']),
+            models.Index(fields=['section', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"Note {self.id} on {self.property}"
 
 
+class PropertyChange(models.Model):
+    """
+    Compact change log behind the delta-sync endpoint: one row per section,
+    document, image or note, rewritten with the property's next sequence
+    number on every change. The sequence doubles as the sync token; rows
+    with action 'delete' are the tombstones of removed items.
+    """
+    KIND_CHOICES = [
+        ('section', 'Section'),
+        ('document', 'Document'),
+        ('image', 'Image'),
+        ('note', 'Note'),
+    ]
+    ACTION_CHOICES = [
+        ('upsert', 'Created or updated'),
+        ('delete', 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    property = models.ForeignKey(
+        Property,
+        related_name='changes',
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    sequence = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property', 'kind', 'object_id'],
+                name='unique_property_change_per_object',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['property', 'sequence']),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.kind} {self.object_id} on {self.property_id}"
+
+    @classmethod
+    def latest_sequence(cls, property_id):
+        return cls.objects.filter(property_id=property_id).aggregate(
+            latest=models.Max('sequence')
+        )['latest'] or 0
+
+    @classmethod
+    def record(cls, property_id, kind, object_id, action):
+        """
+        Point the object's log row at the property's next sequence number.
+        The property row lock serializes writers, so a sequence only becomes
+        visible after every lower one has committed.
+        """
+        if not property_id:
+            return
+        with transaction.atomic():
+            locked = Property.objects.select_for_update().filter(pk=property_id)
+            if locked.values_list('pk', flat=True).first() is None:
+                return
+            cls.objects.update_or_create(
+                property_id=property_id, kind=kind, object_id=object_id,
+                defaults={
+                    'action': action,
+                    'sequence': cls.latest_sequence(property_id) + 1,
+                },
+            )
+
+
+class ExportCacheEntry(models.Model):
+    """A rendered PDF stored under the fingerprint of the property revision it shows."""
+    property = models.ForeignKey(
+        Property,
+        related_name='export_cache_entries',
+        on_delete=models.CASCADE
+    )
+    fingerprint = models.CharField(max_length=64, unique=True)
+    revision = models.PositiveIntegerField()
+    file = models.FileField(upload_to='export_cache/')
+    size = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]} ({self.property}, rev {self.revision})"
+
+
+class ExportFragment(models.Model):
+    """
+    One rendered piece (cover, section, footer) of a section-parallel
+    export, keyed by the fingerprint of its HTML so unchanged sections are
+    reused across revisions.
+    """
+    property = models.ForeignKey(
+        Property,
+        related_name='export_fragments',
+        on_delete=models.CASCADE
+    )
+    fingerprint = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='export_fragments/')
+    pages = models.PositiveIntegerField()
+    bookmarks = models.JSONField(default=list)
+    size = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]} ({self.property}, {self.pages} pages)"
+
+
 class WaitlistSignup(models.Model):
     email = models.EmailField(unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -176,3 +393,160 @@ class WaitlistSignup(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+
+
+class CampaignDelivery(models.Model):
+    """
+    Per-recipient status of a waitlist campaign (core/waitlist_campaign.py),
+    so an interrupted send resumes where it stopped instead of starting over.
+    """
+    STATUS_CHOICES = [
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    campaign = models.CharField(max_length=50)
+    signup = models.ForeignKey(
+        WaitlistSignup,
+        related_name='campaign_deliveries',
+        on_delete=models.CASCADE
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    attempts = models.IntegerField(default=1)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['campaign', 'signup'],
+                name='unique_campaign_delivery',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign} to {self.signup} ({self.status})"
+
+
+class ExportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        related_name='export_jobs',
+        on_delete=models.CASCADE
+    )
+    property = models.ForeignKey(
+        Property,
+        related_name='export_jobs',
+        on_delete=models.CASCADE
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Absolute site root captured from the request so the worker can build
+    # the same links the synchronous export would have produced.
+    base_url = models.CharField(max_length=500, blank=True)
+    # The finished PDF lives in the export cache (and counts against its
+    # budget); the download re-renders if the entry has since been evicted.
+    cache_entry = models.ForeignKey(
+        ExportCacheEntry,
+        related_name='export_jobs',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    # A failed attempt is retried no earlier than this
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"ExportJob {self.id} ({self.status}) for {self.property}"
+
+
+class EmailOutbox(models.Model):
+    """
+    A transactional email waiting to be sent. Requests only write a row;
+    the send_queued_emails worker delivers it over a shared connection and
+    retries failures with backoff (see core/email_outbox.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to_email} ({self.status})"
+
+
+class WebhookEvent(models.Model):
+    """
+    A verified Stripe event. The webhook view only records it (Stripe's
+    retries are dropped by the unique event id); the process_webhook_events
+    worker applies events in order per customer (see core/webhook_events.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    customer_id = models.CharField(max_length=255, blank=True)
+    payload = models.JSONField()
+    # Stripe's own event timestamp, which orders a customer's events
+    stripe_created = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['stripe_created', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['customer_id', 'stripe_created']),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
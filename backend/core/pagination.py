@@ -0,0 +1,104 @@
+# core/pagination.py
+
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (timestamp, id). Each page is fetched with
+    ``WHERE (ts, id) > (last ts, last id) ORDER BY ts, id LIMIT n``, which a
+    (parent, ts, id) index answers in O(page size) however deep the
+    client has scrolled.
+
+    The view names the timestamp field in ``keyset_field`` (or a subclass
+    sets it). Pagination is opt-in: without a ``cursor`` or ``page_size``
+    parameter the endpoint still returns the plain list existing clients
+    expect, unless ``optional`` is False.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = "Invalid cursor"
+    keyset_field = None
+    descending = False
+    optional = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.optional and (
+            self.cursor_query_param not in params and self.page_size_query_param not in params
+        ):
+            return None
+
+        self.request = request
+        self.field = getattr(view, "keyset_field", self.keyset_field)
+        self.limit = self.get_page_size(request)
+
+        if self.descending:
+            queryset = queryset.order_by(f"-{self.field}", "-id")
+            after = "lt"
+        else:
+            queryset = queryset.order_by(self.field, "id")
+            after = "gt"
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            timestamp, last_id = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f"{self.field}__{after}": timestamp})
+                | Q(**{self.field: timestamp, f"id__{after}": last_id})
+            )
+
+        # One extra row tells us whether there is a next page
+        page = list(queryset[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        position = [getattr(obj, self.field).isoformat(), obj.id]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            timestamp, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(timestamp), int(last_id)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
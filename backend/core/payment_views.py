@@ -2,14 +2,28 @@
 
 import stripe
 import os
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .models import UserProfile, Payment, Property
+from .profile_utils import get_user_profile
+from .pagination import KeysetPagination
+from .entitlement_utils import (
+    bulk_export_access,
+    export_access,
+    grant_property_entitlement,
+    has_account_entitlement,
+    sync_account_entitlements,
+)
 
 # Set Stripe API key
 stripe.api_key = getattr(settings, 'STRIPE_SECRET_KEY', os.getenv('STRIPE_SECRET_KEY'))
@@ -52,11 +66,10 @@ def create_payment_intent(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get or create user profile
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+        user_profile = get_user_profile(request.user)
         
         # Check if user can export for free
-        if user_profile.can_export_free:
+        if has_account_entitlement(request.user):
             return Response(
                 {'error': 'User can export for free'}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -70,7 +83,7 @@ def create_payment_intent(request):
                 metadata={'user_id': request.user.id}
             )
             user_profile.stripe_customer_id = customer.id
-            user_profile.save()
+            user_profile.save(update_fields=['stripe_customer_id', 'updated_at'])
         
         # Create payment intent
         payment_intent = stripe.PaymentIntent.create(
@@ -106,7 +119,7 @@ def create_payment_intent(request):
 def check_admin_status(request):
     """Check if current user is admin - lightweight endpoint"""
     try:
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+        user_profile = get_user_profile(request.user)
         
         return Response({
             'is_admin': user_profile.user_type == 'admin',
@@ -163,8 +176,10 @@ def confirm_payment(request):
             status=payment_intent.status
         )
         
+        grant_property_entitlement(request.user, property_obj)
+
         # Update user's export count
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+        user_profile = get_user_profile(request.user)
         user_profile.properties_exported += 1
         user_profile.save()
 
@@ -203,26 +218,6 @@ def confirm_payment(request):
         )
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def check_admin_status(request):
-    """Check if current user is admin - lightweight endpoint"""
-    try:
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-        
-        return Response({
-            'is_admin': user_profile.user_type == 'admin',
-            'user_type': user_profile.user_type,
-            'username': request.user.username
-        })
-        
-    except Exception as e:
-        return Response(
-            {'error': f'Server error: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def check_export_permission(request):
@@ -245,17 +240,9 @@ def check_export_permission(request):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get or create user profile
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-        
-        can_export_free = user_profile.can_export_free
+        user_profile = get_user_profile(request.user)
         
-        # Check if this property has already been paid for
-        has_paid = Payment.objects.filter(
-            user=request.user,
-            property=property_obj,
-            status='succeeded'
-        ).exists()
+        can_export_free, has_paid = export_access(request.user, property_obj.id)
         
         return Response({
             'can_export_free': can_export_free,
@@ -272,25 +259,64 @@ def check_export_permission(request):
         )
 
 
-@api_view(['GET'])
+# Property cards a dashboard may ask about in one request
+MAX_PERMISSION_CHECKS = 500
+
+
+@api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def check_admin_status(request):
-    """Check if current user is admin - lightweight endpoint"""
+def check_export_permissions(request):
+    """
+    Batch check-permission: {"property_ids": [...]} in, per-property
+    can_export / has_paid / reason out, so a dashboard paints every export
+    button in one round-trip. One ownership query and one (usually cached)
+    entitlement lookup, however many properties are asked about.
+    """
+    property_ids = request.data.get('property_ids')
+    if not isinstance(property_ids, list):
+        return Response(
+            {'error': 'property_ids must be a list'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     try:
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-        
-        return Response({
-            'is_admin': user_profile.user_type == 'admin',
-            'user_type': user_profile.user_type,
-            'username': request.user.username
-        })
-        
-    except Exception as e:
+        property_ids = list(dict.fromkeys(int(pid) for pid in property_ids))
+    except (TypeError, ValueError):
         return Response(
-            {'error': f'Server error: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {'error': 'property_ids must contain integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(property_ids) > MAX_PERMISSION_CHECKS:
+        return Response(
+            {'error': f'At most {MAX_PERMISSION_CHECKS} properties can be checked at once'},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
+    owned = set(
+        Property.objects.filter(owner=request.user, id__in=property_ids)
+        .values_list('id', flat=True)
+    )
+    access = bulk_export_access(request.user, owned)
+
+    permissions = {}
+    for property_id in property_ids:
+        if property_id not in owned:
+            permissions[property_id] = {'can_export': False, 'has_paid': False, 'reason': 'not_found'}
+            continue
+        can_export_free, has_paid = access[property_id]
+        if has_paid:
+            reason = 'paid'
+        elif can_export_free:
+            reason = 'free'
+        else:
+            reason = 'payment_required'
+        permissions[property_id] = {
+            'can_export': can_export_free or has_paid,
+            'has_paid': has_paid,
+            'reason': reason,
+        }
+
+    return Response({'permissions': permissions})
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -298,7 +324,7 @@ def make_user_admin(request):
     """Admin endpoint to grant admin privileges to users"""
     try:
         # Check if current user is admin
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+        user_profile = get_user_profile(request.user)
         
         if user_profile.user_type != 'admin':
             return Response(
@@ -327,10 +353,10 @@ def make_user_admin(request):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get or create target user profile
-        target_profile, created = UserProfile.objects.get_or_create(user=target_user)
+        target_profile = get_user_profile(target_user)
         target_profile.user_type = 'admin'
         target_profile.save()
+        sync_account_entitlements(target_profile)
         
         return Response({
             'success': True,
@@ -344,44 +370,91 @@ def make_user_admin(request):
         )
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def check_admin_status(request):
-    """Check if current user is admin - lightweight endpoint"""
-    try:
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-        
-        return Response({
-            'is_admin': user_profile.user_type == 'admin',
-            'user_type': user_profile.user_type,
-            'username': request.user.username
-        })
-        
-    except Exception as e:
-        return Response(
-            {'error': f'Server error: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+class AdminUserPagination(KeysetPagination):
+    keyset_field = 'date_joined'
+    descending = True
+    optional = False
+
+
+def _per_user_count(queryset, field='user'):
+    """Correlated COUNT of ``queryset`` rows per user (no join fan-out)."""
+    counts = (
+        queryset
+        .filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _joined_bound(value, name):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+    return timezone.make_aware(datetime.combine(day, time.min))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_users(request):
-    """Admin endpoint to list all users with their profiles"""
+    """
+    Admin endpoint listing users with their profiles, newest first, a page
+    at a time. Filters: user_type, subscription_status, tier,
+    joined_after / joined_before (dates, inclusive); q searches email and
+    username prefixes. The first page also carries site-wide stats.
+    """
     try:
         # Check if current user is admin
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
+        user_profile = get_user_profile(request.user)
         
         if user_profile.user_type != 'admin':
             return Response(
                 {'error': 'Permission denied. Admin access required.'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        # Get all users with their profiles
+
+        params = request.query_params
+        users = (
+            User.objects
+            .filter(userprofile__isnull=False)
+            .select_related('userprofile')
+            .annotate(
+                property_count=_per_user_count(Property.objects.all(), 'owner'),
+                paid_export_count=_per_user_count(Payment.objects.filter(status='succeeded')),
+            )
+        )
+        for param, field in (
+            ('user_type', 'userprofile__user_type'),
+            ('subscription_status', 'userprofile__subscription_status'),
+            ('tier', 'userprofile__subscription_tier'),
+        ):
+            if params.get(param):
+                users = users.filter(**{field: params[param]})
+        try:
+            if params.get('joined_after'):
+                users = users.filter(
+                    date_joined__gte=_joined_bound(params['joined_after'], 'joined_after')
+                )
+            if params.get('joined_before'):
+                users = users.filter(
+                    date_joined__lt=_joined_bound(params['joined_before'], 'joined_before')
+                    + timedelta(days=1)
+                )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        search = params.get('q', '').strip()
+        if search:
+            users = users.filter(
+                Q(email__istartswith=search) | Q(username__istartswith=search)
+            )
+
+        paginator = AdminUserPagination()
+        page = paginator.paginate_queryset(users, request)
         users_data = []
-        for user in User.objects.all().order_by('-date_joined'):
-            profile, created = UserProfile.objects.get_or_create(user=user)
+        for user in page:
+            profile = user.userprofile
             users_data.append({
                 'id': user.id,
                 'username': user.username,
@@ -390,30 +463,23 @@ def list_users(request):
                 'subscription_status': profile.subscription_status,
                 'subscription_tier': profile.subscription_tier,
                 'properties_exported': profile.properties_exported,
+                'property_count': user.property_count,
+                'paid_export_count': user.paid_export_count,
                 'created_at': user.date_joined.isoformat(),
             })
-        
-        return Response(users_data)
-        
-    except Exception as e:
-        return Response(
-            {'error': f'Server error: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def check_admin_status(request):
-    """Check if current user is admin - lightweight endpoint"""
-    try:
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-        
-        return Response({
-            'is_admin': user_profile.user_type == 'admin',
-            'user_type': user_profile.user_type,
-            'username': request.user.username
-        })
+        response = paginator.get_paginated_response(users_data)
+        if not params.get('cursor'):
+            response.data['stats'] = UserProfile.objects.aggregate(
+                users=Count('pk'),
+                admins=Count('pk', filter=Q(user_type='admin')),
+                agents=Count('pk', filter=Q(user_type='agent')),
+                clients=Count('pk', filter=Q(user_type='client')),
+                individuals=Count('pk', filter=Q(user_type='individual')),
+                subscribers=Count('pk', filter=Q(subscription_status='active')),
+                exports=Coalesce(Sum('properties_exported'), 0),
+            )
+        return response
         
     except Exception as e:
         return Response(
@@ -0,0 +1,467 @@
+# core/pdf_merge.py
+#
+# Just enough PDF reading to stitch WeasyPrint output back together. The
+# export renders the cover and each section as separate PDF fragments;
+# PDFMerger copies their pages into one pydyf document, numbers the pages
+# across the whole report and rebuilds a single outline.
+
+import re
+import zlib
+from collections import namedtuple
+
+import pydyf
+
+WHITESPACE = b"\x00\t\n\x0c\r "
+
+OBJ_RE = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+TOKEN_RE = re.compile(rb"[^\x00\t\n\x0c\r ()<>\[\]{}/%]+")
+REF_TAIL_RE = re.compile(rb"\s+(\d+)\s+R(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])")
+EOL_RE = re.compile(rb"[\r\n]")
+
+# Helvetica advance widths (1/1000 em) for the characters page labels use
+HELVETICA_WIDTHS = dict.fromkeys("0123456789aego", 556)
+HELVETICA_WIDTHS.update({" ": 278, "f": 278, "P": 667})
+
+PAGE_NUMBER_FONT = "SPPageNumber"
+
+Ref = namedtuple("Ref", "number generation")
+
+
+class PDFParseError(ValueError):
+    pass
+
+
+class Name(bytes):
+    """A PDF name, stored without its leading slash."""
+
+
+class Raw(bytes):
+    """A token (string, keyword) copied to the output verbatim."""
+
+
+class PDFStream:
+    __slots__ = ("dict", "raw")
+
+    def __init__(self, dictionary, raw):
+        self.dict = dictionary
+        self.raw = raw
+
+    def decoded(self):
+        filters = self.dict.get(b"Filter")
+        if isinstance(filters, list):
+            filters = filters[0] if len(filters) == 1 else filters
+        if filters is None:
+            return self.raw
+        if filters == b"FlateDecode" and b"DecodeParms" not in self.dict:
+            return zlib.decompress(self.raw)
+        raise PDFParseError(f"Unsupported stream filter: {filters!r}")
+
+
+def _skip_space(data, pos):
+    end = len(data)
+    while pos < end:
+        char = data[pos]
+        if char in WHITESPACE:
+            pos += 1
+        elif char == 0x25:  # % comment, up to the end of the line
+            match = EOL_RE.search(data, pos)
+            pos = end if match is None else match.end()
+        else:
+            break
+    return pos
+
+
+def parse_value(data, pos):
+    """Parse one PDF value starting at ``pos``; returns (value, end)."""
+    pos = _skip_space(data, pos)
+    head = data[pos:pos + 2]
+
+    if head == b"<<":
+        result = {}
+        pos += 2
+        while True:
+            pos = _skip_space(data, pos)
+            if data.startswith(b">>", pos):
+                return result, pos + 2
+            key, pos = parse_value(data, pos)
+            if not isinstance(key, Name):
+                raise PDFParseError(f"Dictionary key expected at byte {pos}")
+            result[key], pos = parse_value(data, pos)
+
+    if head[:1] == b"[":
+        result = []
+        pos += 1
+        while True:
+            pos = _skip_space(data, pos)
+            if data.startswith(b"]", pos):
+                return result, pos + 1
+            value, pos = parse_value(data, pos)
+            result.append(value)
+
+    if head[:1] == b"<":
+        end = data.index(b">", pos) + 1
+        return Raw(data[pos:end]), end
+
+    if head[:1] == b"(":
+        depth, end = 1, pos + 1
+        while depth:
+            char = data[end]
+            if char == 0x5c:  # backslash escapes the next byte
+                end += 1
+            elif char == 0x28:
+                depth += 1
+            elif char == 0x29:
+                depth -= 1
+            end += 1
+        return Raw(data[pos:end]), end
+
+    if head[:1] == b"/":
+        match = TOKEN_RE.match(data, pos + 1)
+        if match is None:
+            return Name(b""), pos + 1
+        return Name(match.group()), match.end()
+
+    match = TOKEN_RE.match(data, pos)
+    if match is None:
+        raise PDFParseError(f"Unexpected byte at {pos}")
+    token, end = match.group(), match.end()
+
+    if token.isdigit():
+        tail = REF_TAIL_RE.match(data, end)
+        if tail is not None:
+            return Ref(int(token), int(tail.group(1))), tail.end()
+        return int(token), end
+    if token in (b"true", b"false"):
+        return token == b"true", end
+    if token == b"null":
+        return None, end
+    try:
+        return (float(token) if b"." in token else int(token)), end
+    except ValueError:
+        return Raw(token), end
+
+
+class PDFReader:
+    """
+    Indexes every object in a PDF by number. Objects are found by scanning
+    the file rather than trusting the xref table, which is all the
+    generated fragments need; compressed object streams are supported.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.objects = {}
+        self.trailer = {}
+        self._scan()
+
+    def _scan(self):
+        data = self.data
+        object_streams = []
+        pos = 0
+        while True:
+            match = OBJ_RE.search(data, pos)
+            if match is None:
+                break
+            value, pos = parse_value(data, match.end())
+            pos = _skip_space(data, pos)
+
+            if data.startswith(b"stream", pos):
+                pos += 6
+                if data.startswith(b"\r\n", pos):
+                    pos += 2
+                elif data[pos:pos + 1] in (b"\n", b"\r"):
+                    pos += 1
+                length = self.resolve(value.get(b"Length"))
+                if isinstance(length, int):
+                    raw, pos = data[pos:pos + length], pos + length
+                else:
+                    end = data.index(b"endstream", pos)
+                    raw, pos = data[pos:end].rstrip(b"\r\n"), end
+                value = PDFStream(value, raw)
+                if value.dict.get(b"Type") == b"ObjStm":
+                    object_streams.append(value)
+                elif value.dict.get(b"Type") == b"XRef":
+                    self.trailer = value.dict
+
+            self.objects[int(match.group(1))] = value
+
+        for stream in object_streams:
+            body = stream.decoded()
+            first = stream.dict[b"First"]
+            header = body[:first].split()
+            for index in range(stream.dict[b"N"]):
+                number, offset = int(header[2 * index]), int(header[2 * index + 1])
+                self.objects.setdefault(number, parse_value(body, first + offset)[0])
+
+        if not self.trailer:
+            start = data.rfind(b"trailer")
+            if start < 0:
+                raise PDFParseError("No trailer found")
+            self.trailer = parse_value(data, start + len(b"trailer"))[0]
+
+    def resolve(self, value):
+        while isinstance(value, Ref):
+            value = self.objects.get(value.number)
+        return value
+
+    def pages(self):
+        """Return [(page number, page dict with inherited attributes)] and the page tree node numbers."""
+        catalog = self.resolve(self.trailer.get(b"Root"))
+        if not isinstance(catalog, dict):
+            raise PDFParseError("Document catalog missing")
+
+        pages, tree_nodes = [], set()
+
+        def walk(ref, inherited):
+            node = self.resolve(ref)
+            if node.get(b"Type") == b"Pages" or b"Kids" in node:
+                tree_nodes.add(ref.number)
+                inherited = dict(inherited)
+                for key in (b"Resources", b"MediaBox", b"CropBox", b"Rotate"):
+                    if key in node:
+                        inherited[key] = node[key]
+                for kid in self.resolve(node[b"Kids"]):
+                    walk(kid, inherited)
+            else:
+                pages.append((ref.number, {**inherited, **node}))
+
+        walk(catalog[b"Pages"], {})
+        return pages, tree_nodes
+
+
+class _Value(pydyf.Object):
+    """An indirect object holding a value that is neither a dict nor an array."""
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    @property
+    def data(self):
+        return pydyf._to_bytes(self.value)
+
+
+class _FragmentCopier:
+    """Copies objects from one fragment into the merged document, once each."""
+
+    def __init__(self, reader, pdf, redirects):
+        self.reader = reader
+        self.pdf = pdf
+        self.copies = dict(redirects)
+
+    def reference(self, ref):
+        copy = self.copies.get(ref.number)
+        if copy is not None:
+            return copy if isinstance(copy, bytes) else copy.reference
+
+        value = self.reader.objects.get(ref.number)
+        if isinstance(value, PDFStream):
+            copy = pydyf.Stream([value.raw])
+            # Uncompressed fragment streams are compressed on the way out
+            copy.compress = b"Filter" not in value.dict
+        elif isinstance(value, dict):
+            copy = pydyf.Dictionary()
+        elif isinstance(value, list):
+            copy = pydyf.Array()
+        else:
+            copy = _Value(None)
+
+        # Register before converting the contents, so cycles resolve
+        self.pdf.add_object(copy)
+        self.copies[ref.number] = copy
+
+        if isinstance(value, PDFStream):
+            copy.extra = {
+                key: self.convert(item)
+                for key, item in value.dict.items() if key != b"Length"
+            }
+        elif isinstance(value, dict):
+            copy.update(self.convert(value))
+        elif isinstance(value, list):
+            copy.extend(self.convert(value))
+        else:
+            copy.value = self.convert(value)
+        return copy.reference
+
+    def convert(self, value):
+        if isinstance(value, Ref):
+            return self.reference(value)
+        if isinstance(value, Name):
+            return b"/" + value
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, bool):
+            return b"true" if value else b"false"
+        if value is None:
+            return b"null"
+        if isinstance(value, dict):
+            return pydyf.Dictionary({
+                key: self.convert(item) for key, item in value.items()
+            })
+        if isinstance(value, list):
+            return pydyf.Array(self.convert(item) for item in value)
+        return value
+
+
+class PDFMerger:
+    """
+    Build one PDF out of several. Call append() for each fragment in order,
+    optionally add_outline(), then write(). When ``page_numbers`` is a
+    format string such as "Page {page} of {pages}", each page gets that
+    label centred in its bottom margin.
+    """
+
+    def __init__(self, page_numbers=None, font_size=10, gray=0.4, bottom_margin=15 * 72 / 25.4):
+        self.pdf = pydyf.PDF()
+        self.page_numbers = page_numbers
+        self.font_size = font_size
+        self.gray = gray
+        self.bottom_margin = bottom_margin
+        self._pages = []
+        self._labels = []
+
+        if page_numbers:
+            self._font = pydyf.Dictionary({
+                "Type": "/Font",
+                "Subtype": "/Type1",
+                "BaseFont": "/Helvetica",
+                "Encoding": "/WinAnsiEncoding",
+            })
+            self.pdf.add_object(self._font)
+            # Isolates each page's own graphics state from the label
+            self._save_state = pydyf.Stream([b"q"])
+            self.pdf.add_object(self._save_state)
+
+    @property
+    def page_count(self):
+        return len(self._pages)
+
+    def append(self, data):
+        """Copy every page of the PDF in ``data``; returns the index of its first page."""
+        reader = PDFReader(data)
+        pages, tree_nodes = reader.pages()
+
+        redirects = {number: self.pdf.pages.reference for number in tree_nodes}
+        root = reader.trailer.get(b"Root")
+        if isinstance(root, Ref):
+            redirects[root.number] = self.pdf.catalog.reference
+
+        # Allocate every page first: links and annotations may point ahead
+        first_page = len(self._pages)
+        copier = _FragmentCopier(reader, self.pdf, redirects)
+        for number, _ in pages:
+            page = pydyf.Dictionary()
+            self.pdf.add_page(page)
+            copier.copies[number] = page
+            self._pages.append(page)
+
+        for index, (number, attributes) in enumerate(pages):
+            page = self._pages[first_page + index]
+            for key, value in attributes.items():
+                if key != b"Parent":
+                    page[key] = copier.convert(value)
+            page[b"Parent"] = self.pdf.pages.reference
+            if self.page_numbers:
+                self._prepare_label(page, attributes, reader, copier)
+
+        if not self.pdf.info:
+            info = reader.resolve(reader.trailer.get(b"Info"))
+            if isinstance(info, dict):
+                self.pdf.info.update(copier.convert(info))
+
+        return first_page
+
+    def _prepare_label(self, page, attributes, reader, copier):
+        # Each page gets its own resources dict: the shared one plus our font
+        resources = dict(reader.resolve(attributes.get(b"Resources")) or {})
+        fonts = dict(reader.resolve(resources.get(b"Font")) or {})
+        fonts[Name(PAGE_NUMBER_FONT.encode())] = Raw(self._font.reference)
+        resources[b"Font"] = fonts
+        page[b"Resources"] = copier.convert(resources)
+
+        contents = reader.resolve(attributes.get(b"Contents"))
+        if isinstance(contents, list):
+            contents = [copier.convert(item) for item in contents]
+        else:
+            contents = [copier.convert(attributes[b"Contents"])] if b"Contents" in attributes else []
+
+        label = pydyf.Stream()
+        self.pdf.add_object(label)
+        page[b"Contents"] = pydyf.Array(
+            [self._save_state.reference, *contents, label.reference]
+        )
+        media_box = [float(n) for n in reader.resolve(attributes.get(b"MediaBox")) or (0, 0, 595.28, 841.89)]
+        self._labels.append((label, media_box))
+
+    def add_outline(self, bookmarks):
+        """
+        ``bookmarks`` is a flat list of (level, label, page index, x, y, state)
+        in document order, coordinates in PDF points; levels nest as in
+        WeasyPrint (h1 > h2 > ...).
+        """
+        root = []
+        stack = [(0, root)]
+        for level, label, page, x, y, state in bookmarks:
+            while stack[-1][0] >= level:
+                stack.pop()
+            children = []
+            stack[-1][1].append((label, page, x, y, state, children))
+            stack.append((level, children))
+
+        if root:
+            outlines, count = self._write_outline(root)
+            outline_root = pydyf.Dictionary({
+                "Count": count,
+                "First": outlines[0].reference,
+                "Last": outlines[-1].reference,
+            })
+            self.pdf.add_object(outline_root)
+            for outline in outlines:
+                outline["Parent"] = outline_root.reference
+            self.pdf.catalog["Outlines"] = outline_root.reference
+
+    def _write_outline(self, items, parent=None):
+        outlines = []
+        count = len(items)
+        for label, page, x, y, state, children in items:
+            outline = pydyf.Dictionary({
+                "Title": pydyf.String(label),
+                "Dest": pydyf.Array((self._pages[page].reference, "/XYZ", x, y, 0)),
+            })
+            self.pdf.add_object(outline)
+            child_outlines, child_count = self._write_outline(children, parent=outline)
+            outline["Count"] = -child_count if state == "closed" else child_count
+            if state != "closed":
+                count += child_count
+            if outlines:
+                outline["Prev"] = outlines[-1].reference
+                outlines[-1]["Next"] = outline.reference
+            if child_outlines:
+                outline["First"] = child_outlines[0].reference
+                outline["Last"] = child_outlines[-1].reference
+            if parent is not None:
+                outline["Parent"] = parent.reference
+            outlines.append(outline)
+        return outlines, count
+
+    def _label_width(self, text):
+        return sum(HELVETICA_WIDTHS.get(char, 556) for char in text) * self.font_size / 1000
+
+    def write(self, target):
+        """Write the merged document to the binary file object ``target``."""
+        total = len(self._pages)
+        for number, (stream, (left, bottom, right, top)) in enumerate(self._labels, start=1):
+            text = self.page_numbers.format(page=number, pages=total)
+            stream.stream = [b"Q"]
+            stream.begin_text()
+            stream.set_font_size(PAGE_NUMBER_FONT, self.font_size)
+            stream.set_color_rgb(self.gray, self.gray, self.gray)
+            stream.move_text_to(
+                round((left + right - self._label_width(text)) / 2, 2),
+                round(bottom + self.bottom_margin / 2 - self.font_size * 0.35, 2),
+            )
+            stream.show_text_string(text)
+            stream.end_text()
+            stream.compress = True
+
+        self.pdf.write(target, compress=True)
@@ -0,0 +1,64 @@
+# core/profile_utils.py
+#
+# Every API view needs the caller's UserProfile (user type, subscription
+# status). ProfileJWTAuthentication (core/authentication.py) loads it with
+# the user in one query, and this module optionally keeps that pair in a
+# short-lived per-process cache so repeat requests skip the database.
+
+import copy
+import threading
+import time
+
+from django.conf import settings
+
+from .models import UserProfile
+
+_users = {}
+_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, 'USER_PROFILE_CACHE_SECONDS', 0)
+
+
+def get_cached_user(user_id):
+    """A private copy of the cached user (with profile) for ``user_id``, or None."""
+    if _ttl() <= 0:
+        return None
+    with _lock:
+        entry = _users.get(str(user_id))
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    # Views may modify what they are handed; never share the cached instance
+    return copy.deepcopy(entry[1])
+
+
+def cache_user(user):
+    ttl = _ttl()
+    if ttl <= 0:
+        return
+    with _lock:
+        _users[str(user.pk)] = (time.monotonic() + ttl, copy.deepcopy(user))
+
+
+def invalidate_user(user_id):
+    with _lock:
+        _users.pop(str(user_id), None)
+
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
+
+
+def get_user_profile(user):
+    """
+    The user's profile; free when authentication attached it. Profiles are
+    created with their user (core/signals.py), so get_or_create is only a
+    fallback for users created with signals bypassed.
+    """
+    try:
+        return user.userprofile
+    except UserProfile.DoesNotExist:
+        profile, created = UserProfile.objects.get_or_create(user=user)
+        return profile
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 import os
-from .models import Property, Section, Document, PropertyImage, Note, WaitlistSignup
+from urllib.parse import urljoin
+from .models import Property, Section, Document, PropertyImage, Note, WaitlistSignup, ExportJob
 
 class SectionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,9 +17,12 @@ class DocumentSerializer(serializers.ModelSerializer):
         model = Document
         fields = [
             "id", "property", "section",
-            "file", "url", "filename", "uploaded_at"
+            "file", "url", "filename", "uploaded_at",
+            "file_size", "mime_type",
+        ]
+        read_only_fields = [
+            "id", "url", "filename", "uploaded_at", "file_size", "mime_type",
         ]
-        read_only_fields = ["id", "url", "filename", "uploaded_at"]
 
     def get_filename(self, obj):
         return os.path.basename(obj.file.name)
@@ -31,9 +35,13 @@ class PropertyImageSerializer(serializers.ModelSerializer):
         model = PropertyImage
         fields = [
             "id", "property", "section",
-            "image", "url", "filename", "uploaded_at"
+            "image", "url", "filename", "uploaded_at",
+            "file_size", "mime_type", "width", "height",
+        ]
+        read_only_fields = [
+            "id", "url", "filename", "uploaded_at",
+            "file_size", "mime_type", "width", "height",
         ]
-        read_only_fields = ["id", "url", "filename", "uploaded_at"]
 
     def validate_image(self, value):
         """Custom image validation with detailed logging"""
@@ -66,7 +74,10 @@ class PropertyImageSerializer(serializers.ModelSerializer):
     def get_url(self, obj):
         request = self.context.get("request")
         if request:
-            return request.build_absolute_uri(obj.image.url)
+            # Resolve the site root once per response, not once per image
+            if "absolute_root" not in self.context:
+                self.context["absolute_root"] = request.build_absolute_uri("/")
+            return urljoin(self.context["absolute_root"], obj.image.url)
         return obj.image.url
 
     def get_filename(self, obj):
@@ -78,6 +89,21 @@ class NoteSerializer(serializers.ModelSerializer):
         fields = ["id", "property", "section", "content", "created_at"]
         read_only_fields = ["id", "created_at"]
 
+class PropertyListSerializer(serializers.ModelSerializer):
+    """Dashboard listing: counts instead of nested items (see PropertyViewSet.get_queryset)."""
+    section_count = serializers.IntegerField(read_only=True)
+    document_count = serializers.IntegerField(read_only=True)
+    image_count = serializers.IntegerField(read_only=True)
+    note_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Property
+        fields = [
+            "id", "owner", "address", "description", "created_at",
+            "section_count", "document_count", "image_count", "note_count",
+        ]
+        read_only_fields = fields
+
 class PropertySerializer(serializers.ModelSerializer):
     sections = SectionSerializer(many=True, read_only=True)
     documents = DocumentSerializer(many=True, read_only=True)
@@ -98,3 +124,24 @@ class WaitlistSignupSerializer(serializers.ModelSerializer):
         model = WaitlistSignup
         fields = ["id", "email", "created_at"]
         read_only_fields = ["id", "created_at"]
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id", "property", "status", "error", "attempts",
+            "created_at", "started_at", "finished_at", "download_url",
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != "succeeded":
+            return None
+        path = f"/api/export-jobs/{obj.id}/download/"
+        request = self.context.get("request")
+        if request:
+            return request.build_absolute_uri(path)
+        return path
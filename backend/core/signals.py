@@ -0,0 +1,138 @@
+# core/signals.py
+
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Property, Section, Document, PropertyImage, Note,
+    PropertyChange, ExportCacheEntry, ExportFragment, UserProfile,
+)
+from .image_utils import generate_print_image
+from .document_utils import apply_file_metadata
+from .profile_utils import invalidate_user
+
+
+def _property_id_for(instance):
+    if getattr(instance, 'property_id', None):
+        return instance.property_id
+    # Documents may only be attached through their section
+    if getattr(instance, 'section_id', None):
+        return Section.objects.filter(pk=instance.section_id).values_list(
+            'property_id', flat=True
+        ).first()
+    return None
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Section)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_delete, sender=Note)
+def bump_property_revision(sender, instance, **kwargs):
+    """Any change under a property invalidates exports of the old revision."""
+    Property.bump_revision(_property_id_for(instance))
+
+
+CHANGE_KINDS = {
+    Section: 'section',
+    Document: 'document',
+    PropertyImage: 'image',
+    Note: 'note',
+}
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_save, sender=Note)
+def log_property_change(sender, instance, **kwargs):
+    PropertyChange.record(
+        _property_id_for(instance), CHANGE_KINDS[sender], instance.pk, 'upsert'
+    )
+
+
+@receiver(post_delete, sender=Section)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_delete, sender=Note)
+def log_property_deletion(sender, instance, origin=None, **kwargs):
+    # Only deletions started from within a property leave tombstones; when
+    # the property (or its owner) goes, its change log goes with it.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model not in CHANGE_KINDS:
+        return
+    PropertyChange.record(
+        _property_id_for(instance), CHANGE_KINDS[sender], instance.pk, 'delete'
+    )
+
+
+@receiver(post_delete, sender=ExportCacheEntry)
+@receiver(post_delete, sender=ExportFragment)
+def delete_export_cache_file(sender, instance, **kwargs):
+    if instance.file:
+        instance.file.delete(save=False)
+
+
+@receiver(pre_save, sender=PropertyImage)
+def detect_image_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        instance._image_changed = False
+    elif instance.pk is None or (instance.image and not instance.image._committed):
+        instance._image_changed = True
+    else:
+        stored = PropertyImage.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+        instance._image_changed = stored != instance.image.name
+
+
+@receiver(post_save, sender=PropertyImage)
+def create_print_image(sender, instance, raw=False, **kwargs):
+    # Edits that keep the photo (moving it to another section) must not re-encode it
+    if raw:
+        return
+    if instance.print_image and not getattr(instance, '_image_changed', True):
+        return
+    generate_print_image(instance)
+
+
+@receiver(post_delete, sender=PropertyImage)
+def delete_print_image(sender, instance, **kwargs):
+    if instance.print_image:
+        instance.print_image.delete(save=False)
+
+
+@receiver(pre_save, sender=Document)
+def record_document_metadata(sender, instance, **kwargs):
+    # An uncommitted file is a fresh upload that is about to be stored
+    if instance.file and not instance.file._committed:
+        apply_file_metadata(instance, instance.file)
+
+
+@receiver(pre_save, sender=PropertyImage)
+def record_image_metadata(sender, instance, **kwargs):
+    if instance.image and not instance.image._committed:
+        apply_file_metadata(instance, instance.image)
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    # Every user has a profile from the start, so views never have to
+    # get_or_create one
+    if created and not raw:
+        UserProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
@@ -0,0 +1,140 @@
+# core/subscription_sync.py
+#
+# Reconciliation of local subscription state with Stripe, for webhooks
+# that were missed or applied out of order. Subscriptions are paged from
+# a client (the Stripe API, or fixture files locally), matched to profiles
+# a chunk at a time by the indexed stripe_customer_id, and the changed
+# profiles are written back with bulk_update.
+
+import json
+from itertools import islice
+
+import stripe
+from django.conf import settings
+from django.utils import timezone
+
+from .entitlement_utils import sync_account_entitlements
+from .models import UserProfile
+from .webhook_views import get_period_end, get_subscription_status, get_tier_from_price_id
+
+RECONCILED_FIELDS = [
+    'subscription_status', 'subscription_tier', 'stripe_subscription_id', 'updated_at',
+]
+
+
+class StripeSubscriptionClient:
+    """Pages of subscriptions (every status) from the Stripe API."""
+
+    def list_subscriptions(self, limit, starting_after=None):
+        params = {'limit': limit, 'status': 'all', 'api_key': settings.STRIPE_SECRET_KEY}
+        if starting_after:
+            params['starting_after'] = starting_after
+        page = stripe.Subscription.list(**params)
+        return {'data': page['data'], 'has_more': page['has_more']}
+
+
+class FixtureSubscriptionClient:
+    """
+    Stands in for StripeSubscriptionClient with subscriptions read from
+    JSON files (lists of subscriptions, or Stripe list responses), paged
+    newest first as Stripe does.
+    """
+
+    def __init__(self, paths):
+        subscriptions = []
+        for path in paths:
+            with open(path) as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get('object') == 'list':
+                data = data['data']
+            subscriptions.extend(data if isinstance(data, list) else [data])
+        self.subscriptions = sorted(
+            subscriptions, key=lambda subscription: subscription.get('created', 0), reverse=True
+        )
+
+    def list_subscriptions(self, limit, starting_after=None):
+        start = 0
+        if starting_after:
+            ids = [subscription['id'] for subscription in self.subscriptions]
+            start = ids.index(starting_after) + 1
+        page = self.subscriptions[start:start + limit]
+        return {'data': page, 'has_more': start + limit < len(self.subscriptions)}
+
+
+def iter_subscriptions(client, page_size=100):
+    starting_after = None
+    while True:
+        page = client.list_subscriptions(limit=page_size, starting_after=starting_after)
+        yield from page['data']
+        if not page['has_more'] or not page['data']:
+            return
+        starting_after = page['data'][-1]['id']
+
+
+def _customer_id(subscription):
+    customer = subscription['customer']
+    return customer['id'] if isinstance(customer, dict) else customer
+
+
+def _subscription_tier(subscription):
+    items = subscription.get('items')
+    if items and items['data']:
+        return get_tier_from_price_id(items['data'][0]['price']['id'])
+    return None
+
+
+def reconcile_subscriptions(subscriptions, chunk_size=500, dry_run=False):
+    """
+    Bring profiles in line with ``subscriptions``, newest first per
+    customer, as Stripe lists them. Each chunk costs one query to load the
+    matching profiles and one bulk_update for those that changed; their
+    export entitlements are then resynced. Returns (seen, updated,
+    unknown customers) counts.
+    """
+    seen = updated = unknown = 0
+    reconciled_customers = set()
+    subscriptions = iter(subscriptions)
+
+    while True:
+        chunk = list(islice(subscriptions, chunk_size))
+        if not chunk:
+            break
+        seen += len(chunk)
+
+        latest = {}
+        for subscription in chunk:
+            customer_id = _customer_id(subscription)
+            # Only a customer's newest subscription counts
+            if customer_id not in reconciled_customers and customer_id not in latest:
+                latest[customer_id] = subscription
+        reconciled_customers.update(latest)
+
+        profiles = UserProfile.objects.filter(stripe_customer_id__in=list(latest))
+        found = 0
+        changed = []
+        now = timezone.now()
+        for profile in profiles:
+            found += 1
+            subscription = latest[profile.stripe_customer_id]
+            values = {
+                'subscription_status': get_subscription_status(subscription['status']),
+                'subscription_tier': _subscription_tier(subscription) or profile.subscription_tier,
+                'stripe_subscription_id': subscription['id'],
+            }
+            if all(getattr(profile, field) == value for field, value in values.items()):
+                continue
+            for field, value in values.items():
+                setattr(profile, field, value)
+            profile.updated_at = now
+            changed.append((profile, subscription))
+        unknown += len(latest) - found
+
+        if changed and not dry_run:
+            UserProfile.objects.bulk_update(
+                [profile for profile, subscription in changed], RECONCILED_FIELDS
+            )
+            for profile, subscription in changed:
+                sync_account_entitlements(profile, get_period_end(subscription))
+        updated += len(changed)
+
+    return seen, updated, unknown
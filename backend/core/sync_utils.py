@@ -0,0 +1,77 @@
+# core/sync_utils.py
+
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import Section, Document, PropertyImage, Note, PropertyChange
+from .serializers import (
+    SectionSerializer,
+    DocumentSerializer,
+    PropertyImageSerializer,
+    NoteSerializer,
+)
+
+# (response key, PropertyChange.kind, model, serializer, ordering)
+SYNC_KINDS = (
+    ("sections",  "section",  Section,       SectionSerializer,       ("created_at", "id")),
+    ("documents", "document", Document,      DocumentSerializer,      ("uploaded_at", "id")),
+    ("images",    "image",    PropertyImage, PropertyImageSerializer, ("uploaded_at", "id")),
+    ("notes",     "note",     Note,          NoteSerializer,          ("created_at", "id")),
+)
+
+
+def current_sync_token(prop):
+    """Highest committed change sequence for ``prop``; an index lookup."""
+    return PropertyChange.latest_sequence(prop.pk)
+
+
+def _property_items(model, prop):
+    if model is Document:
+        # Documents may be attached through their section only
+        return Document.objects.filter(Q(property=prop) | Q(section__property=prop))
+    return model.objects.filter(property=prop)
+
+
+def property_delta(prop, since, context):
+    """
+    Everything under ``prop`` that changed after sync token ``since``:
+    serialized sections, documents, images and notes created or updated,
+    plus the ids of those deleted. ``since`` of 0 (or a token from the
+    future) returns a full snapshot instead. Cost is one query for the
+    change log and at most one per kind, proportional to what changed.
+    """
+    token = current_sync_token(prop)
+    full = since <= 0 or since > token
+
+    changed = defaultdict(list)
+    deleted = defaultdict(list)
+    if not full:
+        rows = PropertyChange.objects.filter(
+            property=prop, sequence__gt=since, sequence__lte=token
+        ).values_list("kind", "object_id", "action")
+        for kind, object_id, action in rows:
+            (deleted if action == "delete" else changed)[kind].append(object_id)
+
+    payload = {
+        "token": str(token),
+        "full": full,
+        "property": {
+            "id": prop.id,
+            "address": prop.address,
+            "description": prop.description,
+            "revision": prop.revision,
+            "updated_at": prop.updated_at,
+        },
+        "deleted": {},
+    }
+    for key, kind, model, serializer_class, ordering in SYNC_KINDS:
+        if full:
+            items = _property_items(model, prop).order_by(*ordering)
+        elif changed[kind]:
+            items = model.objects.filter(pk__in=changed[kind]).order_by(*ordering)
+        else:
+            items = []
+        payload[key] = serializer_class(items, many=True, context=context).data
+        payload["deleted"][key] = sorted(deleted[kind])
+    return payload
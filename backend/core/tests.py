@@ -1,3 +1,1919 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import zipfile
+from concurrent.futures import Future
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import pydyf
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.template.loader import get_template
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from .models import (
+    Property, Section, Document, PropertyImage, Note, ExportFragment, PropertyChange,
+    ExportCacheEntry, UserProfile, Payment, ExportEntitlement, EmailOutbox, ExportJob,
+    WaitlistSignup, CampaignDelivery, WebhookEvent,
+)
+from .profile_utils import clear_user_cache
+from .entitlement_utils import (
+    export_access,
+    grant_property_entitlement,
+    sync_account_entitlements,
+    user_entitlements,
+)
+from .webhook_views import handle_subscription_created, handle_subscription_deleted
+from .export_context import build_export_context
+from .document_utils import sniff_mime_type
+from .export_fetcher import LocalURLFetcher
+from . import batch_export
+from .export_renderer import EXPORT_STYLESHEET, PDFRenderer
+from .http_utils import _parse_range, ranged_file_response
+from .image_utils import PRINT_DPI, make_print_derivative, print_box_pixels
+from .export_benchmark import benchmark_export, generate_synthetic_property
+from .export_cache import (
+    evict_export_cache, export_fingerprint, get_cached_export, store_export, store_fragment,
+)
+from .export_sections import plan_fragments, render_property_pdf_by_section
+from .pdf_merge import PDFMerger, PDFReader
+from .email_outbox import MAX_EMAIL_ATTEMPTS
+from .export_utils import (
+    MAX_JOB_ATTEMPTS, STALE_JOB_SECONDS, claim_next_export_job, get_export_artifact,
+    queue_export_job, run_export_job,
+)
+from .subscription_sync import FixtureSubscriptionClient, iter_subscriptions
+from .email_render import BulkEmail, html_to_text, render_email
+from .email_utils import send_welcome_email
+from .waitlist_campaign import send_waitlist_campaign
+
+BASE_URL = "http://testserver/"
+
+
+def weasyprint_available():
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+def make_property(owner, sections, items_per_section, loose_items=0):
+    """Bulk-create a property tree (bypasses signals, so it is quick)."""
+    prop = Property.objects.create(owner=owner, address=f"{sections} Bench St")
+    secs = Section.objects.bulk_create(
+        Section(property=prop, title=f"Room {n}") for n in range(sections)
+    )
+    docs, images, notes = [], [], []
+    for sec in secs + [None] * loose_items:
+        for n in range(items_per_section if sec else 1):
+            docs.append(Document(property=prop, section=sec, file=f"documents/doc_{n}.pdf"))
+            images.append(PropertyImage(property=prop, section=sec, image=f"property_images/img_{n}.jpg"))
+            notes.append(Note(property=prop, section=sec, content=f"Note {n}"))
+    Document.objects.bulk_create(docs)
+    PropertyImage.objects.bulk_create(images)
+    Note.objects.bulk_create(notes)
+    return prop
+
+
+class ExportContextTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw")
+
+    def test_items_are_grouped_by_section(self):
+        prop = make_property(self.user, sections=3, items_per_section=2)
+        ctx = build_export_context(prop, self.user, BASE_URL)
+
+        self.assertEqual(len(ctx["sections_data"]), 3)
+        for sec in ctx["sections_data"]:
+            self.assertEqual(len(sec["documents"]), 2)
+            self.assertEqual(len(sec["images"]), 2)
+            self.assertEqual(len(sec["notes"]), 2)
+        self.assertIsNone(ctx["unsectioned_data"])
+
+    def test_unsectioned_items_are_exposed(self):
+        prop = make_property(self.user, sections=2, items_per_section=1, loose_items=3)
+        ctx = build_export_context(prop, self.user, BASE_URL)
+
+        loose = ctx["unsectioned_data"]
+        self.assertEqual(len(loose["documents"]), 3)
+        self.assertEqual(len(loose["images"]), 3)
+        self.assertEqual(len(loose["notes"]), 3)
+        self.assertEqual(ctx["total_notes"], 5)
+
+    def test_query_count_does_not_grow_with_size(self):
+        small = make_property(self.user, sections=2, items_per_section=2)
+        large = make_property(self.user, sections=50, items_per_section=10)
+
+        with self.assertNumQueries(4):
+            build_export_context(small, self.user, BASE_URL)
+        with self.assertNumQueries(4):
+            build_export_context(large, self.user, BASE_URL)
+
+
+class ExportContextBenchmark(TestCase):
+    """Context building must stay linear in sections + items."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("bench", "bench@example.com", "pw")
+
+    def time_build(self, prop, repeat=3):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            build_export_context(prop, self.user, BASE_URL)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def test_scales_linearly(self):
+        # 100 sections / 1,000 of each item type vs. 400 / 4,000. A nested
+        # scan would take ~16x as long for the larger property.
+        small = make_property(self.user, sections=100, items_per_section=10)
+        large = make_property(self.user, sections=400, items_per_section=10)
+
+        small_time = self.time_build(small)
+        large_time = self.time_build(large)
+
+        self.assertLess(large_time / small_time, 8)
+
+
+class ExportBenchmarkSuite(TestCase):
+    """Smoke-runs the benchmark harness used by `manage.py benchmark_export`."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("suite", "suite@example.com", "pw")
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def make_property(self):
+        return generate_synthetic_property(
+            self.user, sections=2, documents=1, images=2, notes=1,
+            image_size=(800, 600), document_bytes=4096,
+        )
+
+    def test_generator_builds_requested_tree(self):
+        prop = self.make_property()
+
+        self.assertEqual(prop.sections.count(), 2)
+        self.assertEqual(prop.documents.count(), 2)
+        self.assertEqual(prop.images.count(), 4)
+        self.assertEqual(prop.notes.count(), 2)
+        doc = prop.documents.first()
+        self.assertEqual(doc.file_size, 4096)
+        self.assertTrue(all(img.print_image for img in prop.images.all()))
+
+    def test_report_covers_pre_layout_stages(self):
+        prop = self.make_property()
+        report = benchmark_export(prop, self.user, BASE_URL, repeat=2, include_pdf=False)
+
+        self.assertEqual(set(report["stages"]), {"queries", "context", "template"})
+        self.assertEqual(report["stages"]["queries"]["queries"], 4)
+        self.assertGreater(report["peak_rss_kb"], 0)
+        json.dumps(report)
+
+    @unittest.skipUnless(weasyprint_available(), "WeasyPrint system libraries not installed")
+    def test_report_covers_pdf_stages(self):
+        prop = self.make_property()
+        report = benchmark_export(prop, self.user, BASE_URL, repeat=1)
+
+        self.assertIn("layout", report["stages"])
+        self.assertIn("write_pdf", report["stages"])
+        self.assertEqual(report["stages"]["layout"]["remote_fetches"], 0)
+        self.assertGreater(report["output_bytes"], 0)
+
+
+def make_pdf(pages, text, compress=True):
+    """A small PDF laid out the way WeasyPrint writes one (shared resources)."""
+    pdf = pydyf.PDF()
+    font = pydyf.Dictionary({"Type": "/Font", "Subtype": "/Type1", "BaseFont": "/Times-Roman"})
+    pdf.add_object(font)
+    resources = pydyf.Dictionary({"Font": pydyf.Dictionary({"F1": font.reference})})
+    pdf.add_object(resources)
+    for n in range(pages):
+        stream = pydyf.Stream(compress=compress)
+        stream.begin_text()
+        stream.set_font_size("F1", 12)
+        stream.show_text_string(f"{text} ({n})")
+        stream.end_text()
+        pdf.add_object(stream)
+        pdf.add_page(pydyf.Dictionary({
+            "Type": "/Page",
+            "MediaBox": pydyf.Array([0, 0, 595, 842]),
+            "Contents": stream.reference,
+            "Resources": resources.reference,
+        }))
+    pdf.info["Title"] = pydyf.String(text)
+    output = io.BytesIO()
+    pdf.write(output, compress=compress)
+    return output.getvalue()
+
+
+class PDFMergeTests(TestCase):
+    def merge(self, fragments, bookmarks=()):
+        merger = PDFMerger(page_numbers="Page {page} of {pages}")
+        firsts = [merger.append(fragment) for fragment in fragments]
+        merger.add_outline(bookmarks)
+        output = io.BytesIO()
+        merger.write(output)
+        return firsts, PDFReader(output.getvalue())
+
+    def page_text(self, reader, index):
+        pages, _ = reader.pages()
+        contents = reader.resolve(pages[index][1][b"Contents"])
+        return b"".join(reader.resolve(ref).decoded() for ref in contents)
+
+    def test_pages_are_concatenated_and_numbered(self):
+        firsts, reader = self.merge([
+            make_pdf(1, "Cover"),
+            make_pdf(2, "Kitchen", compress=False),
+            make_pdf(3, "Garage"),
+        ])
+
+        self.assertEqual(firsts, [0, 1, 3])
+        self.assertEqual(len(reader.pages()[0]), 6)
+        self.assertIn(b"(Kitchen \\(1\\))", self.page_text(reader, 2))
+        self.assertIn(b"(Page 3 of 6)", self.page_text(reader, 2))
+        self.assertIn(b"(Page 6 of 6)", self.page_text(reader, 5))
+        self.assertEqual(reader.resolve(reader.trailer[b"Info"])[b"Title"], b"(Cover)")
+
+    def test_outline_nests_by_level_across_fragments(self):
+        _, reader = self.merge(
+            [make_pdf(1, "Cover"), make_pdf(1, "Kitchen"), make_pdf(1, "Garage")],
+            bookmarks=[
+                (1, "1 Main St", 0, 0, 800, "open"),
+                (2, "Kitchen", 1, 0, 800, "open"),
+                (3, "Images", 1, 0, 400, "open"),
+                (2, "Garage", 2, 0, 800, "open"),
+            ],
+        )
+
+        catalog = reader.resolve(reader.trailer[b"Root"])
+        outline = reader.resolve(catalog[b"Outlines"])
+        top = reader.resolve(outline[b"First"])
+        self.assertEqual(top[b"Title"], b"(1 Main St)")
+        self.assertNotIn(b"Next", top)
+        kitchen = reader.resolve(top[b"First"])
+        garage = reader.resolve(kitchen[b"Next"])
+        self.assertEqual(garage[b"Title"], b"(Garage)")
+        self.assertEqual(reader.resolve(kitchen[b"First"])[b"Title"], b"(Images)")
+
+        pages, _ = reader.pages()
+        self.assertEqual(garage[b"Dest"][0].number, pages[2][0])
+
+
+class SectionFragmentPlanTests(TestCase):
+    def test_cover_sections_and_loose_items_each_get_a_fragment(self):
+        user = User.objects.create_user("planner", "planner@example.com", "pw")
+        prop = make_property(user, sections=3, items_per_section=1, loose_items=1)
+        fragments = plan_fragments(build_export_context(prop, user, BASE_URL))
+
+        self.assertEqual(len(fragments), 6)
+        self.assertTrue(fragments[0]["fragment_cover"])
+        self.assertEqual(
+            [f["fragment_section"]["title"] for f in fragments[1:5]],
+            ["Room 0", "Room 1", "Room 2", "General"],
+        )
+        self.assertEqual([bool(f.get("fragment_footer")) for f in fragments], [False] * 5 + [True])
+
+
+class IncrementalExportTests(TestCase):
+    """Re-exports only lay out fragments whose content changed."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("seller", "seller@example.com", "pw")
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.rendered = []
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def fake_render(self, prop, base_url, html_by_fingerprint):
+        # Stands in for the WeasyPrint worker pool
+        self.rendered.append(list(html_by_fingerprint.values()))
+        return {
+            fingerprint: store_fragment(prop, fingerprint, io.BytesIO(make_pdf(1, "Fragment")), 1, [])
+            for fingerprint in html_by_fingerprint
+        }
+
+    def export(self, prop):
+        output = io.BytesIO()
+        with mock.patch("core.export_sections._render_fragments", side_effect=self.fake_render):
+            render_property_pdf_by_section(prop, self.user, BASE_URL, output)
+        return PDFReader(output.getvalue())
+
+    def test_only_changed_sections_are_rendered_again(self):
+        prop = make_property(self.user, sections=4, items_per_section=1)
+        reader = self.export(prop)
+        self.assertEqual(len(self.rendered[0]), 6)
+        self.assertEqual(len(reader.pages()[0]), 6)
+
+        kitchen = prop.sections.get(title="Room 2")
+        Note.objects.create(property=prop, section=kitchen, content="New dishwasher")
+        prop.refresh_from_db()
+        reader = self.export(prop)
+
+        sections = [html for html in self.rendered[1] if 'class="section"' in html]
+        self.assertEqual(len(sections), 1)
+        self.assertIn("New dishwasher", sections[0])
+        self.assertEqual(len(reader.pages()[0]), 6)
+        # The old version of the changed section is pruned
+        self.assertLessEqual(ExportFragment.objects.filter(property=prop).count(), 6)
+
+    def test_unchanged_property_reuses_every_section(self):
+        prop = make_property(self.user, sections=3, items_per_section=2)
+        self.export(prop)
+        self.export(prop)
+
+        # Only the cover and footer (which show the export time) may repeat
+        for batch in self.rendered[1:]:
+            self.assertFalse(any('class="section"' in html for html in batch))
+
+
+class ExportCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seller", "seller@example.com", "pw")
+        self.prop = Property.objects.create(owner=self.user, address="1 Cache St")
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def store(self, prop, size=100):
+        return store_export(prop, BASE_URL, io.BytesIO(b"%PDF" + b"x" * (size - 4)))
+
+    def test_fingerprint_covers_revision_base_url_and_layout(self):
+        fingerprint = export_fingerprint(self.prop, BASE_URL)
+        self.assertEqual(fingerprint, export_fingerprint(self.prop, BASE_URL))
+        self.assertNotEqual(fingerprint, export_fingerprint(self.prop, "https://other.example/"))
+        with override_settings(EXPORT_SECTION_WORKERS=2):
+            self.assertNotEqual(fingerprint, export_fingerprint(self.prop, BASE_URL))
+        self.prop.revision += 1
+        self.assertNotEqual(fingerprint, export_fingerprint(self.prop, BASE_URL))
+
+    def test_a_new_day_is_a_miss(self):
+        today = timezone.localdate()
+        with mock.patch("core.export_cache.export_date", return_value=today):
+            self.store(self.prop)
+            self.assertIsNotNone(get_cached_export(self.prop, BASE_URL))
+        # The cached PDF says "Generated On" today; tomorrow it must be redone
+        with mock.patch("core.export_cache.export_date", return_value=today + timedelta(days=1)):
+            self.assertIsNone(get_cached_export(self.prop, BASE_URL))
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(get_cached_export(self.prop, BASE_URL))
+        entry = self.store(self.prop)
+
+        hit = get_cached_export(self.prop, BASE_URL)
+        self.assertEqual(hit.pk, entry.pk)
+        self.assertGreaterEqual(hit.last_accessed_at, entry.last_accessed_at)
+        self.assertEqual(hit.file.read()[:4], b"%PDF")
+
+    def test_missing_file_is_a_miss(self):
+        entry = self.store(self.prop)
+        entry.file.storage.delete(entry.file.name)
+        self.assertIsNone(get_cached_export(self.prop, BASE_URL))
+        self.assertFalse(ExportCacheEntry.objects.exists())
+
+    def test_child_changes_invalidate(self):
+        self.store(self.prop)
+        note = Note.objects.create(property=self.prop, content="New roof")
+        self.prop.refresh_from_db()
+        self.assertIsNone(get_cached_export(self.prop, BASE_URL))
+
+        old = ExportCacheEntry.objects.get()
+        self.store(self.prop)
+        # Storing the new revision drops the old one and its file
+        self.assertFalse(ExportCacheEntry.objects.filter(pk=old.pk).exists())
+        self.assertFalse(old.file.storage.exists(old.file.name))
+
+        note.delete()
+        self.prop.refresh_from_db()
+        self.assertIsNone(get_cached_export(self.prop, BASE_URL))
+
+    def test_lru_eviction_keeps_the_entry_being_served(self):
+        props = [
+            Property.objects.create(owner=self.user, address=f"{n} Evict Ave") for n in range(3)
+        ]
+        with override_settings(EXPORT_CACHE_MAX_BYTES=10_000):
+            entries = [self.store(prop) for prop in props]
+        # Touch the oldest so the middle one is least recently used
+        get_cached_export(props[0], BASE_URL)
+
+        removed = evict_export_cache(max_bytes=250, keep=entries[2])
+        self.assertEqual(removed, 1)
+        self.assertEqual(
+            set(ExportCacheEntry.objects.values_list("pk", flat=True)),
+            {entries[0].pk, entries[2].pk},
+        )
+
+        # The kept entry survives even when it alone is over budget
+        evict_export_cache(max_bytes=0, keep=entries[2])
+        self.assertEqual(list(ExportCacheEntry.objects.values_list("pk", flat=True)), [entries[2].pk])
+
+
+class LocalURLFetcherTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.media_root = f"{self.tmp}/media"
+        os.makedirs(f"{self.media_root}/property_images")
+        with open(f"{self.media_root}/property_images/front door.jpg", "wb") as f:
+            f.write(b"jpeg bytes")
+        with open(f"{self.tmp}/secret.txt", "w") as f:
+            f.write("outside MEDIA_ROOT")
+
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, MEDIA_URL="/media/",
+            STATIC_ROOT=f"{self.tmp}/static", STATIC_URL="/static/",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.fetcher = LocalURLFetcher(BASE_URL)
+
+    def test_resolves_media_and_static_to_disk(self):
+        image = f"{self.media_root}/property_images/front door.jpg"
+        self.assertEqual(self.fetcher.resolve(f"{BASE_URL}media/property_images/front%20door.jpg"), image)
+        self.assertEqual(self.fetcher.resolve("/media/property_images/front%20door.jpg"), image)
+        # Static files that are not collected yet come from the finders
+        self.assertTrue(
+            self.fetcher.resolve("/static/admin/css/base.css").endswith("admin/css/base.css")
+        )
+
+    def test_foreign_and_missing_urls_are_not_local(self):
+        for url in [
+            "https://cdn.example.com/media/property_images/front%20door.jpg",
+            "data:image/png;base64,AAAA",
+            "/media/property_images/missing.jpg",
+            "/elsewhere/front.jpg",
+        ]:
+            self.assertIsNone(self.fetcher.resolve(url), url)
+
+    def test_paths_escaping_the_roots_are_refused(self):
+        for url in [
+            "/media/../secret.txt",
+            "/media/property_images/../../secret.txt",
+            "/media/%2e%2e/secret.txt",
+            "/static/../media/../secret.txt",
+            "/static/admin/../../../../etc/passwd",
+        ]:
+            self.assertIsNone(self.fetcher.resolve(url), url)
+
+    def test_serves_local_files_and_falls_back_to_http(self):
+        result = self.fetcher(f"{BASE_URL}media/property_images/front%20door.jpg")
+        self.assertEqual(result["mime_type"], "image/jpeg")
+        self.assertEqual(result["file_obj"][:], b"jpeg bytes")
+        result["file_obj"].close()
+
+        weasyprint = mock.Mock()
+        weasyprint.default_url_fetcher.return_value = {"string": b"remote"}
+        with mock.patch.dict(sys.modules, {"weasyprint": weasyprint}):
+            result = self.fetcher("/media/../secret.txt")
+        self.assertEqual(result, {"string": b"remote"})
+        weasyprint.default_url_fetcher.assert_called_once_with(
+            "/media/../secret.txt", timeout=10, ssl_context=None
+        )
+        self.assertEqual((self.fetcher.local_count, self.fetcher.remote_count), (1, 1))
+
+
+def image_upload(name, size, mode="RGB", fmt="PNG", exif=None):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    options = {"exif": exif} if exif is not None else {}
+    Image.new(mode, size, (200, 30, 30, 128)[:len(mode)]).save(buffer, fmt, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class PrintImageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seller", "seller@example.com", "pw")
+        self.prop = Property.objects.create(owner=self.user, address="1 Photo St")
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def open_image(self, field_file):
+        from PIL import Image
+
+        field_file.open("rb")
+        self.addCleanup(field_file.close)
+        return Image.open(field_file)
+
+    def test_derivative_fits_the_print_box(self):
+        from PIL import Image
+
+        max_w, max_h = print_box_pixels()
+        content = make_print_derivative(image_upload("wide.png", (3000, 1000), mode="RGBA"))
+        with Image.open(io.BytesIO(content.read())) as im:
+            self.assertEqual((im.format, im.mode), ("JPEG", "RGB"))
+            self.assertEqual(im.size, (max_w, max_w // 3))
+            self.assertEqual(round(im.info["dpi"][0]), PRINT_DPI)
+            self.assertNotIn("exif", im.info)
+
+    def test_exif_orientation_is_applied(self):
+        from PIL import Image
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise
+        upload = image_upload("phone.jpg", (1000, 400), fmt="JPEG", exif=exif.tobytes())
+        content = make_print_derivative(upload)
+        with Image.open(io.BytesIO(content.read())) as im:
+            # Portrait once rotated, so the height bound applies
+            self.assertEqual(im.size, (140, print_box_pixels()[1]))
+
+    def test_regenerated_only_when_the_photo_changes(self):
+        image = PropertyImage.objects.create(
+            property=self.prop, image=image_upload("front.png", (2000, 1500))
+        )
+        first = image.print_image.name
+        self.assertTrue(first.startswith("property_images/print/"))
+        self.assertLessEqual(self.open_image(image.print_image).size[0], print_box_pixels()[0])
+
+        with mock.patch("core.signals.generate_print_image") as generate:
+            image.section = Section.objects.create(property=self.prop, title="Porch")
+            image.save()
+            image.save(update_fields=["section"])
+        generate.assert_not_called()
+
+        image.image = image_upload("back.png", (1200, 900))
+        image.save()
+        image.refresh_from_db()
+        self.assertNotEqual(image.print_image.name, first)
+        self.assertTrue(image.print_image.storage.exists(image.print_image.name))
+        self.assertFalse(image.print_image.storage.exists(first))
+
+    def test_missing_derivative_is_rebuilt_on_save(self):
+        image = PropertyImage.objects.create(
+            property=self.prop, image=image_upload("front.png", (800, 600))
+        )
+        PropertyImage.objects.filter(pk=image.pk).update(print_image="")
+        image.refresh_from_db()
+        image.save()
+        image.refresh_from_db()
+        self.assertTrue(image.print_image)
+
+    def test_backfill_bumps_the_property_revision(self):
+        image = PropertyImage.objects.create(
+            property=self.prop, image=image_upload("front.png", (800, 600))
+        )
+        other = Property.objects.create(owner=self.user, address="2 Photo St")
+        PropertyImage.objects.filter(pk=image.pk).update(print_image="")
+        self.prop.refresh_from_db()
+        revision, other_revision = self.prop.revision, other.revision
+
+        call_command("generate_print_images", stdout=io.StringIO())
+
+        self.prop.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.prop.revision, revision + 1)
+        self.assertEqual(other.revision, other_revision)
+
+    def test_unreadable_image_keeps_the_original(self):
+        with self.assertLogs("core.image_utils", "ERROR"):
+            image = PropertyImage.objects.create(
+                property=self.prop, image=SimpleUploadedFile("broken.jpg", b"not an image")
+            )
+        image.refresh_from_db()
+        self.assertFalse(image.print_image)
+
+
+class RangedFileResponseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seller", "seller@example.com", "pw")
+        self.prop = Property.objects.create(owner=self.user, address="1 Range Rd")
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.body = bytes(range(256)) * 4
+        self.document = Document.objects.create(
+            property=self.prop, file=SimpleUploadedFile("report.pdf", self.body)
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def get(self, range_header=None):
+        headers = {"HTTP_RANGE": range_header} if range_header else {}
+        request = RequestFactory().get("/download", **headers)
+        response = ranged_file_response(
+            request, self.document.file, "report.pdf", "application/pdf"
+        )
+        self.addCleanup(response.close)
+        return response
+
+    def test_parse_range(self):
+        size = 1000
+        self.assertEqual(_parse_range("bytes=0-99", size), (0, 99))
+        self.assertEqual(_parse_range("bytes=900-5000", size), (900, 999))
+        self.assertEqual(_parse_range("bytes=-100", size), (900, 999))
+        self.assertEqual(_parse_range("bytes=-5000", size), (0, 999))
+        self.assertEqual(_parse_range("bytes=500-", size), (500, 999))
+        self.assertIs(_parse_range("bytes=1000-", size), False)
+        self.assertIs(_parse_range("bytes=20-10", size), False)
+        self.assertIs(_parse_range("bytes=-0", size), False)
+        # Not handled: the whole file is sent
+        for header in [None, "", "bytes=-", "bytes=0-10,20-30", "items=0-10", "bytes=a-b"]:
+            self.assertIsNone(_parse_range(header, size), header)
+        self.assertIsNone(_parse_range("bytes=0-10", 0))
+
+    def test_full_response(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Length"], str(len(self.body)))
+        self.assertEqual(b"".join(response.streaming_content), self.body)
+
+    def test_single_suffix_and_open_ended_ranges(self):
+        for header, start, end in [
+            ("bytes=10-19", 10, 19),
+            ("bytes=-16", len(self.body) - 16, len(self.body) - 1),
+            ("bytes=1000-", 1000, len(self.body) - 1),
+        ]:
+            response = self.get(header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{len(self.body)}")
+            self.assertEqual(response["Content-Length"], str(end - start + 1))
+            self.assertEqual(b"".join(response.streaming_content), self.body[start:end + 1])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(f"bytes={len(self.body)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.body)}")
+
+    def test_multiple_ranges_get_the_whole_file(self):
+        response = self.get("bytes=0-9,20-29")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.body)
+
+    def test_range_chunks_do_not_count_as_exports(self):
+        grant_property_entitlement(self.user, self.prop)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f"/api/properties/{self.prop.id}/export/"
+
+        def fake_render(prop, user, base_url, target):
+            target.write(self.body)
+
+        with mock.patch("core.export_utils.render_property_pdf", side_effect=fake_render), \
+                mock.patch("core.views.record_export") as record:
+            for header in ["bytes=0-99", "bytes=100-"]:
+                response = client.get(url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                response.close()
+            record.assert_not_called()
+
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            response.close()
+            record.assert_called_once()
+
+
+class PDFRendererTests(TestCase):
+    def fake_weasyprint(self):
+        weasyprint = mock.MagicMock()
+        modules = {
+            "weasyprint": weasyprint,
+            "weasyprint.text": weasyprint.text,
+            "weasyprint.text.fonts": weasyprint.text.fonts,
+        }
+        patcher = mock.patch.dict(sys.modules, modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return weasyprint
+
+    def test_warm_up_parses_the_stylesheet_once(self):
+        weasyprint = self.fake_weasyprint()
+        renderer = PDFRenderer()
+        self.assertFalse(renderer.stats()["warm"])
+
+        renderer.warm_up()
+        renderer.warm_up()
+        # The export stylesheet plus the fragment override, parsed once
+        self.assertEqual(weasyprint.CSS.call_count, 2)
+        self.assertEqual(
+            weasyprint.CSS.call_args_list[0].kwargs["string"],
+            get_template(EXPORT_STYLESHEET).template.source,
+        )
+        self.assertEqual(weasyprint.text.fonts.FontConfiguration.call_count, 1)
+
+        stats = renderer.stats()
+        self.assertTrue(stats["warm"])
+        self.assertIsNotNone(stats["warmup_seconds"])
+
+    def test_counts_cold_and_warm_renders(self):
+        weasyprint = self.fake_weasyprint()
+        renderer = PDFRenderer()
+        fetcher = LocalURLFetcher(BASE_URL)
+
+        for n in range(3):
+            renderer.write_pdf(f"<p>{n}</p>", BASE_URL, io.BytesIO(), url_fetcher=fetcher)
+
+        stats = renderer.stats()
+        self.assertEqual((stats["cold_renders"], stats["warm_renders"]), (1, 2))
+        self.assertIsNotNone(stats["last_render_seconds"])
+        self.assertEqual(weasyprint.CSS.call_count, 2)
+        # Every render reuses the parsed stylesheet and font configuration
+        for call in weasyprint.HTML.return_value.render.call_args_list[1:]:
+            self.assertIs(call.kwargs["stylesheets"], renderer.stylesheets)
+            self.assertIs(call.kwargs["font_config"], renderer.font_config)
+
+    def test_health_endpoint_reports_this_worker(self):
+        self.fake_weasyprint()
+        worker_renderer = PDFRenderer()
+        worker_renderer.write_pdf("<p>hi</p>", BASE_URL, io.BytesIO(), url_fetcher=None)
+
+        with mock.patch("core.views.renderer", worker_renderer):
+            response = APIClient().get("/api/health/renderer/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["cold_renders"], 1)
+        self.assertTrue(response.data["warm"])
+
+    @unittest.skipUnless(weasyprint_available(), "WeasyPrint is not installed")
+    def test_real_warm_up(self):
+        renderer = PDFRenderer()
+        renderer.warm_up()
+        output = io.BytesIO()
+        renderer.write_pdf("<p>Hello</p>", BASE_URL, output, url_fetcher=LocalURLFetcher(BASE_URL))
+        self.assertTrue(output.getvalue().startswith(b"%PDF"))
+        self.assertEqual(renderer.stats()["warm_renders"], 1)
+
+
+class FileMetadataTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seller", "seller@example.com", "pw")
+        self.prop = Property.objects.create(owner=self.user, address="1 Upload Way")
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_sniffed_types(self):
+        cases = [
+            (b"%PDF-1.7\n", "scan.bin", "application/pdf"),
+            (b"\xff\xd8\xff\xe0", "photo.png", "image/jpeg"),
+            (b"\x89PNG\r\n\x1a\n", "photo", "image/png"),
+            (b"GIF89a", "a.gif", "image/gif"),
+            (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "a.webp", "image/webp"),
+            (b"\x00\x00\x00\x18ftypheic", "IMG_1.HEIC", "image/heic"),
+            (b"PK\x03\x04", "offer.docx",
+             "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+            (b"PK\x03\x04", "archive.bin", "application/zip"),
+            (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "budget.xls", "application/vnd.ms-excel"),
+            (b"Roof replaced 2019", "notes.txt", "text/plain"),
+            (b"a,b\n1,2\n", "costs.csv", "text/csv"),
+            (b"\x00\x01\x02\xff", "blob", "application/octet-stream"),
+        ]
+        for head, filename, expected in cases:
+            self.assertEqual(sniff_mime_type(head, filename), expected, filename)
+
+    def test_upload_records_metadata_and_stores_the_whole_file(self):
+        body = b"%PDF-1.7\n" + b"x" * 200_000
+        document = Document.objects.create(
+            property=self.prop, file=SimpleUploadedFile("inspection.pdf", body)
+        )
+        document.refresh_from_db()
+        self.assertEqual(document.file_size, len(body))
+        self.assertEqual(document.mime_type, "application/pdf")
+        self.assertEqual(document.content_hash, hashlib.sha256(body).hexdigest())
+        with document.file.open("rb") as f:
+            self.assertEqual(f.read(), body)
+
+        image = PropertyImage.objects.create(
+            property=self.prop, image=image_upload("yard.png", (640, 480))
+        )
+        self.assertEqual((image.mime_type, image.width, image.height), ("image/png", 640, 480))
+
+        # Saving a stored file again does not read it back
+        with mock.patch("core.signals.apply_file_metadata") as apply:
+            document.save()
+            image.save()
+        apply.assert_not_called()
+
+    def test_backfill(self):
+        document = Document.objects.create(
+            property=self.prop, file=SimpleUploadedFile("deed.pdf", b"%PDF-1.4 deed")
+        )
+        Document.objects.filter(pk=document.pk).update(file_size=None, mime_type="")
+        Document.objects.bulk_create([Document(property=self.prop, file="documents/gone.pdf")])
+
+        out = io.StringIO()
+        call_command("backfill_file_metadata", "--chunk-size", "1", stdout=out)
+
+        self.assertIn("Document: updated 1 row(s), 1 file(s) missing", out.getvalue())
+        document.refresh_from_db()
+        self.assertEqual((document.file_size, document.mime_type), (13, "application/pdf"))
+
+        out = io.StringIO()
+        call_command("backfill_file_metadata", stdout=out)
+        self.assertIn("Document: updated 0 row(s), 1 file(s) missing", out.getvalue())
+
+
+class InlineExecutor:
+    """Stands in for the batch export ProcessPoolExecutor."""
+
+    created = 0
+
+    def __init__(self, **kwargs):
+        type(self).created += 1
+        self.max_workers = kwargs["max_workers"]
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+class BatchExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seller", "seller@example.com", "pw")
+        self.other = User.objects.create_user("other", "other@example.com", "pw")
+        self.paid = [
+            Property.objects.create(owner=self.user, address=f"{n} Paid St") for n in range(2)
+        ]
+        for prop in self.paid:
+            grant_property_entitlement(self.user, prop)
+        self.unpaid = Property.objects.create(owner=self.user, address="3 Unpaid St")
+        self.foreign = Property.objects.create(owner=self.other, address="4 Other St")
+
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def render(self):
+        def fake_render(prop, user, base_url, target):
+            target.write(make_pdf(1, prop.address))
+        return mock.patch("core.export_utils.render_property_pdf", side_effect=fake_render)
+
+    def render_in_process(self, property_id, user_id, base_url):
+        # render_export_artifact minus close_old_connections(), which
+        # would drop the test transaction
+        prop = Property.objects.get(pk=property_id)
+        return get_export_artifact(prop, User.objects.get(pk=user_id), base_url).pk
+
+    def batch(self, property_ids):
+        response = self.client.post(
+            "/api/properties/batch-export/", {"property_ids": property_ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    @override_settings(EXPORT_BATCH_WORKERS=0)
+    def test_zip_holds_permitted_pdfs_and_a_manifest(self):
+        ids = [self.paid[0].id, self.unpaid.id, self.foreign.id, self.paid[1].id]
+        with self.render():
+            archive = self.batch(ids)
+
+        expected = [f"property_{prop.id}.pdf" for prop in self.paid] + ["manifest.json"]
+        self.assertEqual(sorted(archive.namelist()), sorted(expected))
+        self.assertTrue(archive.read(f"property_{self.paid[0].id}.pdf").startswith(b"%PDF"))
+
+        manifest = json.loads(archive.read("manifest.json"))
+        self.assertEqual((manifest["requested"], manifest["succeeded"], manifest["failed"]), (4, 2, 2))
+        self.assertEqual([item["property_id"] for item in manifest["items"]], ids)
+        statuses = {item["property_id"]: item for item in manifest["items"]}
+        self.assertEqual(statuses[self.unpaid.id]["error"], "Payment required to export this property")
+        self.assertEqual(statuses[self.foreign.id]["error"], "Property not found")
+        self.assertEqual(statuses[self.paid[1].id]["address"], "1 Paid St")
+
+    @override_settings(EXPORT_BATCH_WORKERS=0)
+    def test_failed_render_is_reported_in_the_manifest(self):
+        with mock.patch("core.export_utils.render_property_pdf", side_effect=RuntimeError("boom")), \
+                self.assertLogs("core.batch_export", "ERROR"):
+            archive = self.batch([self.paid[0].id])
+        manifest = json.loads(archive.read("manifest.json"))
+        self.assertEqual(manifest["items"][0]["error"], "boom")
+        self.assertEqual(archive.namelist(), ["manifest.json"])
+
+    @override_settings(EXPORT_BATCH_WORKERS=2)
+    def test_batches_share_one_pool(self):
+        InlineExecutor.created = 0
+        with mock.patch.object(batch_export, "_pool", None), \
+                mock.patch.object(batch_export, "ProcessPoolExecutor", InlineExecutor), \
+                mock.patch.object(batch_export, "render_export_artifact", self.render_in_process), \
+                self.render():
+            self.batch([self.paid[0].id])
+            self.batch([self.paid[1].id])
+            self.assertEqual(batch_export._pool.max_workers, 2)
+        self.assertEqual(InlineExecutor.created, 1)
+
+
+class ExportJobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seller", "seller@example.com", "pw")
+        self.prop = Property.objects.create(owner=self.user, address="1 Queue St")
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def render(self, error=None):
+        def fake_render(prop, user, base_url, target):
+            if error is not None:
+                raise error
+            target.write(make_pdf(1, prop.address))
+        return mock.patch("core.export_utils.render_property_pdf", side_effect=fake_render)
+
+    def test_worker_renders_queued_job(self):
+        job = queue_export_job(self.prop, self.user, BASE_URL)
+        self.assertEqual(job.status, "pending")
+
+        with self.render():
+            claimed = claim_next_export_job()
+            self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, "running", 1))
+            self.assertIsNone(claim_next_export_job())
+            run_export_job(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "succeeded")
+        self.assertTrue(job.cache_entry.file.read().startswith(b"%PDF"))
+        # No per-job copy outside the export cache
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "exports")))
+
+        # The revision is cached now, so the next job completes at once
+        again = queue_export_job(self.prop, self.user, BASE_URL)
+        self.assertEqual(again.status, "succeeded")
+
+    def test_download_rerenders_an_evicted_export(self):
+        job = queue_export_job(self.prop, self.user, BASE_URL)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f"/api/export-jobs/{job.pk}/download/"
+
+        self.assertEqual(client.get(url).status_code, 409)
+        with self.render():
+            run_export_job(claim_next_export_job())
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+            evict_export_cache(max_bytes=0)
+            job.refresh_from_db()
+            self.assertIsNone(job.cache_entry)
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+        job.refresh_from_db()
+        self.assertEqual(job.cache_entry, ExportCacheEntry.objects.get())
+
+    def test_failures_back_off_then_fail(self):
+        job = queue_export_job(self.prop, self.user, BASE_URL)
+
+        with self.render(error=RuntimeError("bad image")), \
+                self.assertLogs("core.export_utils", "ERROR"):
+            for attempt in range(1, MAX_JOB_ATTEMPTS + 1):
+                claimed = claim_next_export_job()
+                self.assertEqual(claimed.attempts, attempt)
+                run_export_job(claimed)
+                job.refresh_from_db()
+                self.assertEqual(job.error, "bad image")
+                if attempt < MAX_JOB_ATTEMPTS:
+                    self.assertEqual(job.status, "pending")
+                    self.assertGreater(job.run_after, timezone.now())
+                    self.assertIsNone(claim_next_export_job())
+                    ExportJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+        self.assertEqual(job.status, "failed")
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(claim_next_export_job())
+
+    def test_stale_jobs_are_reclaimed_or_failed(self):
+        stale = timezone.now() - timedelta(seconds=STALE_JOB_SECONDS + 1)
+        retry = ExportJob.objects.create(
+            user=self.user, property=self.prop, status="running", started_at=stale, attempts=1
+        )
+        last = ExportJob.objects.create(
+            user=self.user, property=self.prop, status="running",
+            started_at=stale, attempts=MAX_JOB_ATTEMPTS,
+        )
+        ExportJob.objects.create(
+            user=self.user, property=self.prop, status="running",
+            started_at=timezone.now(), attempts=1,
+        )
+
+        claimed = claim_next_export_job()
+        self.assertEqual((claimed.pk, claimed.attempts), (retry.pk, 2))
+        last.refresh_from_db()
+        self.assertEqual(last.status, "failed")
+        self.assertIsNone(claim_next_export_job())
+
+
+class PropertyEndpointQueryTests(TestCase):
+    """Query counts per endpoint must not grow with the data."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("agent", "agent@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    # Each read also runs one revision query for its ETag (ConditionalReadTests)
+
+    def test_list_query_count_is_constant(self):
+        make_property(self.user, sections=1, items_per_section=1)
+        with self.assertNumQueries(2):
+            self.client.get("/api/properties/")
+
+        for n in range(20):
+            make_property(self.user, sections=5, items_per_section=3, loose_items=1)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/properties/")
+
+        self.assertEqual(len(response.data), 21)
+        last = response.data[-1]
+        self.assertEqual(last["section_count"], 5)
+        self.assertEqual(last["document_count"], 16)
+        self.assertEqual(last["image_count"], 16)
+        self.assertEqual(last["note_count"], 16)
+        self.assertNotIn("notes", last)
+
+    def test_detail_prefetches_children(self):
+        small = make_property(self.user, sections=1, items_per_section=1)
+        large = make_property(self.user, sections=20, items_per_section=10)
+
+        with self.assertNumQueries(6):
+            self.client.get(f"/api/properties/{small.id}/")
+        with self.assertNumQueries(6):
+            response = self.client.get(f"/api/properties/{large.id}/")
+
+        self.assertEqual(len(response.data["sections"]), 20)
+        self.assertEqual(len(response.data["images"]), 200)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("scroller", "scroller@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.prop = make_property(self.user, sections=1, items_per_section=7)
+
+    def test_pages_walk_the_list_in_order(self):
+        seen = []
+        url = f"/api/notes/?property={self.prop.id}&page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen.extend(note["id"] for note in response.data["results"])
+            url = response.data["next"]
+
+        expected = list(self.prop.notes.order_by("created_at", "id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_deep_pages_cost_the_same_queries(self):
+        first = self.client.get(f"/api/images/?property={self.prop.id}&page_size=2")
+        with self.assertNumQueries(2):
+            deep = self.client.get(first.data["next"])
+        self.assertEqual(len(deep.data["results"]), 2)
+        self.assertTrue(deep.data["results"][0]["url"].startswith("http://testserver/"))
+
+    def test_plain_list_without_pagination_params(self):
+        response = self.client.get(f"/api/documents/?property={self.prop.id}")
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get("/api/notes/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalReadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("poller", "poller@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.prop = make_property(self.user, sections=2, items_per_section=2)
+
+    def test_unchanged_detail_is_not_modified(self):
+        url = f"/api/properties/{self.prop.id}/"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(1):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], first["ETag"])
+
+    def test_child_write_changes_the_etag(self):
+        url = f"/api/notes/?property={self.prop.id}"
+        first = self.client.get(url)
+        Note.objects.create(property=self.prop, content="Gutters cleaned")
+
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again["ETag"], first["ETag"])
+        self.assertEqual(len(again.data), 5)
+
+        # Detail and list responses covering the property change too
+        listing = self.client.get("/api/properties/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(listing.status_code, 200)
+
+    def test_other_properties_do_not_invalidate_child_lists(self):
+        url = f"/api/images/?property={self.prop.id}"
+        first = self.client.get(url)
+        other = make_property(self.user, sections=1, items_per_section=1)
+        Note.objects.create(property=other, content="Unrelated")
+
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+    def test_if_modified_since(self):
+        url = f"/api/properties/{self.prop.id}/"
+        first = self.client.get(url)
+        again = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(again.status_code, 304)
+
+    def test_deleting_a_property_invalidates_the_list(self):
+        url = "/api/properties/"
+        kept = Property.objects.create(owner=self.user, address="2 Poll Ln")
+        first = self.client.get(url)
+        self.assertNotIn("Last-Modified", first)
+
+        # The newest updated_at is unchanged by the delete
+        self.prop.delete()
+        again = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual([p["id"] for p in again.data], [kept.id])
+        self.assertNotEqual(again["ETag"], first["ETag"])
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("mobile", "mobile@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.prop = Property.objects.create(owner=self.user, address="9 Sync Rd")
+        self.kitchen = Section.objects.create(property=self.prop, title="Kitchen")
+        self.note = Note.objects.create(property=self.prop, section=self.kitchen, content="Old")
+        self.url = f"/api/properties/{self.prop.id}/changes/"
+
+    def test_first_sync_is_a_full_snapshot(self):
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.data["full"])
+        self.assertEqual([s["title"] for s in response.data["sections"]], ["Kitchen"])
+        self.assertEqual(len(response.data["notes"]), 1)
+
+    def test_changes_since_token(self):
+        token = self.client.get(self.url).data["token"]
+
+        self.kitchen.title = "Kitchen & Pantry"
+        self.kitchen.save()
+        added = Note.objects.create(property=self.prop, section=self.kitchen, content="New")
+        note_id = self.note.id
+        self.note.delete()
+
+        response = self.client.get(self.url, {"since": token})
+        self.assertFalse(response.data["full"])
+        self.assertEqual([s["title"] for s in response.data["sections"]], ["Kitchen & Pantry"])
+        self.assertEqual([n["id"] for n in response.data["notes"]], [added.id])
+        self.assertEqual(response.data["deleted"]["notes"], [note_id])
+        self.assertEqual(response.data["documents"], [])
+
+        # Nothing new since the latest token
+        latest = self.client.get(self.url, {"since": response.data["token"]})
+        self.assertEqual(latest.data["sections"], [])
+        self.assertEqual(latest.data["deleted"]["notes"], [])
+
+    def test_deleting_a_section_tombstones_its_items(self):
+        token = self.client.get(self.url).data["token"]
+        section_id, note_id = self.kitchen.id, self.note.id
+        self.kitchen.delete()
+
+        response = self.client.get(self.url, {"since": token})
+        self.assertEqual(response.data["deleted"]["sections"], [section_id])
+        self.assertEqual(response.data["deleted"]["notes"], [note_id])
+
+    def test_tokens_are_per_property_sequences(self):
+        token = int(self.client.get(self.url).data["token"])
+        other = Property.objects.create(owner=self.user, address="10 Sync Rd")
+        Note.objects.create(property=other, content="Elsewhere")
+
+        self.assertEqual(self.client.get(self.url).data["token"], str(token))
+
+        self.note.content = "Edited"
+        self.note.save()
+        self.note.content = "Edited again"
+        self.note.save()
+        row = PropertyChange.objects.get(property=self.prop, kind="note", object_id=self.note.id)
+        self.assertEqual(row.sequence, token + 2)
+        self.assertEqual(self.client.get(self.url).data["token"], str(token + 2))
+
+    def test_deleting_the_property_drops_its_log(self):
+        self.prop.delete()
+        self.assertFalse(PropertyChange.objects.exists())
+
+    def test_bad_token(self):
+        response = self.client.get(self.url, {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportEntitlementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.agent = User.objects.create_user("agent", "agent@example.com", "pw")
+        UserProfile.objects.filter(user=self.agent).update(
+            user_type="agent", stripe_customer_id="cus_agent"
+        )
+        self.agent_profile = UserProfile.objects.get(user=self.agent)
+        self.seller = User.objects.create_user("seller", "seller@example.com", "pw")
+        UserProfile.objects.filter(user=self.seller).update(
+            user_type="client", parent_agent=self.agent
+        )
+        self.prop = Property.objects.create(owner=self.seller, address="3 Paid Ln")
+
+    def test_payment_grants_one_property(self):
+        other = Property.objects.create(owner=self.seller, address="4 Unpaid Ln")
+        self.assertEqual(export_access(self.seller, self.prop.id), (False, False))
+
+        grant_property_entitlement(self.seller, self.prop)
+
+        self.assertEqual(export_access(self.seller, self.prop.id), (False, True))
+        self.assertEqual(export_access(self.seller, other.id), (False, False))
+
+    def test_cached_denial_is_confirmed(self):
+        user_entitlements(self.seller)  # caches "nothing"
+        ExportEntitlement.objects.create(user=self.seller, property=self.prop, source="payment")
+
+        self.assertEqual(export_access(self.seller, self.prop.id), (False, True))
+
+    def test_check_permission_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        url = "/api/payments/check-permission/"
+
+        self.assertFalse(client.get(url, {"property_id": self.prop.id}).data["has_paid"])
+        grant_property_entitlement(self.seller, self.prop)
+        self.assertTrue(client.get(url, {"property_id": self.prop.id}).data["has_paid"])
+
+    def test_agent_subscription_covers_clients_until_cancelled(self):
+        period_end = timezone.now() + timedelta(days=30)
+        handle_subscription_created({
+            "id": "sub_1",
+            "customer": "cus_agent",
+            "status": "active",
+            "current_period_end": int(period_end.timestamp()),
+        })
+
+        for user in (self.agent, self.seller):
+            self.assertEqual(export_access(user, self.prop.id), (True, False))
+        entitlement = ExportEntitlement.objects.get(user=self.seller)
+        self.assertEqual(entitlement.source, "agent")
+        self.assertEqual(int(entitlement.expires_at.timestamp()), int(period_end.timestamp()))
+
+        handle_subscription_deleted({"id": "sub_1", "customer": "cus_agent"})
+        self.assertEqual(export_access(self.seller, self.prop.id), (False, False))
+
+    def test_expired_entitlement_is_ignored(self):
+        ExportEntitlement.objects.create(
+            user=self.seller, source="agent", expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(export_access(self.seller, self.prop.id), (False, False))
+
+    def test_rebuild_command(self):
+        Payment.objects.create(
+            user=self.seller, property=self.prop, stripe_payment_intent_id="pi_1",
+            amount=Decimal("49.00"), status="succeeded"
+        )
+        Payment.objects.create(
+            user=self.seller, property=self.prop, stripe_payment_intent_id="pi_0",
+            amount=Decimal("49.00"), status="requires_payment_method"
+        )
+        UserProfile.objects.filter(user=self.agent).update(subscription_status="active")
+        ExportEntitlement.objects.create(user=self.agent, property=self.prop, source="payment")
+
+        call_command("rebuild_export_entitlements", stdout=io.StringIO())
+
+        self.assertEqual(
+            set(ExportEntitlement.objects.values_list("user__username", "property_id", "source")),
+            {("agent", None, "subscription"), ("seller", None, "agent"),
+             ("seller", self.prop.id, "payment")},
+        )
+
+    def test_bulk_permission_check(self):
+        paid = self.prop
+        unpaid = Property.objects.create(owner=self.seller, address="5 Unpaid Ln")
+        foreign = Property.objects.create(owner=self.agent, address="6 Agent Ave")
+        grant_property_entitlement(self.seller, paid)
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        cache.clear()
+
+        with self.assertNumQueries(2):
+            response = client.post(
+                "/api/payments/check-permissions/",
+                {"property_ids": [paid.id, unpaid.id, foreign.id]},
+                format="json",
+            )
+
+        permissions = response.data["permissions"]
+        self.assertEqual(permissions[paid.id], {"can_export": True, "has_paid": True, "reason": "paid"})
+        self.assertEqual(permissions[unpaid.id]["reason"], "payment_required")
+        self.assertEqual(permissions[foreign.id]["reason"], "not_found")
+
+        self.agent_profile.user_type = "admin"
+        self.agent_profile.save()
+        sync_account_entitlements(self.agent_profile)
+        client.force_authenticate(self.agent)
+        response = client.post(
+            "/api/payments/check-permissions/", {"property_ids": [foreign.id]}, format="json"
+        )
+        self.assertEqual(response.data["permissions"][foreign.id]["reason"], "free")
+
+    def test_payment_intent_refused_when_exports_are_free(self):
+        self.agent_profile.subscription_status = "active"
+        self.agent_profile.save()
+        sync_account_entitlements(self.agent_profile)
+        client = APIClient()
+        client.force_authenticate(self.seller)
+
+        response = client.post(
+            "/api/payments/create-intent/", {"property_id": self.prop.id, "amount": "49"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "User can export for free")
+
+
+class ProfileAuthenticationTests(TestCase):
+    def setUp(self):
+        clear_user_cache()
+        self.user = User.objects.create_user("agent", "agent@example.com", "pw")
+        token = self.client.post(
+            "/api/token/", {"username": "agent", "password": "pw"}
+        ).data["access"]
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def tearDown(self):
+        clear_user_cache()
+
+    def test_profile_created_with_user(self):
+        self.assertEqual(self.user.userprofile.user_type, "individual")
+
+    def test_profile_loaded_with_user(self):
+        # Authentication's user query is the only one
+        with self.assertNumQueries(1):
+            response = self.api.get("/api/admin/check-status/")
+        self.assertEqual(response.data, {
+            "is_admin": False, "user_type": "individual", "username": "agent",
+        })
+
+    @override_settings(USER_PROFILE_CACHE_SECONDS=60)
+    def test_cached_user_invalidated_on_profile_save(self):
+        self.api.get("/api/admin/check-status/")
+        with self.assertNumQueries(0):
+            self.api.get("/api/admin/check-status/")
+
+        profile = UserProfile.objects.get(user=self.user)
+        profile.user_type = "admin"
+        profile.save()
+
+        response = self.api.get("/api/admin/check-status/")
+        self.assertTrue(response.data["is_admin"])
+
+
+class AdminUserListTests(TestCase):
+    url = "/api/admin/users/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user("boss", "boss@example.com", "pw")
+        UserProfile.objects.filter(user=self.admin).update(user_type="admin")
+        for n in range(5):
+            user = User.objects.create_user(f"agent{n}", f"agent{n}@example.com", "pw")
+            UserProfile.objects.filter(user=user).update(user_type="agent")
+            make_property(user, sections=0, items_per_section=0)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.admin.pk))
+
+    def test_pages_newest_first_with_annotations(self):
+        with self.assertNumQueries(3):  # profile, page, stats
+            first = self.client.get(self.url, {"page_size": 4}).data
+
+        self.assertEqual(
+            [u["username"] for u in first["results"]], ["agent4", "agent3", "agent2", "agent1"]
+        )
+        self.assertEqual(first["results"][0]["property_count"], 1)
+        self.assertEqual(first["stats"]["agents"], 5)
+        self.assertEqual(first["stats"]["users"], 6)
+
+        second = self.client.get(first["next"]).data
+        self.assertEqual([u["username"] for u in second["results"]], ["agent0", "boss"])
+        self.assertIsNone(second["next"])
+        self.assertNotIn("stats", second)
+
+    def test_filters_and_search(self):
+        response = self.client.get(self.url, {"user_type": "admin"})
+        self.assertEqual([u["username"] for u in response.data["results"]], ["boss"])
+
+        response = self.client.get(self.url, {"q": "AGENT3"})
+        self.assertEqual([u["username"] for u in response.data["results"]], ["agent3"])
+
+        today = timezone.localdate().isoformat()
+        response = self.client.get(self.url, {"joined_before": today, "joined_after": today})
+        self.assertEqual(len(response.data["results"]), 6)
+        response = self.client.get(self.url, {"joined_after": "2999-01-01"})
+        self.assertEqual(response.data["results"], [])
+
+        response = self.client.get(self.url, {"joined_after": "last week"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(User.objects.get(username="agent0"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class EmailOutboxTests(TestCase):
+    def send_queued(self):
+        call_command("send_queued_emails", "--once", stdout=io.StringIO())
+
+    def test_registration_queues_instead_of_sending(self):
+        response = APIClient().post(
+            "/api/register/", {"email": "new@example.com", "password": "pw"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        queued = EmailOutbox.objects.get()
+        self.assertEqual((queued.to_email, queued.status), ("new@example.com", "pending"))
+
+        self.send_queued()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["new@example.com"])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, "sent")
+        self.assertIsNotNone(queued.sent_at)
+
+    def test_batch_shares_one_connection(self):
+        for n in range(3):
+            EmailOutbox.objects.create(
+                to_email=f"user{n}@example.com", from_email="no-reply@example.com", subject="Hi"
+            )
+        with mock.patch.object(EmailBackend, "open", autospec=True) as opened:
+            self.send_queued()
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failures_back_off_then_give_up(self):
+        queued = EmailOutbox.objects.create(
+            to_email="flaky@example.com", from_email="no-reply@example.com", subject="Hi"
+        )
+        with mock.patch.object(EmailBackend, "send_messages", side_effect=OSError("boom")):
+            self.send_queued()
+            queued.refresh_from_db()
+            self.assertEqual((queued.status, queued.attempts), ("pending", 1))
+            self.assertEqual(queued.last_error, "boom")
+            self.assertGreater(queued.next_attempt_at, timezone.now())
+
+            # Not due yet: nothing is attempted
+            self.send_queued()
+            queued.refresh_from_db()
+            self.assertEqual(queued.attempts, 1)
+
+            EmailOutbox.objects.filter(pk=queued.pk).update(
+                attempts=MAX_EMAIL_ATTEMPTS - 1, next_attempt_at=timezone.now()
+            )
+            self.send_queued()
+            queued.refresh_from_db()
+            self.assertEqual(queued.status, "failed")
+        self.assertEqual(mail.outbox, [])
+
+    def test_delivered_mail_is_marked_sent_at_once(self):
+        first, second = [
+            EmailOutbox.objects.create(
+                to_email=f"user{n}@example.com", from_email="no-reply@example.com", subject="Hi"
+            )
+            for n in range(2)
+        ]
+        real_send = EmailBackend.send_messages
+
+        def flaky(backend, messages):
+            if messages[0].to == ["user1@example.com"]:
+                raise OSError("mailbox unavailable")
+            return real_send(backend, messages)
+
+        with mock.patch.object(EmailBackend, "send_messages", autospec=True, side_effect=flaky), \
+                mock.patch("core.email_outbox._record_failure", side_effect=DatabaseError("gone")), \
+                self.assertRaises(DatabaseError):
+            self.send_queued()
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, "sent")
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_mail_server_outage_is_recorded(self):
+        queued = EmailOutbox.objects.create(
+            to_email="user@example.com", from_email="no-reply@example.com", subject="Hi"
+        )
+        err = io.StringIO()
+        with mock.patch.object(EmailBackend, "open", side_effect=OSError("connection refused")):
+            call_command("send_queued_emails", "--once", stdout=io.StringIO(), stderr=err)
+
+        self.assertIn("connection refused", err.getvalue())
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ("pending", 1))
+        self.assertEqual(queued.last_error, "connection refused")
+
+    def test_registration_and_welcome_email_commit_together(self):
+        with mock.patch("core.views.send_welcome_email", side_effect=DatabaseError("outbox")), \
+                self.assertRaises(DatabaseError):
+            APIClient().post("/api/register/", {"email": "new@example.com", "password": "pw"})
+        self.assertFalse(User.objects.filter(email="new@example.com").exists())
+
+
+class EmailRenderTests(TestCase):
+    def test_plaintext_part(self):
+        text = html_to_text(
+            "<html><head><style>p { color: red }</style></head><body>"
+            "<p>Hi <strong>Sam</strong> &amp; co,</p>"
+            "<p>Best,<br>The Team</p>"
+            '<a href="https://sellerprep.app/beta/login" class="button">Go</a></body></html>'
+        )
+        self.assertEqual(
+            text, "Hi Sam & co,\n\nBest,\nThe Team\n\nGo (https://sellerprep.app/beta/login)\n"
+        )
+
+    def test_bulk_matches_individual_render(self):
+        bulk = BulkEmail("emails/waitlist_confirmation.html", {}, ["email"])
+        for address in ("a@example.com", "o'brien+<x>@example.com"):
+            self.assertEqual(
+                bulk.render(email=address),
+                render_email("emails/waitlist_confirmation.html", {"email": address}),
+            )
+
+    def test_transactional_emails_have_both_parts(self):
+        user = User.objects.create_user("sam", "sam@example.com", "pw")
+        send_welcome_email(user)
+
+        queued = EmailOutbox.objects.get()
+        self.assertIn("<html>", queued.html_body)
+        self.assertIn("Hi sam,", queued.text_body)
+        self.assertNotIn("<", queued.text_body)
+
+
+class WaitlistCampaignTests(TestCase):
+    def setUp(self):
+        WaitlistSignup.objects.bulk_create(
+            WaitlistSignup(email=f"fan{n}@example.com") for n in range(5)
+        )
+
+    def run_campaign(self, *args):
+        out = io.StringIO()
+        call_command("send_waitlist_campaign", "--rate", "0", *args, stdout=out)
+        return out.getvalue()
+
+    def test_sends_once_per_signup_and_resumes(self):
+        self.assertIn("Sent 2 email(s)", self.run_campaign("--limit", "2"))
+        self.assertIn("Sent 3 email(s)", self.run_campaign())
+        self.assertIn("Sent 0 email(s)", self.run_campaign())
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(len({m.to[0] for m in mail.outbox}), 5)
+        self.assertEqual(CampaignDelivery.objects.filter(status="sent").count(), 5)
+        self.assertIn("fan0@example.com", mail.outbox[0].alternatives[0][0])
+
+    def test_failed_recipients_are_retried(self):
+        real_send = EmailBackend.send_messages
+
+        def flaky(backend, messages):
+            if messages[0].to == ["fan3@example.com"]:
+                raise OSError("mailbox unavailable")
+            return real_send(backend, messages)
+
+        with mock.patch.object(EmailBackend, "send_messages", autospec=True, side_effect=flaky):
+            self.assertIn("4 email(s), 1 failed", self.run_campaign())
+        failed = CampaignDelivery.objects.get(status="failed")
+        self.assertEqual((failed.signup.email, failed.attempts), ("fan3@example.com", 1))
+
+        self.assertIn("Sent 1 email(s)", self.run_campaign())
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_sends_before_a_failed_reconnect_are_kept(self):
+        real_send = EmailBackend.send_messages
+
+        def flaky(backend, messages):
+            if messages[0].to == ["fan2@example.com"]:
+                raise OSError("mailbox unavailable")
+            return real_send(backend, messages)
+
+        with mock.patch.object(EmailBackend, "send_messages", autospec=True, side_effect=flaky), \
+                mock.patch.object(EmailBackend, "open", side_effect=[None, OSError("server gone")]), \
+                self.assertRaises(OSError):
+            send_waitlist_campaign("launch", rate=0)
+
+        self.assertEqual(
+            set(CampaignDelivery.objects.filter(status="sent").values_list("signup__email", flat=True)),
+            {"fan0@example.com", "fan1@example.com"},
+        )
+        self.assertIn("Sent 3 email(s)", self.run_campaign())
+        recipients = [m.to[0] for m in mail.outbox]
+        self.assertEqual(sorted(recipients), [f"fan{n}@example.com" for n in range(5)])
+
+    def test_rate_limit(self):
+        clock = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        with mock.patch("core.waitlist_campaign.time.monotonic", side_effect=lambda: clock[0]), \
+                mock.patch("core.waitlist_campaign.time.sleep", side_effect=sleep):
+            send_waitlist_campaign("launch", rate=2)
+
+        # The first email goes at once; each later one waits its turn
+        self.assertEqual(sleeps, [0.5] * 4)
+
+
+def sign_stripe_payload(payload, secret, timestamp=None):
+    """A Stripe-Signature header for ``payload``, signed the way Stripe signs webhooks."""
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(
+        secret.encode("utf-8"), f"{timestamp}.{payload}".encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test")
+class WebhookEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="customer", password="pw")
+        UserProfile.objects.filter(user=self.user).update(stripe_customer_id="cus_1")
+
+    def event(self, event_id, event_type, created, obj):
+        return {
+            "id": event_id,
+            "object": "event",
+            "type": event_type,
+            "created": created,
+            "data": {"object": obj},
+        }
+
+    def subscription_created(self, event_id="evt_created", created=100):
+        return self.event(event_id, "customer.subscription.created", created, {
+            "id": "sub_1",
+            "object": "subscription",
+            "customer": "cus_1",
+            "status": "active",
+            "items": {"data": [{"price": {"id": "price_professional_monthly"}}]},
+        })
+
+    def payment_failed(self, event_id="evt_failed", created=200):
+        return self.event(event_id, "invoice.payment_failed", created, {
+            "id": "in_1", "object": "invoice", "customer": "cus_1",
+        })
+
+    def post(self, event, secret="whsec_test"):
+        payload = json.dumps(event)
+        return self.client.post(
+            "/api/webhooks/stripe/", payload, content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_stripe_payload(payload, secret),
+        )
+
+    def process(self):
+        return call_command("process_webhook_events", "--once", stdout=io.StringIO())
+
+    def profile(self):
+        return UserProfile.objects.get(user=self.user)
+
+    def test_records_once_and_applies_in_worker(self):
+        self.assertEqual(self.post(self.subscription_created()).status_code, 200)
+        self.assertEqual(self.post(self.subscription_created()).status_code, 200)
+
+        recorded = WebhookEvent.objects.get()
+        self.assertEqual((recorded.customer_id, recorded.status), ("cus_1", "pending"))
+        self.assertEqual(self.profile().subscription_status, "none")
+
+        self.process()
+        recorded.refresh_from_db()
+        self.assertEqual((recorded.status, recorded.attempts), ("processed", 1))
+        self.assertEqual(self.profile().subscription_status, "active")
+        self.assertEqual(self.profile().subscription_tier, "professional")
+
+    def test_paid_invoice_entitles_until_the_period_end(self):
+        UserProfile.objects.filter(user=self.user).update(subscription_status="past_due")
+        for event_id, period_end in [("evt_paid_1", 1_900_000_000), ("evt_paid_2", 1_902_592_000)]:
+            self.post(self.event(event_id, "invoice.payment_succeeded", period_end - 100, {
+                "id": f"in_{event_id}", "object": "invoice", "customer": "cus_1",
+                "lines": {"data": [{"period": {"start": period_end - 2_592_000, "end": period_end}}]},
+            }))
+            self.process()
+
+            self.assertEqual(self.profile().subscription_status, "active")
+            entitlement = ExportEntitlement.objects.get(user=self.user, property=None)
+            self.assertEqual(entitlement.source, "subscription")
+            self.assertEqual(entitlement.expires_at.timestamp(), period_end)
+
+    def test_canceled_update_stores_the_profile_spelling(self):
+        self.post(self.subscription_created())
+        self.post(self.event("evt_updated", "customer.subscription.updated", 150, {
+            "id": "sub_1",
+            "object": "subscription",
+            "customer": "cus_1",
+            "status": "canceled",
+            "items": {"data": [{"price": {"id": "price_professional_monthly"}}]},
+        }))
+        self.process()
+        self.assertEqual(self.profile().subscription_status, "cancelled")
+
+    def test_rejects_bad_signature(self):
+        response = self.post(self.subscription_created(), secret="whsec_other")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_applies_customer_events_in_stripe_order(self):
+        # Delivered out of order: the later payment failure arrives first
+        self.post(self.payment_failed(created=200))
+        self.post(self.subscription_created(created=100))
+        self.process()
+        self.assertEqual(self.profile().subscription_status, "past_due")
+
+    def test_failed_event_blocks_later_ones_until_replayed(self):
+        self.post(self.subscription_created())
+        self.post(self.payment_failed())
+
+        def boom(subscription):
+            raise RuntimeError("database unavailable")
+
+        with mock.patch.dict(
+            "core.webhook_views.EVENT_HANDLERS", {"customer.subscription.created": boom}
+        ):
+            self.process()
+        created = WebhookEvent.objects.get(event_id="evt_created")
+        self.assertEqual((created.status, created.attempts), ("pending", 1))
+        self.assertEqual(created.last_error, "database unavailable")
+        self.assertGreater(created.next_attempt_at, timezone.now())
+        self.assertEqual(WebhookEvent.objects.get(event_id="evt_failed").status, "pending")
+        self.assertEqual(self.profile().subscription_status, "none")
+
+        call_command("replay_webhook_events", "evt_created", "--process", stdout=io.StringIO())
+        self.assertEqual(
+            set(WebhookEvent.objects.values_list("status", flat=True)), {"processed"}
+        )
+        self.assertEqual(self.profile().subscription_status, "past_due")
+
+    def test_failed_notification_rolls_back_the_event(self):
+        self.post(self.subscription_created())
+
+        with mock.patch(
+            "core.webhook_views.send_subscription_update",
+            side_effect=DatabaseError("outbox unavailable"),
+        ), self.assertLogs("core.webhook_events", "WARNING"):
+            self.process()
+        created = WebhookEvent.objects.get()
+        self.assertEqual((created.status, created.attempts), ("pending", 1))
+        self.assertEqual(self.profile().subscription_status, "none")
+        self.assertFalse(EmailOutbox.objects.exists())
+
+        created.next_attempt_at = timezone.now()
+        created.save()
+        self.process()
+        self.assertEqual(WebhookEvent.objects.get().status, "processed")
+        self.assertEqual(self.profile().subscription_status, "active")
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_replay_records_events_from_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = f"{directory}/events.json"
+        with open(path, "w") as f:
+            json.dump({"object": "list", "data": [self.subscription_created()]}, f)
+
+        call_command("replay_webhook_events", "--file", path, "--process", stdout=io.StringIO())
+        self.assertEqual(WebhookEvent.objects.get().status, "processed")
+        self.assertEqual(self.profile().subscription_status, "active")
+
+
+class SubscriptionReconcileTests(TestCase):
+    def setUp(self):
+        for name, status in [("a", "active"), ("b", "active"), ("c", "active")]:
+            user = User.objects.create_user(username=name, password="pw")
+            UserProfile.objects.filter(user=user).update(
+                stripe_customer_id=f"cus_{name}", subscription_status=status,
+                subscription_tier="starter",
+            )
+        User.objects.create_user(username="no-stripe", password="pw")
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def subscription(self, sub_id, customer, status, created, price="price_starter"):
+        return {
+            "id": sub_id, "object": "subscription", "customer": customer,
+            "status": status, "created": created,
+            "items": {"data": [{"price": {"id": price}}]},
+        }
+
+    def write_fixture(self, subscriptions):
+        path = f"{self.directory}/subscriptions.json"
+        with open(path, "w") as f:
+            json.dump({"object": "list", "data": subscriptions}, f)
+        return path
+
+    def test_unique_customer_ids(self):
+        from django.db import IntegrityError
+
+        # Any number of profiles may have no Stripe customer yet
+        User.objects.create_user(username="no-stripe-2", password="pw")
+        with self.assertRaises(IntegrityError):
+            UserProfile.objects.filter(user__username="no-stripe").update(stripe_customer_id="cus_a")
+
+    def test_fixture_client_pages_newest_first(self):
+        client = FixtureSubscriptionClient([self.write_fixture([
+            self.subscription(f"sub_{n}", "cus_a", "active", created=n) for n in range(5)
+        ])])
+        ids = [sub["id"] for sub in iter_subscriptions(client, page_size=2)]
+        self.assertEqual(ids, ["sub_4", "sub_3", "sub_2", "sub_1", "sub_0"])
+
+    def test_reconciles_in_chunks(self):
+        path = self.write_fixture([
+            self.subscription("sub_a2", "cus_a", "past_due", 300, price="price_team"),
+            self.subscription("sub_a1", "cus_a", "canceled", 100),
+            self.subscription("sub_b", "cus_b", "active", 200),
+            self.subscription("sub_c", "cus_c", "canceled", 150),
+            self.subscription("sub_x", "cus_unknown", "active", 250),
+        ])
+        out = io.StringIO()
+        with mock.patch.object(UserProfile, "save") as save:
+            call_command(
+                "reconcile_subscriptions", "--fixtures", path,
+                "--page-size", "2", "--chunk-size", "2", stdout=out,
+            )
+        save.assert_not_called()
+        self.assertIn("Updated 3 profile(s) from 5 subscription(s); 1 customer(s) not found", out.getvalue())
+
+        profiles = {
+            p.stripe_customer_id: (p.subscription_status, p.subscription_tier, p.stripe_subscription_id)
+            for p in UserProfile.objects.exclude(stripe_customer_id=None)
+        }
+        self.assertEqual(profiles, {
+            "cus_a": ("past_due", "team", "sub_a2"),
+            "cus_b": ("active", "starter", "sub_b"),
+            "cus_c": ("cancelled", "starter", "sub_c"),
+        })
+        accounts = set(
+            ExportEntitlement.objects.filter(property=None).values_list("user__username", flat=True)
+        )
+        self.assertEqual(accounts, {"b"})
+
+    def test_dry_run_changes_nothing(self):
+        path = self.write_fixture([self.subscription("sub_c", "cus_c", "canceled", 150)])
+        out = io.StringIO()
+        call_command("reconcile_subscriptions", "--fixtures", path, "--dry-run", stdout=out)
+        self.assertIn("Would update 1 profile(s)", out.getvalue())
+        self.assertEqual(
+            UserProfile.objects.get(stripe_customer_id="cus_c").subscription_status, "active"
+        )
@@ -6,16 +6,19 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
     register,
     waitlist_signup,
+    renderer_health,
     PropertyViewSet,
     SectionViewSet,
     DocumentViewSet,
     PropertyImageViewSet,
     NoteViewSet,
+    ExportJobViewSet,
 )
 from .payment_views import (
     create_payment_intent,
     confirm_payment,
     check_export_permission,
+    check_export_permissions,
     make_user_admin,
     list_users,
     check_admin_status,
@@ -28,6 +31,7 @@ router.register(r"sections",   SectionViewSet,  basename="section")
 router.register(r"documents",  DocumentViewSet, basename="document")
 router.register(r"images",     PropertyImageViewSet, basename="image")
 router.register(r"notes",      NoteViewSet,     basename="note")
+router.register(r"export-jobs", ExportJobViewSet, basename="export-job")
 
 urlpatterns = [
     path("token/",         TokenObtainPairView.as_view(),  name="token_obtain_pair"),
@@ -37,9 +41,11 @@ urlpatterns = [
     path("payments/create-intent/", create_payment_intent, name="create_payment_intent"),
     path("payments/confirm/", confirm_payment, name="confirm_payment"),
     path("payments/check-permission/", check_export_permission, name="check_export_permission"),
+    path("payments/check-permissions/", check_export_permissions, name="check_export_permissions"),
     path("admin/make-admin/", make_user_admin, name="make_user_admin"),
     path("admin/users/", list_users, name="list_users"),
     path("admin/check-status/", check_admin_status, name="check_admin_status"),
     path("webhooks/stripe/", stripe_webhook, name="stripe_webhook"),
+    path("health/renderer/", renderer_health, name="renderer_health"),
     path("",               include(router.urls)),
 ]
@@ -1,27 +1,39 @@
 # src/api/views.py
 
-import os
 from rest_framework import viewsets, permissions, parsers, status
 from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny
 from django.contrib.auth.models import User
-from django.http import FileResponse, HttpResponse
-from django.template.loader import render_to_string
-
-# WeasyPrint import moved to inside export function to avoid startup issues
-
-from .models import Property, Section, Document, PropertyImage, Note, UserProfile, Payment
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, StreamingHttpResponse
+
+from .models import (
+    Property, Section, Document, PropertyImage, Note, ExportJob,
+)
 from .serializers import (
     PropertySerializer,
+    PropertyListSerializer,
     SectionSerializer,
     DocumentSerializer,
     PropertyImageSerializer,
     NoteSerializer,
+    ExportJobSerializer,
+)
+from .export_utils import (
+    export_job_artifact, get_export_artifact, queue_export_job, record_export,
 )
-from .document_utils import get_document_preview_summary
-from .email_utils import send_welcome_email, send_export_confirmation, send_waitlist_confirmation
+from .export_renderer import renderer
+from .batch_export import stream_batch_export
+from .http_utils import conditional_read, ranged_file_response
+from .pagination import KeysetPagination
+from .sync_utils import property_delta
+from .entitlement_utils import can_export
+from .email_utils import send_welcome_email, send_waitlist_confirmation
 
 
 @api_view(["POST"])
@@ -46,138 +58,244 @@ def register(request):
         username = f"{original_username}{counter}"
         counter += 1
 
-    user = User.objects.create_user(username=username,
-                                    email=email,
-                                    password=password)
-
-    try:
+    # The welcome email is only queued (core/email_outbox.py); doing it in
+    # the same transaction means an account never exists without it
+    with transaction.atomic():
+        user = User.objects.create_user(username=username,
+                                        email=email,
+                                        password=password)
         send_welcome_email(user)
-    except Exception as e:
-        pass
 
     return Response({"message": "User created successfully",
                      "email": user.email},
                     status=status.HTTP_201_CREATED)
 
 
-class PropertyViewSet(viewsets.ModelViewSet):
+def _child_count(model):
+    """Correlated COUNT of ``model`` rows per property (no join fan-out)."""
+    counts = (
+        model.objects
+        .filter(property=OuterRef('pk'))
+        .order_by()
+        .values('property')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class RevisionConditionalMixin:
+    """
+    Conditional GET for list and retrieve. Validators come from the
+    revision of each property the response covers (one small query), so
+    an unchanged tree is answered with 304 before anything is serialized.
+    """
+
+    def revision_scope(self):
+        """Properties whose contents make up this response."""
+        properties = Property.objects.filter(owner=self.request.user)
+        if self.action == 'retrieve':
+            item = self.get_queryset().filter(pk=self.kwargs['pk'])
+            return properties.filter(pk__in=item.values('property_id'))
+
+        prop_id    = self.request.query_params.get("property")
+        section_id = self.request.query_params.get("section")
+        if prop_id:
+            properties = properties.filter(pk=prop_id)
+        if section_id:
+            properties = properties.filter(sections__id=section_id)
+        return properties
+
+    def _revision_rows(self):
+        try:
+            return list(
+                self.revision_scope()
+                .order_by('pk')
+                .values_list('pk', 'revision', 'updated_at')
+            )
+        except (TypeError, ValueError):
+            # Malformed id; let the normal view produce its error
+            return []
+
+    def list(self, request, *args, **kwargs):
+        render = super().list
+        return conditional_read(
+            request, self._revision_rows(), lambda: render(request, *args, **kwargs),
+            collection=True,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        render = super().retrieve
+        rows = self._revision_rows()
+        if not rows:
+            return render(request, *args, **kwargs)
+        return conditional_read(request, rows, lambda: render(request, *args, **kwargs))
+
+
+class PropertyViewSet(RevisionConditionalMixin, viewsets.ModelViewSet):
     serializer_class = PropertySerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Property.objects.filter(owner=self.request.user)
+        queryset = Property.objects.filter(owner=self.request.user)
+
+        if self.action == 'list':
+            # One query for the whole list, however many properties
+            return queryset.annotate(
+                section_count=_child_count(Section),
+                document_count=_child_count(Document),
+                image_count=_child_count(PropertyImage),
+                note_count=_child_count(Note),
+            ).order_by('created_at', 'id')
+
+        if self.action in ('retrieve', 'update', 'partial_update'):
+            # The nested serializer reads all four relations
+            return queryset.prefetch_related(
+                Prefetch('sections', queryset=Section.objects.order_by('created_at', 'id')),
+                Prefetch('documents', queryset=Document.objects.order_by('uploaded_at', 'id')),
+                Prefetch('images', queryset=PropertyImage.objects.order_by('uploaded_at', 'id')),
+                Prefetch('notes', queryset=Note.objects.order_by('created_at', 'id')),
+            )
+
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return PropertyListSerializer
+        return PropertySerializer
+
+    def revision_scope(self):
+        properties = Property.objects.filter(owner=self.request.user)
+        if self.action == 'retrieve':
+            return properties.filter(pk=self.kwargs['pk'])
+        return properties
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-    @action(detail=True, methods=["get"], url_path="export")
-    def export(self, request, pk=None):
-        prop = self.get_object()
-        
-        # Check export permissions
-        user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-        
-        # Check if user can export for free or has paid for this property
-        can_export_free = user_profile.can_export_free
-        has_paid = Payment.objects.filter(
-            user=request.user,
-            property=prop,
-            status='succeeded'
-        ).exists()
-        
-        if not can_export_free and not has_paid:
+    def _export_denied(self, request, prop):
+        """Return a 402 response if the user may not export ``prop``."""
+        if not can_export(request.user, prop):
             return Response(
                 {'error': 'Payment required to export this property. Please complete payment first.'},
                 status=status.HTTP_402_PAYMENT_REQUIRED
             )
+        return None
+
+    @action(detail=True, methods=["get", "post"], url_path="export")
+    def export(self, request, pk=None):
+        """
+        GET renders the PDF inline. POST queues an ExportJob for the
+        process_export_jobs worker and returns immediately.
+        """
+        prop = self.get_object()
+
+        denied = self._export_denied(request, prop)
+        if denied is not None:
+            return denied
 
-        # Gather all related items
-        all_sections = list(prop.sections.order_by("created_at"))
-        all_docs     = list(prop.documents.order_by("uploaded_at"))
-        all_images   = list(prop.images.order_by("uploaded_at"))
-        all_notes    = list(prop.notes.order_by("created_at"))
-
-        # Calculate summary statistics
-        total_documents = len(all_docs)
-        total_images = len(all_images)
-        total_notes = len(all_notes)
-        total_sections = len(all_sections)
-
-        # Build per‑section buckets
-        sections_data = []
-        for sec in all_sections:
-            docs = []
-            for d in all_docs:
-                if d.section_id == sec.id:
-                    doc_preview = get_document_preview_summary(d, request)
-                    docs.append({
-                        "filename": os.path.basename(d.file.name),
-                        "uploaded": d.uploaded_at.strftime("%Y-%m-%d"),
-                        "url":      request.build_absolute_uri(d.file.url),
-                        "preview":  doc_preview,
-                    })
-
-            imgs = []
-            for i in all_images:
-                if getattr(i, "section_id", None) == sec.id:
-                    imgs.append({
-                        "filename": os.path.basename(i.image.name),
-                        "uploaded": i.uploaded_at.strftime("%Y-%m-%d"),
-                        "url":      request.build_absolute_uri(i.image.url),
-                    })
-
-            nts = []
-            for n in all_notes:
-                if getattr(n, "section_id", None) == sec.id:
-                    nts.append({
-                        "content": n.content,
-                        "created": n.created_at.strftime("%Y-%m-%d"),
-                    })
-
-            sections_data.append({
-                "title":     sec.title,
-                "documents": docs,
-                "images":    imgs,
-                "notes":     nts,
-            })
-
-        # Render HTML and convert to PDF
-        from datetime import datetime
-        html_string = render_to_string("export/property_export.html", {
-            "property":        prop,
-            "sections_data":   sections_data,
-            "total_documents": total_documents,
-            "total_images":    total_images,
-            "total_notes":     total_notes,
-            "total_sections":  total_sections,
-            "export_user":     request.user,
-            "export_date":     datetime.now(),
-        })
-
-        # Import weasyprint here to avoid startup issues
-        from weasyprint import HTML
-        html = HTML(string=html_string,
-                    base_url=request.build_absolute_uri("/"))
-        pdf  = html.write_pdf()
-
-        # Increment export count if this is a first free export
-        if can_export_free and user_profile.properties_exported == 0:
-            user_profile.properties_exported += 1
-            user_profile.save()
+        base_url = request.build_absolute_uri("/")
 
+        if request.method == "POST":
+            job = queue_export_job(prop, request.user, base_url)
+            serializer = ExportJobSerializer(job, context={"request": request})
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+        entry = get_export_artifact(prop, request.user, base_url)
+        response = ranged_file_response(
+            request,
+            entry.file,
+            f"property_{prop.id}.pdf",
+            "application/pdf"
+        )
+        # Viewers fetch large PDFs in Range chunks; count the download once
+        if response.status_code == 200:
+            record_export(request.user, prop)
+        return response
+
+    @action(detail=True, methods=["get"], url_path="changes")
+    def changes(self, request, pk=None):
+        """
+        Delta sync: sections, documents, images and notes changed since
+        ?since=<token> (tombstones for deletions) and the next token.
+        Omit ``since`` for a full snapshot.
+        """
+        prop = self.get_object()
         try:
-            send_export_confirmation(request.user, prop.address)
-        except Exception as e:
-            pass
+            since = int(request.query_params.get("since") or 0)
+        except ValueError:
+            return Response(
+                {"error": "since must be a token returned by this endpoint"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(property_delta(prop, since, {"request": request}))
+
+    @action(detail=False, methods=["post"], url_path="batch-export")
+    def batch_export(self, request):
+        """
+        Export several properties at once as a streamed ZIP archive with a
+        manifest.json describing any properties that could not be exported.
+        """
+        property_ids = request.data.get("property_ids")
+        if not isinstance(property_ids, list) or not property_ids:
+            return Response(
+                {'error': 'property_ids must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            # De-duplicate, keeping the requested order
+            property_ids = list(dict.fromkeys(int(pid) for pid in property_ids))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'property_ids must contain integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_properties = getattr(settings, "EXPORT_BATCH_MAX_PROPERTIES", 100)
+        if len(property_ids) > max_properties:
+            return Response(
+                {'error': f'At most {max_properties} properties can be exported at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        response = HttpResponse(pdf, content_type="application/pdf")
-        response["Content-Disposition"] = (
-            f'attachment; filename="property_{prop.id}.pdf"'
+        response = StreamingHttpResponse(
+            stream_batch_export(
+                request.user, property_ids, request.build_absolute_uri("/")
+            ),
+            content_type="application/zip"
         )
+        response["Content-Disposition"] = 'attachment; filename="sellerprep_export.zip"'
         return response
 
 
-class SectionViewSet(viewsets.ModelViewSet):
+class ExportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = ExportJob.objects.filter(user=self.request.user)
+        prop_id = self.request.query_params.get("property")
+        if prop_id:
+            qs = qs.filter(property_id=prop_id)
+        return qs.order_by("-created_at")
+
+    @action(detail=True, methods=["get"], url_path="download")
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != "succeeded":
+            return Response(
+                {'error': f'Export is not ready (status: {job.status}).'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return ranged_file_response(
+            request,
+            export_job_artifact(job).file,
+            f"property_{job.property_id}.pdf",
+            "application/pdf"
+        )
+
+
+class SectionViewSet(RevisionConditionalMixin, viewsets.ModelViewSet):
     serializer_class = SectionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -199,9 +317,11 @@ class SectionViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(RevisionConditionalMixin, viewsets.ModelViewSet):
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_field = "uploaded_at"
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
 
     def get_queryset(self):
@@ -212,7 +332,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
             qs = qs.filter(property_id=prop_id)
         if section_id:
             qs = qs.filter(section_id=section_id)
-        return qs
+        return qs.order_by("uploaded_at", "id")
 
     def perform_create(self, serializer):
         prop_id    = self.request.data.get("property")
@@ -234,6 +354,12 @@ class DocumentViewSet(viewsets.ModelViewSet):
             as_attachment=False,
             filename=doc.file.name
         )
+        if doc.mime_type:
+            # Sniffed from the file's magic bytes at upload
+            response["Content-Type"] = doc.mime_type
+            response["Access-Control-Allow-Origin"] = "*"
+            return response
+
         ext = doc.file.name.split(".").pop().lower()
         if ext in ("doc", "docx"):
             response["Content-Type"] = (
@@ -256,9 +382,11 @@ class DocumentViewSet(viewsets.ModelViewSet):
         return response
 
 
-class PropertyImageViewSet(viewsets.ModelViewSet):
+class PropertyImageViewSet(RevisionConditionalMixin, viewsets.ModelViewSet):
     serializer_class = PropertyImageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_field = "uploaded_at"
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
 
     def get_queryset(self):
@@ -269,7 +397,7 @@ class PropertyImageViewSet(viewsets.ModelViewSet):
             qs = qs.filter(property_id=prop_id)
         if section_id:
             qs = qs.filter(section_id=section_id)
-        return qs
+        return qs.order_by("uploaded_at", "id")
 
     def perform_create(self, serializer):
         import logging
@@ -299,9 +427,11 @@ class PropertyImageViewSet(viewsets.ModelViewSet):
             raise
 
 
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(RevisionConditionalMixin, viewsets.ModelViewSet):
     serializer_class = NoteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_field = "created_at"
     parser_classes = [
         parsers.JSONParser,
         parsers.MultiPartParser,
@@ -316,7 +446,7 @@ class NoteViewSet(viewsets.ModelViewSet):
             qs = qs.filter(property_id=prop_id)
         if section_id:
             qs = qs.filter(section_id=section_id)
-        return qs
+        return qs.order_by("created_at", "id")
 
     def perform_create(self, serializer):
         prop_id    = self.request.data.get("property")
@@ -330,6 +460,13 @@ class NoteViewSet(viewsets.ModelViewSet):
         serializer.save(property_id=prop_id, section_id=section_id)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def renderer_health(request):
+    """Warm/cold render counters for this worker's PDF renderer"""
+    return Response(renderer.stats())
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])  # Allow unauthenticated access
 def waitlist_signup(request):
@@ -0,0 +1,139 @@
+# core/waitlist_campaign.py
+#
+# Bulk campaigns to the waitlist. Signups are streamed from a server-side
+# cursor, the email is rendered once (BulkEmail), messages go out over one
+# reused connection at a capped rate, and each recipient's outcome is
+# recorded in CampaignDelivery so a rerun only sends to those still owed.
+
+import logging
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .email_render import BulkEmail
+from .models import CampaignDelivery, WaitlistSignup
+
+logger = logging.getLogger(__name__)
+
+# campaign name -> (subject, template)
+CAMPAIGNS = {
+    'launch': ('SellerPrep is live!', 'emails/waitlist_launch.html'),
+}
+MAX_CAMPAIGN_ATTEMPTS = 3
+
+
+def pending_signups(campaign, signups=None):
+    """Signups still owed ``campaign``: never sent, and not given up on."""
+    done = CampaignDelivery.objects.filter(
+        campaign=campaign, signup=OuterRef('pk')
+    ).filter(Q(status='sent') | Q(attempts__gte=MAX_CAMPAIGN_ATTEMPTS))
+    if signups is None:
+        signups = WaitlistSignup.objects.all()
+    return signups.filter(~Exists(done)).order_by('id')
+
+
+class _Throttle:
+    """Spaces calls at least 1/rate seconds apart (no limit when rate <= 0)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_slot:
+            time.sleep(self.next_slot - now)
+        self.next_slot = max(now, self.next_slot) + self.interval
+
+
+def _record_sent(campaign, signup_ids):
+    now = timezone.now()
+    CampaignDelivery.objects.bulk_create(
+        [
+            CampaignDelivery(campaign=campaign, signup_id=signup_id, status='sent', sent_at=now)
+            for signup_id in signup_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['campaign', 'signup'],
+        update_fields=['status', 'sent_at', 'last_error'],
+    )
+
+
+def _record_failure(campaign, signup_id, error):
+    delivery, created = CampaignDelivery.objects.get_or_create(
+        campaign=campaign,
+        signup_id=signup_id,
+        defaults={'status': 'failed', 'last_error': str(error)},
+    )
+    if not created:
+        CampaignDelivery.objects.filter(pk=delivery.pk).update(
+            status='failed', attempts=F('attempts') + 1, last_error=str(error)
+        )
+
+
+def send_waitlist_campaign(campaign, signups=None, rate=None, chunk_size=1000,
+                           batch_size=50, limit=None):
+    """
+    Send ``campaign`` to every pending waitlist signup (or only those in
+    the ``signups`` queryset) at no more than ``rate`` emails per second.
+    Outcomes are saved every ``batch_size`` recipients, and before an
+    error ends the run, so only a hard crash can repeat (at most one
+    batch). Returns (sent, failed) counts.
+    """
+    subject, template_name = CAMPAIGNS[campaign]
+    if rate is None:
+        rate = getattr(settings, 'WAITLIST_CAMPAIGN_RATE', 10.0)
+
+    email = BulkEmail(template_name, {}, ['email'])
+    rows = pending_signups(campaign, signups).values_list('id', 'email')
+    rows = rows.iterator(chunk_size=chunk_size)
+    if limit:
+        rows = islice(rows, limit)
+
+    throttle = _Throttle(rate)
+    sent_total = 0
+    failed_total = 0
+    connection = get_connection(fail_silently=False)
+    connection.open()
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+
+            sent = []
+            try:
+                for signup_id, address in batch:
+                    html, text = email.render(email=address)
+                    message = EmailMultiAlternatives(
+                        subject, text, settings.DEFAULT_FROM_EMAIL, [address],
+                        connection=connection,
+                    )
+                    message.attach_alternative(html, 'text/html')
+                    throttle.wait()
+                    try:
+                        connection.send_messages([message])
+                    except Exception as e:
+                        logger.warning(f"Campaign {campaign} to {address} failed: {e}")
+                        _record_failure(campaign, signup_id, e)
+                        failed_total += 1
+                        # Start a fresh session rather than reuse a broken one
+                        connection.close()
+                        connection.open()
+                    else:
+                        sent.append(signup_id)
+            finally:
+                # Whatever went out is recorded, even if the batch was cut short
+                if sent:
+                    _record_sent(campaign, sent)
+                    sent_total += len(sent)
+    finally:
+        connection.close()
+
+    return sent_total, failed_total
@@ -0,0 +1,168 @@
+# core/webhook_events.py
+#
+# Stripe webhooks are recorded, not processed, by the view: each verified
+# event becomes a WebhookEvent row (once per Stripe event id), so the
+# response is immediate and Stripe's retries are harmless. The
+# process_webhook_events worker then applies events oldest first, never
+# starting a customer's event while an earlier one of theirs is unfinished,
+# and retries failures with backoff.
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_WEBHOOK_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 6 * 60 * 60
+# An event claimed longer ago than this belongs to a worker that died.
+STALE_PROCESSING_SECONDS = 10 * 60
+
+
+def _customer_id(obj):
+    if obj.get('object') == 'customer':
+        return obj.get('id') or ''
+    customer = obj.get('customer') or ''
+    if isinstance(customer, dict):  # expanded customer object
+        customer = customer.get('id') or ''
+    return customer
+
+
+def record_webhook_event(event):
+    """
+    Store a verified Stripe event (as returned by construct_event, or a
+    decoded event dict) unless its id has been seen before. Returns
+    (WebhookEvent, created).
+    """
+    obj = event.get('data', {}).get('object', {})
+    return WebhookEvent.objects.get_or_create(
+        event_id=event['id'],
+        defaults={
+            'type': event['type'],
+            'customer_id': _customer_id(obj),
+            'payload': event,
+            'stripe_created': datetime.fromtimestamp(event['created'], tz=dt_timezone.utc),
+        },
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def _earlier_unfinished():
+    # An older event of the same customer that has not been applied yet,
+    # including one waiting out a retry delay.
+    return WebhookEvent.objects.filter(
+        customer_id=OuterRef('customer_id'),
+        status__in=['pending', 'processing'],
+    ).filter(
+        Q(stripe_created__lt=OuterRef('stripe_created')) |
+        Q(stripe_created=OuterRef('stripe_created'), id__lt=OuterRef('id'))
+    )
+
+
+def claim_webhook_events(batch_size):
+    """
+    Atomically mark up to ``batch_size`` due events as processing and return
+    them, oldest first. At most one event per customer is claimed at a
+    time, so a customer's events are applied in the order Stripe created them.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=STALE_PROCESSING_SECONDS)
+
+    with transaction.atomic():
+        WebhookEvent.objects.filter(
+            status='processing', claimed_at__lt=stale_before
+        ).update(status='pending')
+
+        events = list(
+            WebhookEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .filter(Q(customer_id='') | ~Exists(_earlier_unfinished()))
+            .order_by('stripe_created', 'id')[:batch_size]
+        )
+        if not events:
+            return []
+
+        WebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            status='processing', claimed_at=now, attempts=F('attempts') + 1
+        )
+    for event in events:
+        event.status = 'processing'
+        event.claimed_at = now
+        event.attempts += 1
+    return events
+
+
+def _record_failure(event, error):
+    event.last_error = str(error)
+    if event.attempts >= MAX_WEBHOOK_ATTEMPTS:
+        event.status = 'failed'
+    else:
+        event.status = 'pending'
+        event.next_attempt_at = timezone.now() + retry_delay(event.attempts)
+    event.save(update_fields=['status', 'last_error', 'next_attempt_at'])
+
+
+def process_webhook_event(event):
+    """
+    Apply a claimed event with its handler; event types without one are
+    just marked processed. The handler's writes and the status change
+    commit together. Returns True on success.
+    """
+    # webhook_views imports this module for record_webhook_event
+    from .webhook_views import EVENT_HANDLERS
+
+    handler = EVENT_HANDLERS.get(event.type)
+    try:
+        with transaction.atomic():
+            if handler is not None:
+                handler(event.payload['data']['object'])
+            WebhookEvent.objects.filter(pk=event.pk).update(
+                status='processed', processed_at=timezone.now(), last_error=''
+            )
+    except Exception as e:
+        logger.warning(f"Webhook event {event.event_id} ({event.type}) failed: {e}")
+        _record_failure(event, e)
+        return False
+    return True
+
+
+def process_webhook_events(events):
+    """Apply claimed events. Returns (processed, failed) counts."""
+    processed = sum(1 for event in events if process_webhook_event(event))
+    return processed, len(events) - processed
+
+
+def replay_webhook_events(events):
+    """
+    Queue already recorded events to be applied again, e.g. after fixing
+    the cause of a failure. Events being processed are left alone.
+    Returns the number queued.
+    """
+    return events.exclude(status='processing').update(
+        status='pending', attempts=0, last_error='',
+        next_attempt_at=timezone.now(), processed_at=None,
+    )
+
+
+def load_event_file(path):
+    """
+    Events from a JSON file: one Stripe event, a list of them, or a Stripe
+    list response such as ``stripe events list`` prints.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and data.get('object') == 'list':
+        data = data['data']
+    return data if isinstance(data, list) else [data]
@@ -1,10 +1,13 @@
 import stripe
+from datetime import datetime, timezone as dt_timezone
 from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from .models import UserProfile
 from .email_utils import send_subscription_update
+from .entitlement_utils import sync_account_entitlements
+from .webhook_events import record_webhook_event
 
 
 @csrf_exempt
@@ -26,17 +29,9 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError as e:
         return JsonResponse({'error': 'Invalid signature'}, status=400)
 
-    if event['type'] == 'customer.subscription.created':
-        handle_subscription_created(event['data']['object'])
-    elif event['type'] == 'customer.subscription.updated':
-        handle_subscription_updated(event['data']['object'])
-    elif event['type'] == 'customer.subscription.deleted':
-        handle_subscription_deleted(event['data']['object'])
-    elif event['type'] == 'invoice.payment_succeeded':
-        handle_payment_succeeded(event['data']['object'])
-    elif event['type'] == 'invoice.payment_failed':
-        handle_payment_failed(event['data']['object'])
-
+    # Record only; the process_webhook_events worker applies it. Stripe
+    # retries an event until acknowledged, so a repeat id is a no-op.
+    record_webhook_event(event)
     return JsonResponse({'status': 'success'})
 
 
@@ -48,22 +43,20 @@ def handle_subscription_created(subscription):
     try:
         user_profile = UserProfile.objects.get(stripe_customer_id=customer_id)
         user_profile.stripe_subscription_id = subscription_id
-        user_profile.subscription_status = 'active' if status == 'active' else status
+        user_profile.subscription_status = get_subscription_status(status)
 
         if subscription.get('items') and subscription['items']['data']:
             price_id = subscription['items']['data'][0]['price']['id']
             user_profile.subscription_tier = get_tier_from_price_id(price_id)
 
         user_profile.save()
+        sync_account_entitlements(user_profile, get_period_end(subscription))
 
-        try:
-            send_subscription_update(
-                user_profile.user,
-                user_profile.subscription_status,
-                user_profile.subscription_tier
-            )
-        except Exception as e:
-            pass
+        send_subscription_update(
+            user_profile.user,
+            user_profile.subscription_status,
+            user_profile.subscription_tier
+        )
 
     except UserProfile.DoesNotExist:
         pass
@@ -76,23 +69,21 @@ def handle_subscription_updated(subscription):
     try:
         user_profile = UserProfile.objects.get(stripe_customer_id=customer_id)
         old_status = user_profile.subscription_status
-        user_profile.subscription_status = 'active' if status == 'active' else status
+        user_profile.subscription_status = get_subscription_status(status)
 
         if subscription.get('items') and subscription['items']['data']:
             price_id = subscription['items']['data'][0]['price']['id']
             user_profile.subscription_tier = get_tier_from_price_id(price_id)
 
         user_profile.save()
+        sync_account_entitlements(user_profile, get_period_end(subscription))
 
         if old_status != user_profile.subscription_status:
-            try:
-                send_subscription_update(
-                    user_profile.user,
-                    user_profile.subscription_status,
-                    user_profile.subscription_tier
-                )
-            except Exception as e:
-                pass
+            send_subscription_update(
+                user_profile.user,
+                user_profile.subscription_status,
+                user_profile.subscription_tier
+            )
 
     except UserProfile.DoesNotExist:
         pass
@@ -105,15 +96,13 @@ def handle_subscription_deleted(subscription):
         user_profile = UserProfile.objects.get(stripe_customer_id=customer_id)
         user_profile.subscription_status = 'cancelled'
         user_profile.save()
+        sync_account_entitlements(user_profile)
 
-        try:
-            send_subscription_update(
-                user_profile.user,
-                user_profile.subscription_status,
-                user_profile.subscription_tier
-            )
-        except Exception as e:
-            pass
+        send_subscription_update(
+            user_profile.user,
+            user_profile.subscription_status,
+            user_profile.subscription_tier
+        )
 
     except UserProfile.DoesNotExist:
         pass
@@ -124,18 +113,20 @@ def handle_payment_succeeded(invoice):
 
     try:
         user_profile = UserProfile.objects.get(stripe_customer_id=customer_id)
-        if user_profile.subscription_status == 'past_due':
+        # The entitlement lasts until the end of the period just paid for
+        period_end = get_invoice_period_end(invoice)
+        if user_profile.subscription_status == 'active' and period_end:
+            sync_account_entitlements(user_profile, period_end)
+        elif user_profile.subscription_status == 'past_due':
             user_profile.subscription_status = 'active'
             user_profile.save()
+            sync_account_entitlements(user_profile, period_end)
 
-            try:
-                send_subscription_update(
-                    user_profile.user,
-                    user_profile.subscription_status,
-                    user_profile.subscription_tier
-                )
-            except Exception as e:
-                pass
+            send_subscription_update(
+                user_profile.user,
+                user_profile.subscription_status,
+                user_profile.subscription_tier
+            )
 
     except UserProfile.DoesNotExist:
         pass
@@ -148,20 +139,58 @@ def handle_payment_failed(invoice):
         user_profile = UserProfile.objects.get(stripe_customer_id=customer_id)
         user_profile.subscription_status = 'past_due'
         user_profile.save()
+        sync_account_entitlements(user_profile)
 
-        try:
-            send_subscription_update(
-                user_profile.user,
-                user_profile.subscription_status,
-                user_profile.subscription_tier
-            )
-        except Exception as e:
-            pass
+        send_subscription_update(
+            user_profile.user,
+            user_profile.subscription_status,
+            user_profile.subscription_tier
+        )
 
     except UserProfile.DoesNotExist:
         pass
 
 
+# Stripe event type -> handler, called with the event's data.object
+EVENT_HANDLERS = {
+    'customer.subscription.created': handle_subscription_created,
+    'customer.subscription.updated': handle_subscription_updated,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'invoice.payment_succeeded': handle_payment_succeeded,
+    'invoice.payment_failed': handle_payment_failed,
+}
+
+
+def get_period_end(subscription):
+    """End of the paid period, which bounds the subscription's export entitlement."""
+    period_end = subscription.get('current_period_end')
+    if period_end is None and subscription.get('items') and subscription['items']['data']:
+        # Newer API versions report the period per subscription item
+        period_end = subscription['items']['data'][0].get('current_period_end')
+    if period_end is None:
+        return None
+    return datetime.fromtimestamp(period_end, tz=dt_timezone.utc)
+
+
+def get_invoice_period_end(invoice):
+    """End of the subscription period an invoice pays for, from its line items."""
+    lines = invoice.get('lines') or {}
+    ends = [
+        line['period']['end']
+        for line in lines.get('data', [])
+        if line.get('period') and line['period'].get('end')
+    ]
+    if not ends:
+        return None
+    return datetime.fromtimestamp(max(ends), tz=dt_timezone.utc)
+
+
+def get_subscription_status(status):
+    """The UserProfile.subscription_status to store for a Stripe subscription status."""
+    # Stripe spells it 'canceled'; the profile choices use 'cancelled'
+    return 'cancelled' if status == 'canceled' else status
+
+
 def get_tier_from_price_id(price_id):
     tier_mapping = {
         'starter': 'starter',
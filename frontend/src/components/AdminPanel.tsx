@@ -10,11 +10,47 @@ interface User {
   subscription_status: string;
   subscription_tier: string | null;
   properties_exported: number;
+  property_count: number;
+  paid_export_count: number;
   created_at: string;
 }
 
+interface UserStats {
+  users: number;
+  admins: number;
+  agents: number;
+  clients: number;
+  individuals: number;
+  subscribers: number;
+  exports: number;
+}
+
+interface UserFilters {
+  q: string;
+  user_type: string;
+  subscription_status: string;
+  tier: string;
+  joined_after: string;
+  joined_before: string;
+}
+
+const EMPTY_FILTERS: UserFilters = {
+  q: '',
+  user_type: '',
+  subscription_status: '',
+  tier: '',
+  joined_after: '',
+  joined_before: '',
+};
+
+const PAGE_SIZE = 50;
+
 const AdminPanel: React.FC = () => {
   const [users, setUsers] = useState<User[]>([]);
+  const [stats, setStats] = useState<UserStats | null>(null);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [filters, setFilters] = useState<UserFilters>(EMPTY_FILTERS);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [newAdminEmail, setNewAdminEmail] = useState('');
@@ -22,13 +58,21 @@ const AdminPanel: React.FC = () => {
   const [successMessage, setSuccessMessage] = useState('');
 
   useEffect(() => {
-    fetchUsers();
-  }, []);
+    // Debounce so typing in the search box doesn't fire a request per key
+    const timer = setTimeout(fetchUsers, 300);
+    return () => clearTimeout(timer);
+  }, [filters]);
 
   const fetchUsers = async () => {
+    const params: Record<string, string | number> = { page_size: PAGE_SIZE };
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value) params[key] = value;
+    });
     try {
-      const response = await api.get('/api/admin/users/');
-      setUsers(response.data);
+      const response = await api.get('/admin/users/', { params });
+      setUsers(response.data.results);
+      setNextPage(response.data.next);
+      setStats(response.data.stats);
     } catch (err: any) {
       setError('Failed to load users');
       console.error('Error fetching users:', err);
@@ -37,6 +81,25 @@ const AdminPanel: React.FC = () => {
     }
   };
 
+  const loadMoreUsers = async () => {
+    if (!nextPage) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.get(nextPage);
+      setUsers((prev) => [...prev, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (err: any) {
+      setError('Failed to load users');
+      console.error('Error fetching users:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const updateFilter = (key: keyof UserFilters, value: string) => {
+    setFilters((prev) => ({ ...prev, [key]: value }));
+  };
+
   const grantAdminAccess = async () => {
     if (!newAdminEmail.trim()) {
       setError('Please enter an email address');
@@ -48,7 +111,7 @@ const AdminPanel: React.FC = () => {
     setSuccessMessage('');
 
     try {
-      const response = await api.post('/api/admin/make-admin/', {
+      const response = await api.post('/admin/make-admin/', {
         email: newAdminEmail.trim(),
       });
 
@@ -127,7 +190,62 @@ const AdminPanel: React.FC = () => {
 
       {/* Users List Section */}
       <div className="sp-admin-section">
-        <h2>All Users ({users.length})</h2>
+        <h2>All Users ({stats?.users ?? users.length})</h2>
+        <div className="sp-form-row">
+          <input
+            type="search"
+            placeholder="Search email or username"
+            value={filters.q}
+            onChange={(e) => updateFilter('q', e.target.value)}
+            className="sp-admin-input"
+          />
+          <select
+            value={filters.user_type}
+            onChange={(e) => updateFilter('user_type', e.target.value)}
+            className="sp-admin-input"
+          >
+            <option value="">All types</option>
+            <option value="individual">Individual</option>
+            <option value="agent">Agent</option>
+            <option value="client">Client</option>
+            <option value="admin">Admin</option>
+          </select>
+          <select
+            value={filters.subscription_status}
+            onChange={(e) => updateFilter('subscription_status', e.target.value)}
+            className="sp-admin-input"
+          >
+            <option value="">Any subscription</option>
+            <option value="none">None</option>
+            <option value="active">Active</option>
+            <option value="past_due">Past due</option>
+            <option value="cancelled">Cancelled</option>
+          </select>
+          <select
+            value={filters.tier}
+            onChange={(e) => updateFilter('tier', e.target.value)}
+            className="sp-admin-input"
+          >
+            <option value="">Any tier</option>
+            <option value="starter">Starter</option>
+            <option value="professional">Professional</option>
+            <option value="team">Team</option>
+          </select>
+          <input
+            type="date"
+            title="Joined on or after"
+            value={filters.joined_after}
+            onChange={(e) => updateFilter('joined_after', e.target.value)}
+            className="sp-admin-input"
+          />
+          <input
+            type="date"
+            title="Joined on or before"
+            value={filters.joined_before}
+            onChange={(e) => updateFilter('joined_before', e.target.value)}
+            className="sp-admin-input"
+          />
+        </div>
         <div className="sp-users-table-container">
           <table className="sp-users-table">
             <thead>
@@ -136,6 +254,7 @@ const AdminPanel: React.FC = () => {
                 <th>Email</th>
                 <th>Type</th>
                 <th>Subscription</th>
+                <th>Properties</th>
                 <th>Exports</th>
                 <th>Joined</th>
               </tr>
@@ -162,6 +281,7 @@ const AdminPanel: React.FC = () => {
                       <span className="sp-subscription-none">None</span>
                     )}
                   </td>
+                  <td className="sp-exports">{user.property_count}</td>
                   <td className="sp-exports">{user.properties_exported}</td>
                   <td className="sp-date">{formatDate(user.created_at)}</td>
                 </tr>
@@ -169,6 +289,15 @@ const AdminPanel: React.FC = () => {
             </tbody>
           </table>
         </div>
+        {nextPage && (
+          <button
+            onClick={loadMoreUsers}
+            disabled={loadingMore}
+            className="sp-btn sp-btn-primary"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        )}
       </div>
 
       {/* Statistics Section */}
@@ -177,37 +306,37 @@ const AdminPanel: React.FC = () => {
         <div className="sp-stats-grid">
           <div className="sp-stat-card">
             <div className="sp-stat-number">
-              {users.filter(u => u.user_type === 'admin').length}
+              {stats?.admins ?? 0}
             </div>
             <div className="sp-stat-label">Admins</div>
           </div>
           <div className="sp-stat-card">
             <div className="sp-stat-number">
-              {users.filter(u => u.user_type === 'agent').length}
+              {stats?.agents ?? 0}
             </div>
             <div className="sp-stat-label">Agents</div>
           </div>
           <div className="sp-stat-card">
             <div className="sp-stat-number">
-              {users.filter(u => u.user_type === 'client').length}
+              {stats?.clients ?? 0}
             </div>
             <div className="sp-stat-label">Clients</div>
           </div>
           <div className="sp-stat-card">
             <div className="sp-stat-number">
-              {users.filter(u => u.user_type === 'individual').length}
+              {stats?.individuals ?? 0}
             </div>
             <div className="sp-stat-label">Individuals</div>
           </div>
           <div className="sp-stat-card">
             <div className="sp-stat-number">
-              {users.filter(u => u.subscription_status === 'active').length}
+              {stats?.subscribers ?? 0}
             </div>
             <div className="sp-stat-label">Subscribers</div>
           </div>
           <div className="sp-stat-card">
             <div className="sp-stat-number">
-              {users.reduce((sum, u) => sum + u.properties_exported, 0)}
+              {stats?.exports ?? 0}
             </div>
             <div className="sp-stat-label">Total Exports</div>
           </div>
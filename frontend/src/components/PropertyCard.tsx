@@ -1,7 +1,7 @@
 // src/components/PropertyCard.tsx
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
 import api from "../axiosConfig";
-import type { Property } from "../types";
+import type { ExportPermission, Property } from "../types";
 import SectionTabs from "./SectionTabs";
 import ContentTabs from "./ContentTabs";
 import EditPropertyForm from "./EditPropertyForm";
@@ -22,6 +22,7 @@ interface Props {
   isCollapsed: boolean;
   onToggleCollapse: () => void;
   onAddSection: (name: string) => void;
+  exportPermission?: ExportPermission;
 }
 
 const PropertyCard: React.FC<Props> = ({
@@ -38,10 +39,18 @@ const PropertyCard: React.FC<Props> = ({
   isCollapsed,
   onToggleCollapse,
   onAddSection,
+  exportPermission,
 }) => {
   const [showPaymentModal, setShowPaymentModal] = useState(false);
+  const [paid, setPaid] = useState(false);
+  const paymentRequired = exportPermission?.reason === "payment_required" && !paid;
 
   const handleExport = async () => {
+    // Known to need payment: skip the export request that would return 402
+    if (paymentRequired) {
+      setShowPaymentModal(true);
+      return;
+    }
     try {
       const res = await api.get(`/properties/${property.id}/export/`, {
         responseType: "blob",
@@ -66,10 +75,14 @@ const PropertyCard: React.FC<Props> = ({
   };
 
   const handlePaymentSuccess = () => {
-    // After successful payment, try export again
-    handleExport();
+    setPaid(true);
   };
 
+  // After successful payment, try export again
+  useEffect(() => {
+    if (paid) handleExport();
+  }, [paid]);
+
   return (
     <div className={`sp-property-card${isEditing ? " editing" : ""}${isCollapsed ? " collapsed" : ""}`}>
       {isEditing ? (
@@ -92,7 +105,7 @@ const PropertyCard: React.FC<Props> = ({
             <button
               className="sp-property-card-action-btn"
               onClick={handleExport}
-              title="Export PDF"
+              title={paymentRequired ? "Export PDF (payment required)" : "Export PDF"}
             >
               📄
             </button>
@@ -1,5 +1,6 @@
-import React, { useState } from "react";
-import type { Property, Section } from "../types";
+import React, { useEffect, useState } from "react";
+import api from "../axiosConfig";
+import type { ExportPermission, Property, Section } from "../types";
 import PropertyCard from "./PropertyCard";
 
 // Include notes alongside documents and images
@@ -41,6 +42,20 @@ const PropertyList: React.FC<Props> = ({
     properties.reduce((acc, p) => ({ ...acc, [p.id]: true }), {})
   );
 
+  // Export permissions for every card, fetched in one request
+  const [exportPermissions, setExportPermissions] = useState<Record<number, ExportPermission>>({});
+  const propertyIds = properties.map((p) => p.id).join(",");
+
+  useEffect(() => {
+    if (!propertyIds) return;
+    api
+      .post("/payments/check-permissions/", {
+        property_ids: propertyIds.split(",").map(Number),
+      })
+      .then((res) => setExportPermissions(res.data.permissions))
+      .catch((err) => console.error("Failed to load export permissions", err));
+  }, [propertyIds]);
+
   const toggleCollapse = (propertyId: number) => {
     const wasCollapsed = collapsedProperties[propertyId];
     setCollapsedProperties(prev => ({
@@ -79,6 +94,7 @@ const PropertyList: React.FC<Props> = ({
           isCollapsed={collapsedProperties[p.id] || false}
           onToggleCollapse={() => toggleCollapse(p.id)}
           onAddSection={(name) => onAddSection(p.id, name)}
+          exportPermission={exportPermissions[p.id]}
         />
       ))}
     </div>
@@ -32,6 +32,13 @@ export interface Property {
   [key: string]: any; // for other optional fields
 }
 
+/** Whether a property can be exported, from /payments/check-permissions/. */
+export interface ExportPermission {
+  can_export: boolean;
+  has_paid: boolean;
+  reason: "paid" | "free" | "payment_required" | "not_found";
+}
+
 /** A section belonging to a property, with its documents, images, and notes. */
 export interface Section {
   id: number;